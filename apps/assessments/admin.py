@@ -1,11 +1,22 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from .models import *
+from apps.jobs.services import JobQueue
 
 @admin.register(AcademicYear)
 class AcademicYearAdmin(admin.ModelAdmin):
     list_display = ['name', 'start_date', 'end_date', 'is_current', 'is_active']
     list_filter = ['is_current', 'is_active']
     list_editable = ['is_active']
+    actions = ['regrade_marks']
+    
+    @admin.action(description="Regrade marks and summaries with current grade scales")
+    def regrade_marks(self, request, queryset):
+        # A year of marks takes longer than a request should; the worker reports on the Job
+        for academic_year in queryset:
+            job = JobQueue.enqueue('assessments.regrade', {'academic_year_id': academic_year.id}, user=request.user)
+            self.message_user(
+                request, f"{academic_year.name}: regrade queued as job #{job.id}", messages.SUCCESS
+            )
 
 @admin.register(Subject)
 class SubjectAdmin(admin.ModelAdmin):
@@ -37,9 +48,12 @@ class StudentMarkAdmin(admin.ModelAdmin):
     list_filter = ['exam', 'subject', 'academic_year', 'grade']
     search_fields = ['student__user__first_name', 'student__user__last_name', 'subject__name']
     readonly_fields = ['grade', 'grade_point', 'entered_at', 'updated_at']
+    # StudentProfile.__str__ reads user and student_class
+    list_select_related = ['student__user', 'student__student_class', 'subject', 'exam']
 
 @admin.register(StudentExamSummary)
 class StudentExamSummaryAdmin(admin.ModelAdmin):
     list_display = ['student', 'exam', 'percentage', 'overall_grade', 'class_rank']
     list_filter = ['exam', 'academic_year']
     search_fields = ['student__user__first_name', 'student__user__last_name']
+    list_select_related = ['student__user', 'student__student_class', 'exam']
@@ -0,0 +1,137 @@
+import math
+import statistics
+from collections import Counter, defaultdict
+from .models import StudentExamSummary, StudentMark
+
+
+class PerformanceAnalytics:
+    """Descriptive statistics for class results, computed over flat value lists"""
+
+    PERCENTILES = (10, 25, 50, 75, 90)
+    HISTOGRAM_BINS = 10  # 0-10%, 10-20%, ... 90-100%
+
+    @staticmethod
+    def percentile(sorted_values, pct):
+        """Linear-interpolated percentile of an already sorted list"""
+        if not sorted_values:
+            return 0.0
+        position = (len(sorted_values) - 1) * pct / 100
+        lower = math.floor(position)
+        upper = math.ceil(position)
+        if lower == upper:
+            return float(sorted_values[lower])
+        weight = position - lower
+        return float(sorted_values[lower]) * (1 - weight) + float(sorted_values[upper]) * weight
+
+    @staticmethod
+    def histogram(values, lower=0, upper=100, bins=HISTOGRAM_BINS):
+        """Bucket values into equal-width bins; the top bin includes the upper bound"""
+        width = (upper - lower) / bins
+        counts = [0] * bins
+        for value in values:
+            index = int((value - lower) // width)
+            counts[min(max(index, 0), bins - 1)] += 1
+        return [
+            {
+                'range': f"{lower + i * width:g}-{lower + (i + 1) * width:g}",
+                'count': count
+            }
+            for i, count in enumerate(counts)
+        ]
+
+    @staticmethod
+    def describe(values):
+        """Count, mean, median, stddev, min/max, percentiles and histogram for percentages"""
+        values = sorted(float(v) for v in values)
+        if not values:
+            return {
+                'count': 0, 'mean': 0.0, 'median': 0.0, 'stddev': 0.0,
+                'min': 0.0, 'max': 0.0,
+                'percentiles': {f'p{p}': 0.0 for p in PerformanceAnalytics.PERCENTILES},
+                'histogram': PerformanceAnalytics.histogram([]),
+            }
+
+        return {
+            'count': len(values),
+            'mean': round(statistics.fmean(values), 2),
+            'median': round(statistics.median(values), 2),
+            'stddev': round(statistics.pstdev(values), 2),
+            'min': values[0],
+            'max': values[-1],
+            'percentiles': {
+                f'p{p}': round(PerformanceAnalytics.percentile(values, p), 2)
+                for p in PerformanceAnalytics.PERCENTILES
+            },
+            'histogram': PerformanceAnalytics.histogram(values),
+        }
+
+    @staticmethod
+    def class_exam_statistics(class_id, exam_id, academic_year_id):
+        """Overall and per-subject statistics for a class in one exam (two queries)"""
+        # 1. One row per student from the stored exam summaries
+        summary_rows = list(StudentExamSummary.objects.filter(
+            student__student_class_id=class_id,
+            exam_id=exam_id,
+            academic_year_id=academic_year_id
+        ).order_by('-total_marks_obtained').values_list(
+            'student_id', 'student__roll_number',
+            'student__user__first_name', 'student__user__last_name',
+            'total_marks_obtained', 'percentage', 'overall_grade', 'class_rank'
+        ))
+
+        if not summary_rows:
+            return None
+
+        totals = [row[4] for row in summary_rows]
+        percentages = [row[5] for row in summary_rows]
+
+        # 2. Every mark of the class in this exam, grouped by subject in memory
+        subject_rows = StudentMark.objects.filter(
+            student__student_class_id=class_id,
+            exam_id=exam_id,
+            academic_year_id=academic_year_id
+        ).values_list('subject_id', 'subject__name', 'marks_obtained', 'max_marks', 'is_absent', 'grade')
+
+        subjects = defaultdict(lambda: {'name': '', 'percentages': [], 'marks': [], 'grades': Counter(), 'absent': 0})
+        for subject_id, subject_name, marks, max_marks, is_absent, grade in subject_rows:
+            bucket = subjects[subject_id]
+            bucket['name'] = subject_name
+            bucket['grades'][grade] += 1
+            if is_absent:
+                bucket['absent'] += 1
+                continue
+            bucket['marks'].append(float(marks))
+            bucket['percentages'].append(float(marks) / max_marks * 100 if max_marks else 0.0)
+
+        subject_statistics = []
+        for subject_id, bucket in subjects.items():
+            stats = PerformanceAnalytics.describe(bucket['percentages'])
+            stats.update({
+                'subject_id': subject_id,
+                'subject': bucket['name'],
+                'absent_count': bucket['absent'],
+                'average_marks': round(statistics.fmean(bucket['marks']), 2) if bucket['marks'] else 0.0,
+                'grade_distribution': dict(bucket['grades']),
+            })
+            subject_statistics.append(stats)
+        subject_statistics.sort(key=lambda s: s['subject'])
+
+        return {
+            'statistics': PerformanceAnalytics.describe(percentages),
+            'highest_marks': float(max(totals)),
+            'lowest_marks': float(min(totals)),
+            'grade_distribution': dict(Counter(row[6] for row in summary_rows)),
+            'subject_statistics': subject_statistics,
+            'student_summaries': [
+                {
+                    'student_id': student_id,
+                    'student_name': f"{first_name} {last_name}".strip(),
+                    'roll_number': roll_number,
+                    'total_marks': float(total),
+                    'percentage': float(percentage),
+                    'grade': grade,
+                    'rank': rank
+                }
+                for student_id, roll_number, first_name, last_name, total, percentage, grade, rank in summary_rows
+            ],
+        }
@@ -3,10 +3,16 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from django.shortcuts import get_object_or_404
+from django.http import Http404
 from datetime import datetime
 from .models import *
 from .services import GradingService
+from .ranking import RankingService
+from .grading import GradingEngine
+from .reference import ReferenceData, RESOURCE as REFERENCE_RESOURCE
 from apps.students.models import Class
+from apps.students.roster import ClassRoster, RESOURCE as ROSTER_RESOURCE
+from apps.core.http import conditional_get
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -24,7 +30,7 @@ def get_marks_entry_form_data(request):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         # Get current academic year
-        academic_year = AcademicYear.objects.filter(is_current=True).first()
+        academic_year = ReferenceData.current_academic_year()
         if not academic_year:
             return Response({
                 'success': False,
@@ -33,7 +39,9 @@ def get_marks_entry_form_data(request):
         
         # Get class and exam info
         class_obj = get_object_or_404(Class, id=class_id)
-        exam = get_object_or_404(Exam, id=exam_id)
+        exam = ReferenceData.exam(exam_id)
+        if not exam:
+            raise Http404('Exam not found')
         
         # Get students in this class
         students = StudentProfile.objects.filter(
@@ -41,13 +49,10 @@ def get_marks_entry_form_data(request):
         ).select_related('user').order_by('roll_number')
         
         # Get subjects for this class
-        subject_mappings = ClassSubjectMapping.objects.filter(
-            student_class=class_obj,
-            academic_year=academic_year
-        ).select_related('subject')
+        subject_mappings = ReferenceData.class_subjects(class_obj.id, academic_year.id)
         
         if subject_id:
-            subject_mappings = subject_mappings.filter(subject_id=subject_id)
+            subject_mappings = [m for m in subject_mappings if str(m.subject_id) == str(subject_id)]
         
         subjects = [mapping.subject for mapping in subject_mappings]
         
@@ -125,36 +130,40 @@ def enter_marks(request):
         marks_data = data.get('marks', [])
         
         # Get objects
-        subject = get_object_or_404(Subject, id=subject_id)
-        exam = get_object_or_404(Exam, id=exam_id)
-        academic_year = get_object_or_404(AcademicYear, id=academic_year_id)
+        subject = ReferenceData.subject(subject_id)
+        exam = ReferenceData.exam(exam_id)
+        academic_year = ReferenceData.academic_year(academic_year_id)
+        if not subject or not exam or not academic_year:
+            raise Http404('Subject, exam or academic year not found')
         
-        saved_count = 0
+        students = StudentProfile.objects.select_related('student_class').in_bulk(
+            [mark_entry.get('student_id') for mark_entry in marks_data]
+        )
         
+        entries = []
         for mark_entry in marks_data:
             student_id = mark_entry.get('student_id')
             marks = mark_entry.get('marks', 0)
             is_absent = mark_entry.get('is_absent', False)
             
-            student = get_object_or_404(StudentProfile, id=student_id)
-            max_marks = exam.get_max_marks(student.student_class.class_group)
-            
-            # Create or update marks
-            student_mark, created = StudentMark.objects.update_or_create(
-                student=student,
-                subject=subject,
-                exam=exam,
-                academic_year=academic_year,
-                defaults={
-                    'marks_obtained': marks if not is_absent else 0,
-                    'max_marks': max_marks,
-                    'is_absent': is_absent,
-                    'entered_by': request.user
-                }
-            )
-            saved_count += 1
+            student = students.get(int(student_id)) if student_id is not None else None
+            if student is None:
+                raise Http404(f'Student {student_id} not found')
             
-            # Calculate summary
+            entries.append({
+                'student': student,
+                'subject': subject,
+                'marks_obtained': marks if not is_absent else 0,
+                'max_marks': exam.get_max_marks(student.student_class.class_group),
+                'is_absent': is_absent,
+            })
+        
+        # Create or update all marks and grade them together
+        GradingEngine.save_marks(entries, exam, academic_year, entered_by=request.user)
+        saved_count = len(entries)
+        
+        # Calculate summaries
+        for student_id in {entry['student'].id for entry in entries}:
             GradingService.calculate_student_exam_summary(
                 student_id, exam_id, academic_year_id
             )
@@ -171,16 +180,17 @@ def enter_marks(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 @api_view(['GET'])
+@conditional_get(ROSTER_RESOURCE, REFERENCE_RESOURCE, max_age=300)
 def get_classes_and_exams(request):
     """Get classes and exams for dropdowns"""
-    classes = Class.objects.all() # Rely on Meta ordering [order, name]
-    exams = Exam.objects.filter(is_active=True).order_by('exam_type', 'order')
+    classes = ClassRoster.summary() # Meta ordering [order, name]
+    exams = ReferenceData.active_exams()
     
     return Response({
         'success': True,
         'data': {
             'classes': [
-                {'id': cls.id, 'name': cls.name, 'class_group': cls.class_group}
+                {'id': cls['id'], 'name': cls['name'], 'class_group': cls['class_group']}
                 for cls in classes
             ],
             'exams': [
@@ -194,8 +204,17 @@ def get_classes_and_exams(request):
 def get_student_marks(request, student_id, exam_id):
     """Get all marks for a student with overall grade and class rank"""
     try:
-        academic_year = AcademicYear.objects.filter(is_current=True).first()
-        student = StudentProfile.objects.get(id=student_id)
+        academic_year = ReferenceData.current_academic_year()
+        if not academic_year:
+            return Response({
+                'success': False,
+                'message': 'No current academic year found'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        student = StudentProfile.objects.select_related('user', 'student_class').get(id=student_id)
+        exam = ReferenceData.exam(exam_id)
+        if not exam:
+            raise Http404('Exam not found')
         
         # Get student's marks
         marks = StudentMark.objects.filter(
@@ -222,48 +241,16 @@ def get_student_marks(request, student_id, exam_id):
         
         percentage = (total_marks / max_marks * 100) if max_marks > 0 else 0
         
-        # Calculate overall grade based on percentage
-        def calculate_overall_grade(percentage):
-            if percentage >= 91: return "A1", 10.0
-            elif percentage >= 81: return "A2", 9.0
-            elif percentage >= 71: return "B1", 8.0
-            elif percentage >= 61: return "B2", 7.0
-            elif percentage >= 51: return "C1", 6.0
-            elif percentage >= 41: return "C2", 5.0
-            elif percentage >= 33: return "D", 4.0
-            else: return "E", 0.0
-        
-        overall_grade, overall_gpa = calculate_overall_grade(percentage)
-        
-        # Calculate class rank
-        from django.db.models import Sum, F
-        class_students = StudentProfile.objects.filter(
-            student_class=student.student_class
-        ).values('id')
-        
-        # Get total marks for all students in the same class and exam
-        student_totals = []
-        for class_student in class_students:
-            student_marks_sum = StudentMark.objects.filter(
-                student_id=class_student['id'],
-                exam_id=exam_id,
-                academic_year=academic_year
-            ).aggregate(total=Sum('marks_obtained'))['total'] or 0
-            
-            student_totals.append({
-                'student_id': class_student['id'],
-                'total_marks': student_marks_sum
-            })
-        
-        # Sort by total marks (descending) to get ranks
-        student_totals.sort(key=lambda x: x['total_marks'], reverse=True)
+        # Overall grade comes from the school's GradeScale, same as report cards
+        overall_grade, overall_gpa = GradingService.get_grade_from_percentage(
+            percentage, student.student_class.class_group, exam.exam_type
+        )
         
-        # Find current student's rank
-        current_rank = 1
-        for i, student_total in enumerate(student_totals, 1):
-            if student_total['student_id'] == student_id:
-                current_rank = i
-                break
+        # Class rank is a cached lookup into the whole-class window ranking
+        rank_entry, class_size = RankingService.get_student_rank(
+            student, exam.id, academic_year.id
+        )
+        current_rank = rank_entry['rank'] if rank_entry else class_size
         
         return Response({
             'success': True,
@@ -277,9 +264,9 @@ def get_student_marks(request, student_id, exam_id):
                 'total_max_marks': max_marks,
                 'percentage': round(percentage, 2),
                 'overall_grade': overall_grade,
-                'overall_gpa': overall_gpa,
+                'overall_gpa': float(overall_gpa),
                 'class_rank': current_rank,
-                'total_students_in_class': len(student_totals),
+                'total_students_in_class': class_size,
                 'total_subjects': len(marks_data)
             }
         })
@@ -289,3 +276,35 @@ def get_student_marks(request, student_id, exam_id):
             'success': False,
             'message': str(e)
         }, status=500)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_class_performance(request):
+    """Class statistics, grade distribution and per-subject breakdown for one exam"""
+    class_id = request.GET.get('class_id')
+    exam_id = request.GET.get('exam_id')
+    academic_year_id = request.GET.get('academic_year_id')
+    
+    if not class_id or not exam_id:
+        return Response({
+            'success': False,
+            'message': 'class_id and exam_id are required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    if not academic_year_id:
+        academic_year = ReferenceData.current_academic_year()
+        if not academic_year:
+            return Response({
+                'success': False,
+                'message': 'No current academic year found'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        academic_year_id = academic_year.id
+    
+    summary = GradingService.get_class_performance_summary(class_id, exam_id, academic_year_id)
+    if not summary:
+        return Response({
+            'success': False,
+            'message': 'No results found for this class and exam'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    return Response({'success': True, 'data': summary})
@@ -0,0 +1,298 @@
+import time
+from bisect import bisect_right
+from collections import defaultdict
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from apps.core.metrics import record_event
+from .models import GradeScale, StudentExamSummary, StudentMark
+
+DEFAULT_GRADE = ('D2', Decimal('3.0'))
+ABSENT_GRADE = ('AB', Decimal('0.0'))
+
+# Subject pairs graded on their combined marks, keyed by class_group.
+# '*' applies to every class_group without its own entry.
+# Override with ASSESSMENT_COMBINED_SUBJECTS in settings.
+DEFAULT_COMBINED_SUBJECTS = {
+    '*': [('Physical Science', 'Natural Science')],
+}
+
+# FA grade scales are expressed in marks out of these maxima
+FA_SCALE_MAX_MARKS = {'pre': 50, '1-2': 25, '3-5': 25, '6-10': 50}
+
+
+def percentage_to_scale_marks(percentage, class_group, exam_type):
+    """Convert an overall percentage to the marks the grade scale is written in"""
+    if exam_type == 'FA':
+        return (percentage * FA_SCALE_MAX_MARKS.get(class_group, 50)) / 100
+    return percentage  # SA scales are out of 100
+
+
+def get_combined_subjects(class_group):
+    """Configured (subject, subject) pairs for a class group"""
+    config = getattr(settings, 'ASSESSMENT_COMBINED_SUBJECTS', DEFAULT_COMBINED_SUBJECTS)
+    return config.get(class_group, config.get('*', []))
+
+
+def get_combined_partner(class_group, subject_name):
+    """Name of the subject graded together with this one, if any"""
+    for first, second in get_combined_subjects(class_group):
+        if subject_name == first:
+            return second
+        if subject_name == second:
+            return first
+    return None
+
+
+class GradeTable:
+    """GradeScale rows held in memory: one query, then a bisect per lookup"""
+
+    def __init__(self, scales):
+        ranges = defaultdict(list)
+        for scale in scales:
+            ranges[(scale.class_group, scale.exam_type)].append(
+                (scale.min_marks, scale.max_marks, scale.grade, scale.grade_point)
+            )
+        self._ranges = {}
+        for key, rows in ranges.items():
+            rows.sort(key=lambda row: row[0])
+            self._ranges[key] = ([row[0] for row in rows], rows)
+
+    @classmethod
+    def load(cls):
+        return cls(GradeScale.objects.all())
+
+    def lookup(self, class_group, exam_type, marks):
+        """Grade and grade point for marks, mirroring the highest matching min_marks"""
+        entry = self._ranges.get((class_group, exam_type))
+        if entry is None or marks is None:
+            return DEFAULT_GRADE
+        mins, rows = entry
+        marks = float(marks)
+        for index in range(bisect_right(mins, marks) - 1, -1, -1):
+            min_marks, max_marks, grade, grade_point = rows[index]
+            if marks <= max_marks:
+                return grade, grade_point
+        return DEFAULT_GRADE
+
+    def lookup_percentage(self, class_group, exam_type, percentage):
+        """Overall grade for a percentage, as GradingService.get_grade_from_percentage"""
+        return self.lookup(class_group, exam_type, percentage_to_scale_marks(percentage, class_group, exam_type))
+
+
+class GradingEngine:
+    """Batched grading for sets of StudentMark rows, including combined subjects"""
+
+    @staticmethod
+    def _fetch_missing_partners(marks, wanted):
+        """Load partner rows that are not part of the batch in one query"""
+        if not wanted:
+            return []
+        condition = Q()
+        for student_id, exam_id, academic_year_id, subject_name in wanted:
+            condition |= Q(
+                student_id=student_id,
+                exam_id=exam_id,
+                academic_year_id=academic_year_id,
+                subject__name=subject_name
+            )
+        loaded_ids = [mark.pk for mark in marks if mark.pk]
+        return list(
+            StudentMark.objects.filter(condition)
+            .exclude(pk__in=loaded_ids)
+            .select_related('subject', 'exam', 'student__student_class')
+        )
+
+    @staticmethod
+    def grade_marks(marks, table=None, fetch_partners=True):
+        """
+        Set grade/grade_point on StudentMark instances in memory.
+        Marks need student.student_class, subject and exam available.
+        Returns partner rows outside the batch that were regraded too.
+        """
+        table = table or GradeTable.load()
+
+        # Find combined-subject partners that were not submitted in this batch
+        by_key = defaultdict(dict)
+        for mark in marks:
+            by_key[(mark.student_id, mark.exam_id, mark.academic_year_id)][mark.subject.name] = mark
+
+        wanted = set()
+        for mark in marks:
+            class_group = mark.student.student_class.class_group
+            partner = get_combined_partner(class_group, mark.subject.name)
+            key = (mark.student_id, mark.exam_id, mark.academic_year_id)
+            if partner and partner not in by_key[key]:
+                wanted.add(key + (partner,))
+
+        partners = GradingEngine._fetch_missing_partners(marks, wanted) if fetch_partners else []
+        for mark in partners:
+            by_key[(mark.student_id, mark.exam_id, mark.academic_year_id)][mark.subject.name] = mark
+
+        for mark in list(marks) + partners:
+            if mark.is_absent:
+                mark.grade, mark.grade_point = ABSENT_GRADE
+                continue
+
+            class_group = mark.student.student_class.class_group
+            graded_marks = mark.marks_obtained
+            partner_name = get_combined_partner(class_group, mark.subject.name)
+            partner = by_key[(mark.student_id, mark.exam_id, mark.academic_year_id)].get(partner_name)
+            if partner is not None and not partner.is_absent:
+                graded_marks = float(mark.marks_obtained) + float(partner.marks_obtained)
+
+            mark.grade, mark.grade_point = table.lookup(class_group, mark.exam.exam_type, graded_marks)
+
+        return partners
+
+    @staticmethod
+    def save_marks(entries, exam, academic_year, entered_by=None):
+        """
+        Upsert a sheet of marks and grade them in one pass.
+        entries: dicts with student, subject, marks_obtained, max_marks and optional is_absent.
+        """
+        from .ranking import RankingService
+        from .reference import ReferenceData
+
+        if not entries:
+            return []
+
+        # Last entry wins when a student/subject pair is submitted twice
+        entries = list({
+            (entry['student'].id, entry['subject'].id): entry for entry in entries
+        }.values())
+
+        existing = {
+            (mark.student_id, mark.subject_id): mark
+            for mark in StudentMark.objects.filter(
+                student_id__in={entry['student'].id for entry in entries},
+                subject_id__in={entry['subject'].id for entry in entries},
+                exam=exam,
+                academic_year=academic_year
+            )
+        }
+
+        now = timezone.now()
+        to_create, to_update = [], []
+        for entry in entries:
+            mark = existing.get((entry['student'].id, entry['subject'].id))
+            if mark is None:
+                mark = StudentMark(academic_year=academic_year)
+                to_create.append(mark)
+            else:
+                to_update.append(mark)
+            # Attach the already-loaded objects so grading needs no lookups
+            mark.student = entry['student']
+            mark.subject = entry['subject']
+            mark.exam = exam
+            mark.marks_obtained = entry['marks_obtained']
+            mark.max_marks = entry['max_marks']
+            mark.is_absent = entry.get('is_absent', mark.is_absent)
+            mark.entered_by = entered_by
+            mark.updated_at = now
+
+        partners = GradingEngine.grade_marks(to_create + to_update, ReferenceData.grade_table())
+
+        with transaction.atomic():
+            StudentMark.objects.bulk_create(to_create)
+            StudentMark.objects.bulk_update(
+                to_update,
+                ['marks_obtained', 'max_marks', 'is_absent', 'entered_by', 'grade', 'grade_point', 'updated_at']
+            )
+            if partners:
+                StudentMark.objects.bulk_update(partners, ['grade', 'grade_point'])
+
+        # Bulk writes skip post_save, so rankings are invalidated here
+        RankingService.invalidate(exam.id, academic_year.id)
+        record_event('marks_saved', len(to_create) + len(to_update))
+        return to_create + to_update
+
+    @staticmethod
+    def _flush_regrade(batch, table, dry_run):
+        """Regrade one batch of complete (student, exam) groups, write the changed rows and count them"""
+        previous = [(mark.grade, mark.grade_point) for mark in batch]
+        GradingEngine.grade_marks(batch, table, fetch_partners=False)
+        changed = [
+            mark for mark, (grade, grade_point) in zip(batch, previous)
+            if mark.grade != grade or Decimal(mark.grade_point) != Decimal(grade_point)
+        ]
+        if changed and not dry_run:
+            StudentMark.objects.bulk_update(changed, ['grade', 'grade_point'])
+        return len(changed)
+
+    @staticmethod
+    def regrade_academic_year(academic_year_id, chunk_size=2000, dry_run=False):
+        """
+        Recompute every mark grade and summary overall grade of an academic year
+        against the current GradeScale, writing only the rows that changed.
+        Each chunk is written as it is graded, so memory stays flat however
+        large the year and an interrupted run can simply be repeated.
+        """
+        started = time.monotonic()
+        table = GradeTable.load()
+
+        # Marks: stream in (student, exam) order so combined partners stay together
+        marks = StudentMark.objects.filter(
+            academic_year_id=academic_year_id
+        ).select_related('student__student_class', 'subject', 'exam').only(
+            'id', 'student_id', 'exam_id', 'academic_year_id', 'marks_obtained', 'is_absent',
+            'grade', 'grade_point', 'student__student_class__class_group',
+            'subject__name', 'exam__exam_type'
+        ).order_by('student_id', 'exam_id', 'id')
+
+        marks_checked = marks_changed = 0
+        batch, group = [], None
+        for mark in marks.iterator(chunk_size=chunk_size):
+            marks_checked += 1
+            if mark.student.student_class is None:
+                continue
+            if len(batch) >= chunk_size and (mark.student_id, mark.exam_id) != group:
+                marks_changed += GradingEngine._flush_regrade(batch, table, dry_run)
+                batch = []
+            batch.append(mark)
+            group = (mark.student_id, mark.exam_id)
+        if batch:
+            marks_changed += GradingEngine._flush_regrade(batch, table, dry_run)
+
+        # Summaries: overall grade follows the stored percentage
+        summaries = StudentExamSummary.objects.filter(
+            academic_year_id=academic_year_id
+        ).select_related('student__student_class', 'exam').only(
+            'id', 'percentage', 'overall_grade', 'overall_grade_point',
+            'student__student_class__class_group', 'exam__exam_type'
+        )
+
+        summaries_checked = summaries_changed = 0
+        changed_summaries = []
+        fields = ['overall_grade', 'overall_grade_point']
+        for summary in summaries.iterator(chunk_size=chunk_size):
+            summaries_checked += 1
+            if summary.student.student_class is None:
+                continue
+            grade, grade_point = table.lookup_percentage(
+                summary.student.student_class.class_group,
+                summary.exam.exam_type,
+                float(summary.percentage)
+            )
+            if grade != summary.overall_grade or Decimal(grade_point) != Decimal(summary.overall_grade_point):
+                summary.overall_grade, summary.overall_grade_point = grade, grade_point
+                changed_summaries.append(summary)
+            if len(changed_summaries) >= chunk_size:
+                if not dry_run:
+                    StudentExamSummary.objects.bulk_update(changed_summaries, fields)
+                summaries_changed += len(changed_summaries)
+                changed_summaries = []
+        if changed_summaries and not dry_run:
+            StudentExamSummary.objects.bulk_update(changed_summaries, fields)
+        summaries_changed += len(changed_summaries)
+
+        return {
+            'marks_checked': marks_checked,
+            'marks_changed': marks_changed,
+            'summaries_checked': summaries_checked,
+            'summaries_changed': summaries_changed,
+            'dry_run': dry_run,
+            'seconds': round(time.monotonic() - started, 2),
+        }
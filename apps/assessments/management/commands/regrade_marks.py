@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.assessments.models import AcademicYear
+from apps.assessments.grading import GradingEngine
+
+
+class Command(BaseCommand):
+    help = 'Recompute mark grades and summary grades after GradeScale changes'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--academic-year', help='Academic year name or id (default: current year)')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows loaded and updated per batch')
+        parser.add_argument('--dry-run', action='store_true', help='Report changes without writing them')
+    
+    def handle(self, *args, **options):
+        academic_year = self.get_academic_year(options['academic_year'])
+        self.stdout.write(f"🔄 Regrading {academic_year.name}...")
+        
+        report = GradingEngine.regrade_academic_year(
+            academic_year.id,
+            chunk_size=options['chunk_size'],
+            dry_run=options['dry_run']
+        )
+        
+        prefix = "🧪 [dry run] " if report['dry_run'] else "✅ "
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}Marks: {report['marks_changed']}/{report['marks_checked']} changed, "
+            f"summaries: {report['summaries_changed']}/{report['summaries_checked']} changed "
+            f"in {report['seconds']}s"
+        ))
+    
+    def get_academic_year(self, value):
+        if not value:
+            academic_year = AcademicYear.objects.filter(is_current=True).first()
+            if not academic_year:
+                raise CommandError('❌ No current academic year found')
+            return academic_year
+        
+        lookup = {'id': value} if value.isdigit() else {'name': value}
+        try:
+            return AcademicYear.objects.get(**lookup)
+        except AcademicYear.DoesNotExist:
+            raise CommandError(f"❌ Academic year '{value}' not found")
@@ -74,8 +74,9 @@ class Exam(models.Model):
     def get_max_marks(self, class_group,subject=None):
         """Get max marks based on class group and exam type"""
         
-        # Special handling for science subjects
-        if subject and subject.name in ['Physical Science', 'Natural Science']:
+        # Combined subjects (e.g. Physical + Natural Science) split the marks
+        from .grading import get_combined_partner
+        if subject and get_combined_partner(class_group, subject.name):
             if self.exam_type == 'SA':
                 return 50 
             else:  # FA
@@ -153,25 +154,32 @@ class StudentMark(models.Model):
         super().save(*args, **kwargs)
     
     def calculate_grade(self):
-        """Calculate grade with special handling for science subjects"""
+        """Calculate grade, combining marks with a partner subject where configured"""
+        from .grading import DEFAULT_GRADE, get_combined_partner
         
-        # Check if this is Physical Science or Natural Science
-        if self.subject.name in ['Physical Science', 'Natural Science']:
-            return self._calculate_combined_science_grade()
-        
-        # Regular grade calculation for other subjects
         class_group = self.student.student_class.class_group
+        marks = self.marks_obtained
         
         try:
+            # Combined subjects (e.g. Physical + Natural Science) share one grade
+            partner_name = get_combined_partner(class_group, self.subject.name)
+            if partner_name:
+                partner = StudentMark.objects.filter(
+                    student_id=self.student_id,
+                    exam_id=self.exam_id,
+                    academic_year_id=self.academic_year_id,
+                    subject__name=partner_name
+                ).only('marks_obtained', 'is_absent').first()
+                if partner and not partner.is_absent:
+                    marks = float(self.marks_obtained) + float(partner.marks_obtained)
+            
             # Find appropriate grade scale entry
-            grade_scales = GradeScale.objects.filter(
+            grade_scale = GradeScale.objects.filter(
                 class_group=class_group,
                 exam_type=self.exam.exam_type,
-                min_marks__lte=self.marks_obtained,
-                max_marks__gte=self.marks_obtained
-            )
-            
-            grade_scale = grade_scales.first()
+                min_marks__lte=marks,
+                max_marks__gte=marks
+            ).first()
             if grade_scale:
                 return grade_scale.grade, grade_scale.grade_point
                 
@@ -179,62 +187,7 @@ class StudentMark(models.Model):
             print(f"Error calculating grade: {e}")
         
         # Default to lowest grade if no match found
-        return 'D2', Decimal('3.0')
-    
-    def _calculate_combined_science_grade(self):
-        """Calculate combined Science grade from Physical + Natural Science"""
-        try:
-            # Get both Physical and Natural Science marks for same student/exam
-            ps_mark = StudentMark.objects.filter(
-                student=self.student,
-                exam=self.exam,
-                academic_year=self.academic_year,
-                subject__name='Physical Science'
-            ).first()
-            
-            ns_mark = StudentMark.objects.filter(
-                student=self.student,
-                exam=self.exam,
-                academic_year=self.academic_year,
-                subject__name='Natural Science'
-            ).first()
-            
-            # If both science subjects exist and are not absent
-            if ps_mark and ns_mark and not ps_mark.is_absent and not ns_mark.is_absent:
-                # Calculate combined marks
-                total_marks = float(ps_mark.marks_obtained) + float(ns_mark.marks_obtained)
-                
-                # Find grade using actual combined marks
-                class_group = self.student.student_class.class_group
-                grade_scales = GradeScale.objects.filter(
-                    class_group=class_group,
-                    exam_type=self.exam.exam_type,
-                    min_marks__lte=total_marks,
-                    max_marks__gte=total_marks
-                )
-                
-                grade_scale = grade_scales.first()
-                if grade_scale:
-                    return grade_scale.grade, grade_scale.grade_point
-            
-            # If combined grading fails, fall back to individual subject grading
-            class_group = self.student.student_class.class_group
-            grade_scales = GradeScale.objects.filter(
-                class_group=class_group,
-                exam_type=self.exam.exam_type,
-                min_marks__lte=self.marks_obtained,
-                max_marks__gte=self.marks_obtained
-            )
-            
-            grade_scale = grade_scales.first()
-            if grade_scale:
-                return grade_scale.grade, grade_scale.grade_point
-            
-        except Exception as e:
-            print(f"Error in combined science grade: {e}")
-        
-        # Always return a tuple as final fallback
-        return 'D2', Decimal('3.0')
+        return DEFAULT_GRADE
     
     def __str__(self):
         return f"{self.student.user.get_full_name()} - {self.subject.name} - {self.exam.name}: {self.marks_obtained}/{self.max_marks} ({self.grade})"
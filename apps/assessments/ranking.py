@@ -0,0 +1,98 @@
+from django.core.cache import cache
+from django.db.models import Count, F, FloatField, Q, Sum, Value, Window
+from django.db.models.functions import Coalesce, DenseRank, Rank
+from apps.core.metrics import record_cache
+from apps.core.versioning import bump_version, get_versions
+from apps.students.models import StudentProfile
+from apps.students.roster import RESOURCE as ROSTER_RESOURCE
+from .models import ClassSubjectMapping
+
+CACHE_TIMEOUT = 60 * 60 * 24
+
+
+class RankingService:
+    """Class ranks for a (class, exam, academic year), computed in one window query and cached"""
+
+    @staticmethod
+    def _marks_resource(exam_id, academic_year_id):
+        return f'marks:{exam_id}:{academic_year_id}'
+
+    @staticmethod
+    def _cache_key(class_id, exam_id, academic_year_id, main_subjects_only, marked_only=False):
+        marks_resource = RankingService._marks_resource(exam_id, academic_year_id)
+        versions = get_versions(marks_resource, ROSTER_RESOURCE)
+        scope = ('main' if main_subjects_only else 'all') + ('-marked' if marked_only else '')
+        return (
+            f'ranking:{class_id}:{exam_id}:{academic_year_id}:{scope}:'
+            f'{versions[marks_resource]}:{versions[ROSTER_RESOURCE]}'
+        )
+
+    @staticmethod
+    def compute_class_ranks(class_id, exam_id, academic_year_id, main_subjects_only=False, marked_only=False):
+        """
+        Total marks, competition rank and dense rank for every student in the class,
+        or with marked_only for the students with at least one mark in the exam.
+        """
+        mark_filter = Q(
+            studentmark__exam_id=exam_id,
+            studentmark__academic_year_id=academic_year_id
+        )
+        if main_subjects_only:
+            mark_filter &= Q(studentmark__subject_id__in=ClassSubjectMapping.objects.filter(
+                student_class_id=class_id,
+                academic_year_id=academic_year_id,
+                is_main_subject=True
+            ).values('subject_id'))
+
+        # Float output keeps the window ORDER BY free of decimal casts on SQLite
+        total = Coalesce(
+            Sum('studentmark__marks_obtained', filter=mark_filter, output_field=FloatField()),
+            Value(0.0),
+            output_field=FloatField()
+        )
+        rows = StudentProfile.objects.filter(
+            student_class_id=class_id
+        ).annotate(total=total)
+        if marked_only:
+            rows = rows.annotate(marks=Count('studentmark', filter=mark_filter)).filter(marks__gt=0)
+        rows = rows.annotate(
+            rank=Window(expression=Rank(), order_by=F('total').desc()),
+            dense_rank=Window(expression=DenseRank(), order_by=F('total').desc())
+        ).values_list('id', 'total', 'rank', 'dense_rank')
+
+        ranks = {
+            student_id: {'total': float(total), 'rank': rank, 'dense_rank': dense_rank}
+            for student_id, total, rank, dense_rank in rows
+        }
+        return {'class_size': len(ranks), 'ranks': ranks}
+
+    @staticmethod
+    def get_class_ranks(class_id, exam_id, academic_year_id, main_subjects_only=False, marked_only=False):
+        """Cached class ranking; recomputed only after marks or the roster change"""
+        key = RankingService._cache_key(class_id, exam_id, academic_year_id, main_subjects_only, marked_only)
+        ranking = cache.get(key)
+        record_cache('class_ranks', ranking is not None)
+        if ranking is None:
+            ranking = RankingService.compute_class_ranks(
+                class_id, exam_id, academic_year_id, main_subjects_only, marked_only
+            )
+            cache.set(key, ranking, CACHE_TIMEOUT)
+        return ranking
+
+    @staticmethod
+    def get_student_rank(student, exam_id, academic_year_id, main_subjects_only=False, marked_only=False):
+        """Rank entry for one student plus the class size"""
+        ranking = RankingService.get_class_ranks(
+            student.student_class_id, exam_id, academic_year_id, main_subjects_only, marked_only
+        )
+        return ranking['ranks'].get(student.id), ranking['class_size']
+
+    @staticmethod
+    def invalidate(exam_id, academic_year_id):
+        """Drop cached rankings for every class after marks of this exam change"""
+        bump_version(RankingService._marks_resource(exam_id, academic_year_id))
+
+    @staticmethod
+    def invalidate_roster():
+        """Drop every cached ranking after students join, leave or change class"""
+        bump_version(ROSTER_RESOURCE)
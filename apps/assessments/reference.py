@@ -0,0 +1,129 @@
+import threading
+from collections import defaultdict
+from apps.core.metrics import record_cache
+from apps.core.versioning import get_version
+from .models import AcademicYear, ClassSubjectMapping, Exam, GradeScale, Subject
+
+RESOURCE = 'assessments-reference'
+
+
+class ReferenceData:
+    """
+    Per-process snapshot of academic years, exams, subjects, class subject
+    mappings and grade scales. Reloaded when the shared version changes.
+    Returned objects are shared between requests and must not be modified.
+    """
+
+    _snapshot = None
+    _version = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def _load(cls):
+        academic_years = list(AcademicYear.objects.all())
+        exams = list(Exam.objects.all())  # Meta ordering: exam_type, order
+        subjects = list(Subject.objects.all())
+
+        class_subjects = defaultdict(list)
+        for mapping in ClassSubjectMapping.objects.select_related('subject').order_by('id'):
+            class_subjects[(mapping.student_class_id, mapping.academic_year_id)].append(mapping)
+
+        from .grading import GradeTable
+        return {
+            'current_academic_year': next((year for year in academic_years if year.is_current), None),
+            'academic_years': {year.id: year for year in academic_years},
+            'exams': exams,
+            'exams_by_id': {exam.id: exam for exam in exams},
+            'exams_by_name': {exam.name: exam for exam in exams},
+            'subjects_by_id': {subject.id: subject for subject in subjects},
+            'subjects_by_name': {subject.name: subject for subject in subjects},
+            'class_subjects': dict(class_subjects),
+            'grade_table': GradeTable(GradeScale.objects.all()),
+        }
+
+    @classmethod
+    def _get(cls):
+        version = get_version(RESOURCE)
+        fresh = cls._snapshot is not None and cls._version == version
+        record_cache('reference_data', fresh)
+        if not fresh:
+            with cls._lock:
+                if cls._snapshot is None or cls._version != version:
+                    cls._snapshot = cls._load()
+                    cls._version = version
+        return cls._snapshot
+
+    @classmethod
+    def clear(cls):
+        """Forget the local snapshot (the next read reloads it)"""
+        with cls._lock:
+            cls._snapshot = None
+            cls._version = None
+
+    @staticmethod
+    def _to_int(value):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
+    # Academic years
+
+    @classmethod
+    def current_academic_year(cls):
+        return cls._get()['current_academic_year']
+
+    @classmethod
+    def academic_year(cls, academic_year_id):
+        return cls._get()['academic_years'].get(cls._to_int(academic_year_id))
+
+    # Exams
+
+    @classmethod
+    def exams(cls):
+        """All exams in exam_type, order sequence"""
+        return list(cls._get()['exams'])
+
+    @classmethod
+    def active_exams(cls):
+        return [exam for exam in cls._get()['exams'] if exam.is_active]
+
+    @classmethod
+    def exam(cls, exam_id):
+        return cls._get()['exams_by_id'].get(cls._to_int(exam_id))
+
+    @classmethod
+    def exam_by_name(cls, name):
+        return cls._get()['exams_by_name'].get(name)
+
+    # Subjects
+
+    @classmethod
+    def subjects(cls):
+        return list(cls._get()['subjects_by_id'].values())
+
+    @classmethod
+    def subject(cls, subject_id):
+        return cls._get()['subjects_by_id'].get(cls._to_int(subject_id))
+
+    @classmethod
+    def subject_by_name(cls, name):
+        return cls._get()['subjects_by_name'].get(name)
+
+    # Class subject mappings
+
+    @classmethod
+    def class_subjects(cls, class_id, academic_year_id, main_only=None):
+        """ClassSubjectMapping rows (subject preloaded) for a class and year"""
+        mappings = cls._get()['class_subjects'].get(
+            (cls._to_int(class_id), cls._to_int(academic_year_id)), []
+        )
+        if main_only is None:
+            return list(mappings)
+        return [mapping for mapping in mappings if mapping.is_main_subject == main_only]
+
+    # Grade scales
+
+    @classmethod
+    def grade_table(cls):
+        return cls._get()['grade_table']
@@ -2,6 +2,7 @@ from rest_framework import serializers
 from django.db.models import Sum, Avg, Count
 from .models import *
 from apps.students.models import StudentProfile, Class
+from apps.students.roster import ClassRoster
 
 class ClassSerializer(serializers.ModelSerializer):
     student_count = serializers.SerializerMethodField()
@@ -11,7 +12,9 @@ class ClassSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'display_name', 'class_group', 'student_count', 'class_group']
 
     def get_student_count(self, obj):
-        return obj.studentprofile_set.count()
+        # Annotated by Class.objects.with_student_count(), else read from the cached roster
+        count = getattr(obj, 'student_count', None)
+        return ClassRoster.student_count(obj.id) if count is None else count
     
     def get_display_name(self, obj):
         return obj.name
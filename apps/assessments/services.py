@@ -1,6 +1,8 @@
 from django.db.models import Sum, Avg, Count, Q
-from decimal import Decimal
 from .models import *
+from .analytics import PerformanceAnalytics
+from .ranking import RankingService
+from .reference import ReferenceData
 
 class GradingService:
     """Service to handle all grading calculations and business logic"""
@@ -8,23 +10,26 @@ class GradingService:
     @staticmethod
     def calculate_student_exam_summary(student_id, exam_id, academic_year_id):
         """Calculate comprehensive summary for a student's specific exam (e.g., FA1)"""
+        exam = ReferenceData.exam(exam_id)
+        academic_year = ReferenceData.academic_year(academic_year_id)
+        if not exam or not academic_year:
+            return None
         try:
-            student = StudentProfile.objects.get(id=student_id)
-            exam = Exam.objects.get(id=exam_id)
-            academic_year = AcademicYear.objects.get(id=academic_year_id)
-        except (StudentProfile.DoesNotExist, Exam.DoesNotExist, AcademicYear.DoesNotExist):
+            student = StudentProfile.objects.select_related('student_class').get(id=student_id)
+        except StudentProfile.DoesNotExist:
             return None
         
         # Get all MAIN subject marks for this exam (exclude optional subjects)
+        main_subject_ids = [
+            mapping.subject_id
+            for mapping in ReferenceData.class_subjects(student.student_class_id, academic_year.id, main_only=True)
+        ]
         main_subject_marks = StudentMark.objects.filter(
             student=student,
             exam=exam,
-            academic_year=academic_year
-        ).select_related('subject').filter(
-            subject__classsubjectmapping__student_class=student.student_class,
-            subject__classsubjectmapping__is_main_subject=True,
-            subject__classsubjectmapping__academic_year=academic_year
-        )
+            academic_year=academic_year,
+            subject_id__in=main_subject_ids
+        ).select_related('subject')
         
         if not main_subject_marks.exists():
             return None
@@ -85,104 +90,40 @@ class GradingService:
     @staticmethod
     def get_grade_from_percentage(percentage, class_group, exam_type):
         """Get grade and grade point from percentage using appropriate grade scale"""
-        try:
-            print(f"🔍 GRADING SERVICE START: {percentage}% class='{class_group}' exam='{exam_type}'")
-            # For FA exams, convert percentage back to marks for comparison
-            if exam_type == 'FA':
-                # Get max marks for this class group
-                max_marks_map = {'pre': 50, '1-2': 25, '3-5': 25, '6-10': 50}
-                max_marks = max_marks_map.get(class_group, 50)
-                marks = (percentage * max_marks) / 100
-                print(f"🔍 FA: max_marks={max_marks}, marks={marks} (type: {type(marks)})")
-
-            else:  # SA exam
-                marks = percentage  # SA percentage directly corresponds to marks out of 100
-                print(f"🔍 SA: marks={marks}")
-            
-            print(f"🔍 QUERY: class_group='{class_group}', exam_type='{exam_type}', marks={marks}")
-            # Find matching grade scale
-            grade_scale = GradeScale.objects.filter(
-                class_group=class_group,
-                exam_type=exam_type,
-                min_marks__lte=marks,
-                max_marks__gte=marks
-            ).first()
-            
-            print(f"🔍 RESULT: grade_scale={grade_scale} (type: {type(grade_scale)})")
-            if grade_scale:
-                print(f"🔍 RETURNING: {grade_scale.grade}")
-                return grade_scale.grade, grade_scale.grade_point
-            else:
-                print("🔍 No matching grade scale found.")
-                
-        except Exception as e:
-            print(f"🔍 EXCEPTION: {e}")
-            print(f"Error getting grade from percentage: {e}")
-        
-        # Default fallback
-        print("🔍 FINAL FALLBACK: D2")
-        return 'D2', Decimal('3.0')
+        return ReferenceData.grade_table().lookup_percentage(class_group, exam_type, percentage)
     
     @staticmethod
     def calculate_class_rank(student, exam, academic_year, student_total):
         """Calculate student's rank in class for specific exam"""
-        # Get all students in the same class
-        class_students = StudentProfile.objects.filter(
-            student_class=student.student_class
+        # Ranks for the whole class come from one cached window-function query
+        rank_entry, class_size = RankingService.get_student_rank(
+            student, exam.id, academic_year.id, main_subjects_only=True
         )
-        
-        # Get total marks for each student in this exam (main subjects only)
-        student_totals = []
-        for class_student in class_students:
-            total = StudentMark.objects.filter(
-                student=class_student,
-                exam=exam,
-                academic_year=academic_year
-            ).filter(
-                subject__classsubjectmapping__student_class=student.student_class,
-                subject__classsubjectmapping__is_main_subject=True,
-                subject__classsubjectmapping__academic_year=academic_year
-            ).aggregate(Sum('marks_obtained'))['marks_obtained__sum'] or 0
-            
-            student_totals.append((class_student.id, float(total)))
-        
-        # Sort by total marks (descending - highest first)
-        student_totals.sort(key=lambda x: x[1], reverse=True)
-        
-        # Find current student's rank
-        for rank, (student_id, total) in enumerate(student_totals, 1):
-            if student_id == student.id:
-                return rank
-        
-        return len(student_totals)  # Last rank if not found
+        return rank_entry['rank'] if rank_entry else class_size
     
     @staticmethod
     def get_student_report_card(student_id, academic_year_id):
         """Generate comprehensive report card for a student"""
+        academic_year = ReferenceData.academic_year(academic_year_id)
+        if not academic_year:
+            return None
         try:
-            student = StudentProfile.objects.get(id=student_id)
-            academic_year = AcademicYear.objects.get(id=academic_year_id)
-        except (StudentProfile.DoesNotExist, AcademicYear.DoesNotExist):
+            student = StudentProfile.objects.select_related('user', 'student_class').get(id=student_id)
+        except StudentProfile.DoesNotExist:
             return None
         
         # Get all exams
-        exams = Exam.objects.filter(is_active=True).order_by('exam_type', 'order')
-        
-        # Get all subjects for this student's class
-        subjects = Subject.objects.filter(
-            classsubjectmapping__student_class=student.student_class,
-            classsubjectmapping__academic_year=academic_year
-        ).distinct()
-        
-        # Separate main and optional subjects
-        main_subjects = subjects.filter(
-            classsubjectmapping__is_main_subject=True,
-            classsubjectmapping__student_class=student.student_class
-        )
-        optional_subjects = subjects.filter(
-            classsubjectmapping__is_main_subject=False,
-            classsubjectmapping__student_class=student.student_class
-        )
+        exams = ReferenceData.active_exams()
+        
+        # Main and optional subjects for this student's class
+        main_subjects = [
+            mapping.subject
+            for mapping in ReferenceData.class_subjects(student.student_class_id, academic_year.id, main_only=True)
+        ]
+        optional_subjects = [
+            mapping.subject
+            for mapping in ReferenceData.class_subjects(student.student_class_id, academic_year.id, main_only=False)
+        ]
         
         # Build report structure
         report = {
@@ -258,55 +199,32 @@ class GradingService:
     @staticmethod
     def get_class_performance_summary(class_id, exam_id, academic_year_id):
         """Get performance summary for entire class in specific exam"""
+        exam = ReferenceData.exam(exam_id)
+        academic_year = ReferenceData.academic_year(academic_year_id)
+        if not exam or not academic_year:
+            return None
         try:
             class_obj = Class.objects.get(id=class_id)
-            exam = Exam.objects.get(id=exam_id)
-            academic_year = AcademicYear.objects.get(id=academic_year_id)
-        except (Class.DoesNotExist, Exam.DoesNotExist, AcademicYear.DoesNotExist):
+        except Class.DoesNotExist:
             return None
         
-        # Get all students in class
-        students = StudentProfile.objects.filter(student_class=class_obj)
-        
-        # Get exam summaries for all students
-        summaries = StudentExamSummary.objects.filter(
-            student__student_class=class_obj,
-            exam=exam,
-            academic_year=academic_year
-        ).select_related('student__user').order_by('-total_marks_obtained')
-        
-        if not summaries.exists():
+        # Statistics, per-subject breakdown and rows come from two flat queries
+        analytics = PerformanceAnalytics.class_exam_statistics(
+            class_obj.id, exam.id, academic_year.id
+        )
+        if not analytics:
             return None
         
-        # Calculate class statistics
-        total_students = summaries.count()
-        avg_percentage = summaries.aggregate(Avg('percentage'))['percentage__avg'] or 0
-        highest_marks = summaries.aggregate(models.Max('total_marks_obtained'))['total_marks_obtained__max'] or 0
-        lowest_marks = summaries.aggregate(models.Min('total_marks_obtained'))['total_marks_obtained__min'] or 0
-        
-        # Grade distribution
-        grade_distribution = {}
-        for summary in summaries:
-            grade = summary.overall_grade
-            grade_distribution[grade] = grade_distribution.get(grade, 0) + 1
-        
+        stats = analytics['statistics']
         return {
             'class': class_obj.name,
             'exam': exam.name,
-            'total_students': total_students,
-            'average_percentage': round(avg_percentage, 2),
-            'highest_marks': float(highest_marks),
-            'lowest_marks': float(lowest_marks),
-            'grade_distribution': grade_distribution,
-            'student_summaries': [
-                {
-                    'student_name': summary.student.user.get_full_name(),
-                    'roll_number': summary.student.roll_number,
-                    'total_marks': float(summary.total_marks_obtained),
-                    'percentage': float(summary.percentage),
-                    'grade': summary.overall_grade,
-                    'rank': summary.class_rank
-                }
-                for summary in summaries
-            ]
+            'total_students': stats['count'],
+            'average_percentage': stats['mean'],
+            'highest_marks': analytics['highest_marks'],
+            'lowest_marks': analytics['lowest_marks'],
+            'grade_distribution': analytics['grade_distribution'],
+            'statistics': stats,
+            'subject_statistics': analytics['subject_statistics'],
+            'student_summaries': analytics['student_summaries']
         }
@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from apps.core.versioning import bump_on_change
+from .models import AcademicYear, ClassSubjectMapping, Exam, GradeScale, StudentMark, Subject
+from .ranking import RankingService
+from .reference import RESOURCE as REFERENCE_RESOURCE
+
+
+@receiver([post_save, post_delete], sender=StudentMark)
+def invalidate_rankings_on_mark_change(sender, instance, **kwargs):
+    """Marks feed class rankings; any write makes the cached ranks stale"""
+    RankingService.invalidate(instance.exam_id, instance.academic_year_id)
+
+
+# Academic years, exams, subjects, mappings and grade scales are served from
+# ReferenceData; any write makes every process reload its snapshot
+bump_on_change(REFERENCE_RESOURCE, AcademicYear, Exam, Subject, ClassSubjectMapping, GradeScale)
@@ -0,0 +1,37 @@
+from apps.jobs.registry import task
+from apps.students.models import StudentProfile
+from .grading import GradingEngine
+from .reference import ReferenceData
+from .services import GradingService
+
+
+def _academic_year_id(academic_year_id):
+    if academic_year_id:
+        return academic_year_id
+    current = ReferenceData.current_academic_year()
+    if not current:
+        raise ValueError('No current academic year found')
+    return current.id
+
+
+@task('assessments.regrade')
+def regrade(job, academic_year_id=None, chunk_size=2000):
+    """Recompute grades of an academic year after GradeScale changes"""
+    return GradingEngine.regrade_academic_year(_academic_year_id(academic_year_id), chunk_size=chunk_size)
+
+
+@task('assessments.report_cards')
+def report_cards(job, class_id, academic_year_id=None):
+    """Report cards (and refreshed exam summaries) for every student of a class"""
+    academic_year_id = _academic_year_id(academic_year_id)
+    student_ids = list(StudentProfile.objects.filter(
+        student_class_id=class_id
+    ).order_by('roll_number').values_list('id', flat=True))
+    
+    cards = []
+    for done, student_id in enumerate(student_ids, start=1):
+        card = GradingService.get_student_report_card(student_id, academic_year_id)
+        if card:
+            cards.append(card)
+        job.set_progress(done * 100 // len(student_ids), f'{done}/{len(student_ids)} students')
+    return {'class_id': class_id, 'academic_year_id': academic_year_id, 'report_cards': cards}
@@ -1,6 +1,11 @@
 from django.test import TestCase
+from django.core.cache import cache
+from rest_framework.test import APIClient
 from .models import *
 from .services import GradingService
+from .ranking import RankingService
+from .grading import GradeTable, GradingEngine
+from .reference import ReferenceData
 from apps.students.models import StudentProfile, Class
 from apps.users.models import User
 
@@ -31,3 +36,246 @@ class AssessmentTestCase(TestCase):
         grade, gp = GradingService.get_grade_from_percentage(85, '1-5', 'FA')
         self.assertIsNotNone(grade)
         print(f"Grade for 85% in 1-5 FA: {grade} (GP: {gp})")
+
+
+class ClassPerformanceAnalyticsTestCase(TestCase):
+    def setUp(self):
+        self.academic_year = AcademicYear.objects.create(
+            name="2024-2025",
+            start_date="2024-06-01",
+            end_date="2025-05-31",
+            is_current=True
+        )
+        self.exam = Exam.objects.create(name="SA1", exam_type="SA", order=1)
+        self.maths = Subject.objects.create(name="Mathematics", code="MATH")
+        self.english = Subject.objects.create(name="English", code="ENG")
+        self.class_obj = Class.objects.create(name="7th", class_group="6-10")
+        
+        for roll, (percentage, grade) in enumerate([(95, 'A1'), (85, 'A2'), (55, 'C1'), (45, 'C2')], start=1):
+            user = User.objects.create(username=f"student{roll}", first_name=f"Student{roll}")
+            student = StudentProfile.objects.create(
+                user=user, student_class=self.class_obj, roll_number=str(roll),
+                mother_phone='', father_phone=''
+            )
+            StudentExamSummary.objects.create(
+                student=student, exam=self.exam, academic_year=self.academic_year,
+                total_marks_obtained=percentage * 2, total_max_marks=200,
+                percentage=percentage, overall_grade=grade, class_rank=roll
+            )
+            for subject in (self.maths, self.english):
+                StudentMark.objects.create(
+                    student=student, subject=subject, exam=self.exam,
+                    academic_year=self.academic_year,
+                    marks_obtained=percentage, max_marks=100,
+                    is_absent=(roll == 4 and subject == self.english)
+                )
+    
+    def test_class_statistics(self):
+        """Summary statistics and per-subject breakdown in one payload"""
+        ReferenceData.current_academic_year()  # warm the reference snapshot
+        with self.assertNumQueries(3):  # class lookup + 2 analytics queries
+            summary = GradingService.get_class_performance_summary(
+                self.class_obj.id, self.exam.id, self.academic_year.id
+            )
+        
+        stats = summary['statistics']
+        self.assertEqual(summary['total_students'], 4)
+        self.assertEqual(stats['mean'], 70.0)
+        self.assertEqual(stats['median'], 70.0)
+        self.assertEqual(stats['percentiles']['p25'], 52.5)
+        self.assertEqual(summary['highest_marks'], 190.0)
+        self.assertEqual(summary['lowest_marks'], 90.0)
+        self.assertEqual(summary['grade_distribution'], {'A1': 1, 'A2': 1, 'C1': 1, 'C2': 1})
+        self.assertEqual(sum(b['count'] for b in stats['histogram']), 4)
+        self.assertEqual(summary['student_summaries'][0]['student_name'], 'Student1')
+        
+        english = next(s for s in summary['subject_statistics'] if s['subject'] == 'English')
+        self.assertEqual(english['count'], 3)
+        self.assertEqual(english['absent_count'], 1)
+
+
+class RankingServiceTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.academic_year = AcademicYear.objects.create(
+            name="2024-2025", start_date="2024-06-01", end_date="2025-05-31", is_current=True
+        )
+        self.exam = Exam.objects.create(name="FA1", exam_type="FA", order=1)
+        self.subject = Subject.objects.create(name="Mathematics", code="MATH")
+        self.class_obj = Class.objects.create(name="6th", class_group="6-10")
+        self.students = []
+        for roll, marks in enumerate([40, 45, 40, 30], start=1):
+            user = User.objects.create(username=f"rank{roll}")
+            student = StudentProfile.objects.create(
+                user=user, student_class=self.class_obj, roll_number=str(roll),
+                mother_phone='', father_phone=''
+            )
+            StudentMark.objects.create(
+                student=student, subject=self.subject, exam=self.exam,
+                academic_year=self.academic_year, marks_obtained=marks, max_marks=50
+            )
+            self.students.append(student)
+    
+    def test_competition_and_dense_ranks(self):
+        ranking = RankingService.get_class_ranks(self.class_obj.id, self.exam.id, self.academic_year.id)
+        ranks = ranking['ranks']
+        self.assertEqual(ranking['class_size'], 4)
+        self.assertEqual(ranks[self.students[1].id]['rank'], 1)
+        self.assertEqual(ranks[self.students[0].id]['rank'], 2)
+        self.assertEqual(ranks[self.students[2].id]['rank'], 2)
+        self.assertEqual(ranks[self.students[3].id]['rank'], 4)
+        self.assertEqual(ranks[self.students[3].id]['dense_rank'], 3)
+    
+    def test_marked_only_leaves_out_students_without_marks(self):
+        newcomer = StudentProfile.objects.create(
+            user=User.objects.create(username="newcomer"), student_class=self.class_obj,
+            roll_number="5", mother_phone='', father_phone=''
+        )
+        ranking = RankingService.get_class_ranks(self.class_obj.id, self.exam.id, self.academic_year.id)
+        self.assertEqual((ranking['class_size'], ranking['ranks'][newcomer.id]['rank']), (5, 5))
+        
+        marked = RankingService.get_class_ranks(
+            self.class_obj.id, self.exam.id, self.academic_year.id, marked_only=True
+        )
+        self.assertEqual(marked['class_size'], 4)
+        self.assertNotIn(newcomer.id, marked['ranks'])
+        self.assertEqual(marked['ranks'][self.students[3].id]['rank'], 4)
+    
+    def test_student_marks_need_a_current_academic_year(self):
+        AcademicYear.objects.update(is_current=False)
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username="teacher", role="teacher"))
+        response = client.get(f'/api/assessments/marks/student/{self.students[0].id}/exam/{self.exam.id}/')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['message'], 'No current academic year found')
+    
+    def test_cached_until_marks_change(self):
+        RankingService.get_class_ranks(self.class_obj.id, self.exam.id, self.academic_year.id)
+        with self.assertNumQueries(0):
+            entry, _ = RankingService.get_student_rank(self.students[3], self.exam.id, self.academic_year.id)
+        self.assertEqual(entry['rank'], 4)
+        
+        mark = StudentMark.objects.get(student=self.students[3])
+        mark.marks_obtained = 50
+        with self.captureOnCommitCallbacks(execute=True):
+            mark.save()
+        entry, _ = RankingService.get_student_rank(self.students[3], self.exam.id, self.academic_year.id)
+        self.assertEqual(entry['rank'], 1)
+
+
+class CombinedSubjectGradingTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        ReferenceData.clear()
+        self.academic_year = AcademicYear.objects.create(
+            name="2024-2025", start_date="2024-06-01", end_date="2025-05-31", is_current=True
+        )
+        self.exam = Exam.objects.create(name="SA1", exam_type="SA", order=1)
+        self.physical = Subject.objects.create(name="Physical Science", code="PHY")
+        self.natural = Subject.objects.create(name="Natural Science", code="NAT")
+        self.class_obj = Class.objects.create(name="9th", class_group="6-10")
+        self.student = StudentProfile.objects.create(
+            user=User.objects.create(username="science"), student_class=self.class_obj,
+            roll_number="1", mother_phone='', father_phone=''
+        )
+        for min_marks, max_marks, grade, gp in [(81, 90, 'A2', 9), (41, 50, 'C2', 5), (35, 40, 'D1', 4)]:
+            GradeScale.objects.create(
+                class_group='6-10', exam_type='SA', min_marks=min_marks,
+                max_marks=max_marks, grade=grade, grade_point=gp
+            )
+    
+    def test_grade_table_matches_ranges(self):
+        table = GradeTable.load()
+        self.assertEqual(table.lookup('6-10', 'SA', 85)[0], 'A2')
+        self.assertEqual(table.lookup('6-10', 'SA', 40)[0], 'D1')
+        self.assertEqual(table.lookup('6-10', 'SA', 60)[0], 'D2')  # gap falls back
+    
+    def test_sheet_grades_both_partners_together(self):
+        entries = [
+            {'student': self.student, 'subject': self.physical, 'marks_obtained': 40, 'max_marks': 50},
+            {'student': self.student, 'subject': self.natural, 'marks_obtained': 45, 'max_marks': 50},
+        ]
+        GradingEngine.save_marks(entries, self.exam, self.academic_year)
+        grades = set(StudentMark.objects.values_list('grade', flat=True))
+        self.assertEqual(grades, {'A2'})
+    
+    def test_partner_outside_batch_is_regraded(self):
+        GradingEngine.save_marks(
+            [{'student': self.student, 'subject': self.natural, 'marks_obtained': 45, 'max_marks': 50}],
+            self.exam, self.academic_year
+        )
+        self.assertEqual(StudentMark.objects.get(subject=self.natural).grade, 'C2')
+        
+        GradingEngine.save_marks(
+            [{'student': self.student, 'subject': self.physical, 'marks_obtained': 40, 'max_marks': 50}],
+            self.exam, self.academic_year
+        )
+        self.assertEqual(StudentMark.objects.get(subject=self.natural).grade, 'A2')
+        self.assertEqual(StudentMark.objects.get(subject=self.physical).grade, 'A2')
+    
+    def test_regrade_after_scale_change(self):
+        GradingEngine.save_marks([
+            {'student': self.student, 'subject': self.physical, 'marks_obtained': 40, 'max_marks': 50},
+            {'student': self.student, 'subject': self.natural, 'marks_obtained': 45, 'max_marks': 50},
+        ], self.exam, self.academic_year)
+        StudentExamSummary.objects.create(
+            student=self.student, exam=self.exam, academic_year=self.academic_year,
+            percentage=85, overall_grade='A2', overall_grade_point=9
+        )
+        
+        GradeScale.objects.filter(grade='A2').update(grade='A1', grade_point=10)
+        report = GradingEngine.regrade_academic_year(self.academic_year.id, chunk_size=1)
+        
+        self.assertEqual(report['marks_changed'], 2)
+        self.assertEqual(report['summaries_changed'], 1)
+        self.assertEqual(set(StudentMark.objects.values_list('grade', flat=True)), {'A1'})
+        self.assertEqual(StudentExamSummary.objects.get().overall_grade, 'A1')
+        
+        # A second pass finds nothing stale
+        self.assertEqual(GradingEngine.regrade_academic_year(self.academic_year.id)['marks_changed'], 0)
+
+
+class ReferenceDataTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        ReferenceData.clear()
+        self.academic_year = AcademicYear.objects.create(
+            name="2024-2025", start_date="2024-06-01", end_date="2025-05-31", is_current=True
+        )
+        self.exam = Exam.objects.create(name="FA1", exam_type="FA", order=1)
+        self.subject = Subject.objects.create(name="Mathematics", code="MATH")
+        self.class_obj = Class.objects.create(name="7th", class_group="6-10")
+        ClassSubjectMapping.objects.create(
+            student_class=self.class_obj, subject=self.subject,
+            academic_year=self.academic_year, is_main_subject=True
+        )
+    
+    def test_snapshot_is_reused_until_reference_data_changes(self):
+        self.assertEqual(ReferenceData.current_academic_year(), self.academic_year)
+        
+        with self.assertNumQueries(0):
+            self.assertEqual(ReferenceData.exam(self.exam.id).name, "FA1")
+            self.assertEqual(ReferenceData.subject_by_name("Mathematics"), self.subject)
+            mappings = ReferenceData.class_subjects(self.class_obj.id, self.academic_year.id, main_only=True)
+            self.assertEqual([m.subject.name for m in mappings], ["Mathematics"])
+        
+        self.exam.name = "FA-1"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.exam.save()
+        self.assertEqual(ReferenceData.exam(self.exam.id).name, "FA-1")
+    
+    def test_exam_list_revalidates_without_queries(self):
+        response = self.client.get('/api/assessments/exams/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('max-age=300', response['Cache-Control'])
+        etag = response['ETag']
+        
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/assessments/exams/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            Exam.objects.create(name="FA2", exam_type="FA", order=2)
+        response = self.client.get('/api/assessments/exams/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['exams']), 2)
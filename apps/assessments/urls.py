@@ -14,6 +14,7 @@ urlpatterns = [
     
     # Enter marks
     path('marks/enter/', api_views.enter_marks, name='enter_marks'),
+    path('marks/student/<int:student_id>/exam/<int:exam_id>/', api_views.get_student_marks, name='student_exam_marks'),
     
     # Get dropdowns data
     path('classes/', views.ClassListAPIView.as_view(), name='class_list'),
@@ -22,6 +23,7 @@ urlpatterns = [
     path('exams/', views.ExamListAPIView.as_view(), name='exam_list'),
     path('marks/', views.save_marks_sheet, name='save_marks'),
     path('class-results/', views.get_class_results, name='class_results'),
+    path('class-performance/', api_views.get_class_performance, name='class_performance'),
     path('init-class-orders/', views.initialize_class_orders, name='init_class_orders'),
     path('', include('apps.assessments.api_urls')),
 ]
@@ -8,6 +8,9 @@ from .models import *
 from django.db.models import Sum, Avg, Count, Q, IntegerField
 from django.db.models.functions import Cast
 from .serializers import *
+from .ranking import RankingService
+from .grading import GradingEngine
+from .reference import ReferenceData, RESOURCE as REFERENCE_RESOURCE
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
@@ -15,6 +18,10 @@ from django.views.decorators.csrf import csrf_exempt
 import json
 from .models import *
 from apps.students.models import Class, StudentProfile
+from apps.students.roster import ClassRoster, RESOURCE as ROSTER_RESOURCE
+from apps.core.http import conditional_get
+from apps.core.versioning import bump_version
+from django.utils.decorators import method_decorator
 from decimal import Decimal
 
 
@@ -22,8 +29,8 @@ from decimal import Decimal
 def marks_entry_sheet(request):
     """Excel-like marks entry interface"""
     classes = Class.objects.all().order_by('name')
-    exams = Exam.objects.all().order_by('order')
-    academic_year = AcademicYear.objects.filter(is_current=True).first()
+    exams = sorted(ReferenceData.exams(), key=lambda exam: exam.order)
+    academic_year = ReferenceData.current_academic_year()
     
     context = {
         'classes': classes,
@@ -42,9 +49,11 @@ def get_marks_sheet_data(request):
         exam_id = data.get('exam_id')
         
         try:
-            academic_year = AcademicYear.objects.filter(is_current=True).first()
+            academic_year = ReferenceData.current_academic_year()
             selected_class = Class.objects.get(id=class_id)
-            selected_exam = Exam.objects.get(id=exam_id)
+            selected_exam = ReferenceData.exam(exam_id)
+            if not selected_exam:
+                raise Exam.DoesNotExist('Exam matching query does not exist.')
             class_group = selected_class.class_group
             max_marks = selected_exam.get_max_marks(class_group)
             # Get students in this class - sort numerically by roll_number
@@ -58,10 +67,9 @@ def get_marks_sheet_data(request):
             ).order_by('roll_int')
             
             # Get subjects for this class
-            subjects_list = ClassSubjectMapping.objects.filter(
-                student_class=selected_class,
-                academic_year=academic_year
-            ).select_related('subject')
+            subjects_list = ReferenceData.class_subjects(
+                selected_class.id, academic_year.id if academic_year else None
+            )
             
             # Custom sorting for subjects
             subject_order = {
@@ -136,33 +144,40 @@ def save_marks_sheet(request):
         data = json.loads(request.body)
         
         try:
-            academic_year = AcademicYear.objects.filter(is_current=True).first()
-            exam = Exam.objects.get(id=data['exam_id'])
+            academic_year = ReferenceData.current_academic_year()
+            exam = ReferenceData.exam(data['exam_id'])
+            if not exam:
+                raise Exam.DoesNotExist('Exam matching query does not exist.')
+            
+            # Load every student and subject on the sheet up front
+            students = StudentProfile.objects.select_related('student_class').in_bulk(list(data['marks'].keys()))
+            subject_ids = {subject_id for subjects_marks in data['marks'].values() for subject_id in subjects_marks}
+            subjects = {
+                subject.id: subject
+                for subject in map(ReferenceData.subject, subject_ids) if subject
+            }
             
+            entries = []
             for student_id, subjects_marks in data['marks'].items():
-                student = StudentProfile.objects.get(id=student_id)
+                student = students[int(student_id)]
                 class_group = student.student_class.class_group
                 
                 for subject_id, mark_data in subjects_marks.items():
-                    subject = Subject.objects.get(id=subject_id)
-                    
-                    max_marks = exam.get_max_marks(class_group, subject)
-                    # Update or create mark
-                    StudentMark.objects.update_or_create(
-                        student=student,
-                        exam=exam,
-                        subject=subject,
-                        academic_year=academic_year,
-                        defaults={
-                            'marks_obtained': Decimal(str(mark_data)) if mark_data else 0,
-                            'max_marks': max_marks,
-                            'recorded_by': request.user if request.user.is_authenticated else None
-                        }
-                    )
+                    subject = subjects[int(subject_id)]
+                    entries.append({
+                        'student': student,
+                        'subject': subject,
+                        'marks_obtained': Decimal(str(mark_data)) if mark_data else 0,
+                        'max_marks': exam.get_max_marks(class_group, subject),
+                    })
+            
+            # Upsert and grade the whole sheet in one pass (combined subjects included)
+            GradingEngine.save_marks(
+                entries, exam, academic_year,
+                entered_by=request.user if request.user.is_authenticated else None
+            )
             
             # Update summaries for all students in this class/exam
-            academic_year = AcademicYear.objects.filter(is_current=True).first()
-            exam = Exam.objects.get(id=data['exam_id'])
             student_ids = data['marks'].keys()
             
             for s_id in student_ids:
@@ -237,34 +252,38 @@ def initialize_class_orders(request):
     for name, order in order_map.items():
         count = Class.objects.filter(name__icontains=name).update(order=order)
         updated += count
+    # update() skips the signals that keep the cached roster and its ETags fresh
+    bump_version(ROSTER_RESOURCE)
     return Response({'success': True, 'updated': updated})
 
+@method_decorator(conditional_get(ROSTER_RESOURCE, max_age=300, private=False), name='get')
 class ClassListAPIView(APIView):
     """GET /api/assessments/classes/ - List all classes with student counts"""
     permission_classes = [AllowAny]
     
     def get(self, request):
-        # Now relies on Meta: ordering = ['order', 'name']
-        classes = Class.objects.all()
+        # Meta ordering ['order', 'name'], counts annotated in one cached query
+        classes = ClassRoster.summary()
         
         classes_data = []
         for cls in classes:
             classes_data.append({
-                'id': str(cls.id),           # ✅ Use database ID (always unique)
-                'name': cls.name,            # ✅ Use actual class name
-                'displayName': cls.name,     # ✅ Display actual name
-                'studentCount': cls.studentprofile_set.count()
+                'id': str(cls['id']),           # ✅ Use database ID (always unique)
+                'name': cls['name'],            # ✅ Use actual class name
+                'displayName': cls['name'],     # ✅ Display actual name
+                'studentCount': cls['student_count']
             })
         
         return Response({'classes': classes_data})
 
 
+@method_decorator(conditional_get(REFERENCE_RESOURCE, max_age=300, private=False), name='get')
 class ExamListAPIView(APIView):
     """GET /api/assessments/exams/ - List all exams"""
     permission_classes = [AllowAny]
     
     def get(self, request):
-        exams = Exam.objects.all().order_by('order')
+        exams = sorted(ReferenceData.exams(), key=lambda exam: exam.order)
         return Response({
             'exams': [{
                 'id': e.id,
@@ -275,12 +294,13 @@ class ExamListAPIView(APIView):
         })
 
 
+@method_decorator(conditional_get(REFERENCE_RESOURCE, max_age=300, private=False), name='get')
 class SubjectListAPIView(APIView):
     """GET /api/assessments/subjects/ - List all subjects"""
     permission_classes = [AllowAny]
     
     def get(self, request):
-        subjects = Subject.objects.all().order_by('name')
+        subjects = sorted(ReferenceData.subjects(), key=lambda subject: subject.name)
         return Response({
             'subjects': [{
                 'id': s.id,
@@ -339,7 +359,7 @@ class StudentMarksDetailAPIView(APIView):
             # ✅ Use student ID directly (no complex parsing needed)
             student = StudentProfile.objects.get(id=student_id)
             
-            academic_year = AcademicYear.objects.filter(is_current=True).first()
+            academic_year = ReferenceData.current_academic_year()
             if not academic_year:
                 return Response({'error': 'No active academic year found'}, status=400)
 
@@ -371,10 +391,7 @@ class StudentMarksDetailAPIView(APIView):
         ).select_related('subject', 'exam')
         
         # Get all subjects for this class
-        class_subjects = ClassSubjectMapping.objects.filter(
-            student_class=student.student_class,
-            academic_year=academic_year
-        ).select_related('subject')
+        class_subjects = ReferenceData.class_subjects(student.student_class_id, academic_year.id)
         
         subjects_data = []
         
@@ -411,7 +428,9 @@ class StudentMarksDetailAPIView(APIView):
         
         for exam_name in ['FA1', 'FA2', 'FA3', 'FA4', 'SA1', 'SA2']:
             try:
-                exam = Exam.objects.get(name=exam_name)
+                exam = ReferenceData.exam_by_name(exam_name)
+                if not exam:
+                    raise Exam.DoesNotExist
                 
                 # Get marks for this exam
                 exam_marks = StudentMark.objects.filter(
@@ -438,7 +457,7 @@ class StudentMarksDetailAPIView(APIView):
                         'percentage': round(percentage, 2),
                         'grade': grade,
                         'classRank': class_rank,
-                        'totalStudents': student.student_class.studentprofile_set.count()
+                        'totalStudents': ClassRoster.student_count(student.student_class_id)
                     })
                 
             except Exam.DoesNotExist:
@@ -459,30 +478,11 @@ class StudentMarksDetailAPIView(APIView):
     
     def calculate_class_rank(self, student, exam, academic_year):
         """Calculate student's rank in class for this exam"""
-        # This is a simplified ranking - you can enhance it
-        # Get all students' totals for this exam in this class
-        class_students = StudentProfile.objects.filter(student_class=student.student_class)
-        
-        student_totals = []
-        for cls_student in class_students:
-            cls_marks = StudentMark.objects.filter(
-                student=cls_student,
-                exam=exam,
-                academic_year=academic_year
-            )
-            if cls_marks.exists():
-                total = sum(float(m.marks_obtained) for m in cls_marks)
-                student_totals.append((cls_student.id, total))
-        
-        # Sort by total marks (highest first)
-        student_totals.sort(key=lambda x: x[1], reverse=True)
-        
-        # Find rank
-        for rank, (student_id, total) in enumerate(student_totals, 1):
-            if student_id == student.id:
-                return rank
-        
-        return 1  # Default rank
+        # Only students with marks in the exam are ranked; one without any counts as first
+        rank_entry, class_size = RankingService.get_student_rank(
+            student, exam.id, academic_year.id, marked_only=True
+        )
+        return rank_entry['rank'] if rank_entry else 1
     
     def get_class_config(self, student_class):
         """Get class configuration based on class group"""
@@ -1,8 +1,9 @@
 from django.contrib import admin
+from django.db.models import Count, Q
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
-from .models import AttendanceSession, AttendanceRecord
+from .models import AttendanceSession, AttendanceRecord, SchoolCalendar
 
 class AttendanceRecordInline(admin.TabularInline):
     model = AttendanceRecord
@@ -15,6 +16,9 @@ class AttendanceRecordInline(admin.TabularInline):
             return f"{obj.student.user.first_name} {obj.student.user.last_name} (Roll: {obj.student.roll_number})"
         return "-"
     student_info.short_description = "Student"
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('student__user')
 
 @admin.register(AttendanceSession)
 class AttendanceSessionAdmin(admin.ModelAdmin):
@@ -22,32 +26,40 @@ class AttendanceSessionAdmin(admin.ModelAdmin):
     list_filter = ['date', 'session', 'student_class', 'teacher']
     search_fields = ['student_class__name', 'teacher__username']
     date_hierarchy = 'date'
+    list_select_related = ['student_class', 'teacher']
     inlines = [AttendanceRecordInline]
     
+    def get_queryset(self, request):
+        # Counts for every row come from the changelist query itself
+        return super().get_queryset(request).annotate(
+            total_records=Count('records'),
+            present_records=Count('records', filter=Q(records__is_present=True)),
+            absent_records=Count('records', filter=Q(records__is_present=False))
+        )
+    
     def total_students(self, obj):
-        return obj.records.count()
+        return obj.total_records
     total_students.short_description = "Total Students"
+    total_students.admin_order_field = 'total_records'
     
     def present_count(self, obj):
-        count = obj.records.filter(is_present=True).count()
-        return format_html('<span style="color: green; font-weight: bold;">{}</span>', count)
+        return format_html('<span style="color: green; font-weight: bold;">{}</span>', obj.present_records)
     present_count.short_description = "Present"
+    present_count.admin_order_field = 'present_records'
     
     def absent_count(self, obj):
-        count = obj.records.filter(is_present=False).count()
-        if count > 0:
-            return format_html('<span style="color: red; font-weight: bold;">{}</span>', count)
-        return count
+        if obj.absent_records > 0:
+            return format_html('<span style="color: red; font-weight: bold;">{}</span>', obj.absent_records)
+        return obj.absent_records
     absent_count.short_description = "Absent"
+    absent_count.admin_order_field = 'absent_records'
     
     def attendance_percentage(self, obj):
-        total = obj.records.count()
-        if total == 0:
+        if obj.total_records == 0:
             return "0%"
-        present = obj.records.filter(is_present=True).count()
-        percentage = (present / total) * 100
+        percentage = (obj.present_records / obj.total_records) * 100
         color = "green" if percentage >= 80 else "orange" if percentage >= 60 else "red"
-        return format_html('<span style="color: {}; font-weight: bold;">{:.1f}%</span>', color, percentage)
+        return format_html('<span style="color: {}; font-weight: bold;">{}%</span>', color, f"{percentage:.1f}")
     attendance_percentage.short_description = "Attendance %"
 
 @admin.register(AttendanceRecord)
@@ -81,3 +93,11 @@ class AttendanceRecordAdmin(admin.ModelAdmin):
         return super().get_queryset(request).select_related(
             'student__user', 'student__student_class', 'session__student_class'
         )
+
+@admin.register(SchoolCalendar)
+class SchoolCalendarAdmin(admin.ModelAdmin):
+    list_display = ['date', 'academic_year', 'is_school_day', 'description']
+    list_filter = ['academic_year', 'is_school_day']
+    list_editable = ['is_school_day', 'description']
+    search_fields = ['description']
+    date_hierarchy = 'date'
@@ -1,8 +1,11 @@
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
+from rest_framework import status
 from datetime import datetime
 from django.shortcuts import get_object_or_404
 from apps.students.models import Class, StudentProfile
+from apps.students.roster import ClassRoster
+from .models import AbsenteeismFlag
 from .services import AttendanceCalculator
 
 @api_view(['GET'])
@@ -82,14 +85,47 @@ def class_attendance_today(request, class_id):
 @api_view(['GET'])
 def classes_list(request):
     """API: List all classes with student count"""
-    classes = Class.objects.all() # Meta ordering
+    classes = ClassRoster.summary() # Meta ordering, counts annotated
     return Response({
         'classes': [
             {
-                'id': cls.id,
-                'name': cls.name,
-                'student_count': cls.studentprofile_set.count()
+                'id': cls['id'],
+                'name': cls['name'],
+                'student_count': cls['student_count']
             }
             for cls in classes
         ]
     })
+
+@api_view(['GET'])
+def absenteeism_flags(request):
+    """API: Students flagged by the nightly absenteeism job (?class_id= to filter)"""
+    flags = AbsenteeismFlag.objects.select_related('student__user', 'student__student_class')
+    class_id = request.GET.get('class_id')
+    if class_id and not class_id.isdigit():
+        return Response({
+            'success': False,
+            'message': 'class_id must be a number'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if class_id:
+        flags = flags.filter(student__student_class_id=class_id)
+    
+    return Response({
+        'success': True,
+        'flags': [
+            {
+                'student_id': flag.student_id,
+                'name': flag.student.user.get_full_name() or flag.student.user.username,
+                'roll_number': flag.student.roll_number,
+                'class': flag.student.student_class.name if flag.student.student_class else None,
+                'current_streak': flag.current_streak,
+                'longest_streak': flag.longest_streak,
+                'attendance_rate': float(flag.attendance_rate),
+                'window_days': flag.window_days,
+                'is_streak': flag.is_streak,
+                'is_low_rate': flag.is_low_rate,
+                'computed_for': flag.computed_for.strftime('%Y-%m-%d'),
+            }
+            for flag in flags
+        ]
+    })
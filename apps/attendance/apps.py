@@ -4,4 +4,6 @@ from django.apps import AppConfig
 class AttendanceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.attendance'
- 
\ No newline at end of file
+ 
+    def ready(self):
+        from . import signals  # noqa: F401
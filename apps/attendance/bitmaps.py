@@ -0,0 +1,209 @@
+import calendar
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import date
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from apps.core.versioning import bump_version
+from apps.students.models import StudentProfile
+from .models import AttendanceMonth, AttendanceRecord
+
+SESSIONS = ('morning', 'afternoon')
+
+_state = threading.local()
+
+
+def bitmaps_enabled():
+    """Reads use AttendanceMonth unless ATTENDANCE_BITMAPS is switched off"""
+    return getattr(settings, 'ATTENDANCE_BITMAPS', True)
+
+
+def day_bit(day):
+    return 1 << (day.day - 1)
+
+
+def range_mask(year, month, start_date=None, end_date=None):
+    """Bits of the days of a month that fall inside [start_date, end_date]"""
+    first = 1 if not start_date or (start_date.year, start_date.month) < (year, month) else start_date.day
+    last = calendar.monthrange(year, month)[1]
+    if end_date and (end_date.year, end_date.month) == (year, month):
+        last = end_date.day
+    elif end_date and (end_date.year, end_date.month) < (year, month):
+        return 0
+    if first > last:
+        return 0
+    return ((1 << last) - 1) & ~((1 << (first - 1)) - 1)
+
+
+def weekday_mask(year, month):
+    """Bits of Monday-Friday in a month"""
+    mask = 0
+    for day in range(1, calendar.monthrange(year, month)[1] + 1):
+        if date(year, month, day).weekday() < 5:
+            mask |= 1 << (day - 1)
+    return mask
+
+
+def iter_months(start_date, end_date):
+    year, month = start_date.year, start_date.month
+    while (year, month) <= (end_date.year, end_date.month):
+        yield year, month
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+class AttendanceBitmaps:
+    """Maintain and read the packed per-month attendance of students"""
+
+    @staticmethod
+    def _fields(session):
+        return f'{session}_bits', f'{session}_recorded'
+
+    @staticmethod
+    def _ensure_rows(student_ids, year, month):
+        existing = set(AttendanceMonth.objects.filter(
+            student_id__in=student_ids, year=year, month=month
+        ).values_list('student_id', flat=True))
+        AttendanceMonth.objects.bulk_create([
+            AttendanceMonth(student_id=student_id, year=year, month=month)
+            for student_id in student_ids if student_id not in existing
+        ], ignore_conflicts=True)
+
+    @staticmethod
+    def mark(day, session, present_ids=(), absent_ids=()):
+        """Record students as present/absent for one session with two UPDATEs"""
+        present_ids, absent_ids = list(present_ids), list(absent_ids)
+        if not present_ids and not absent_ids:
+            return
+        bits, recorded = AttendanceBitmaps._fields(session)
+        bit = day_bit(day)
+        AttendanceBitmaps._ensure_rows(present_ids + absent_ids, day.year, day.month)
+
+        rows = AttendanceMonth.objects.filter(year=day.year, month=day.month)
+        if present_ids:
+            rows.filter(student_id__in=present_ids).update(**{
+                bits: F(bits).bitor(bit), recorded: F(recorded).bitor(bit)
+            })
+        if absent_ids:
+            rows.filter(student_id__in=absent_ids).update(**{
+                bits: F(bits).bitand(~bit), recorded: F(recorded).bitor(bit)
+            })
+
+    @staticmethod
+    def unmark(day, session, student_ids):
+        """Forget a session for students whose record was removed"""
+        bits, recorded = AttendanceBitmaps._fields(session)
+        bit = day_bit(day)
+        AttendanceMonth.objects.filter(
+            student_id__in=list(student_ids), year=day.year, month=day.month
+        ).update(**{bits: F(bits).bitand(~bit), recorded: F(recorded).bitand(~bit)})
+
+    @staticmethod
+    @contextmanager
+    def bulk_removal():
+        """Deletes inside this block are unmarked by the caller, so the post_delete handler skips them"""
+        _state.bulk_removal = getattr(_state, 'bulk_removal', 0) + 1
+        try:
+            yield
+        finally:
+            _state.bulk_removal -= 1
+
+    @staticmethod
+    def in_bulk_removal():
+        return getattr(_state, 'bulk_removal', 0) > 0
+
+    @staticmethod
+    def rebuild(student_ids=None, batch_size=2000):
+        """
+        Derive AttendanceMonth rows from AttendanceRecord (all students by default)
+        and drop the cached calendars of every class month that was rewritten.
+        """
+        from .services import StudentCalendar
+        records = AttendanceRecord.objects.all()
+        months = AttendanceMonth.objects.all()
+        if student_ids is not None:
+            records = records.filter(student_id__in=student_ids)
+            months = months.filter(student_id__in=student_ids)
+
+        packed = defaultdict(lambda: {'morning_bits': 0, 'afternoon_bits': 0,
+                                      'morning_recorded': 0, 'afternoon_recorded': 0})
+        for student_id, day, session, is_present in records.values_list(
+            'student_id', 'session__date', 'session__session', 'is_present'
+        ).iterator(chunk_size=batch_size):
+            row = packed[(student_id, day.year, day.month)]
+            bits, recorded = AttendanceBitmaps._fields(session)
+            row[recorded] |= day_bit(day)
+            if is_present:
+                row[bits] |= day_bit(day)
+
+        with transaction.atomic():
+            # Class months that had rows before, plus those that have rows now
+            affected = set(months.values_list('student__student_class_id', 'year', 'month').distinct())
+            classes = dict(StudentProfile.objects.filter(
+                id__in={student_id for student_id, _, _ in packed}
+            ).values_list('id', 'student_class_id'))
+            affected.update((classes.get(student_id), year, month) for student_id, year, month in packed)
+
+            months.delete()
+            AttendanceMonth.objects.bulk_create([
+                AttendanceMonth(student_id=student_id, year=year, month=month, **fields)
+                for (student_id, year, month), fields in packed.items()
+            ], batch_size=batch_size)
+            bump_version(*{
+                StudentCalendar.resource(class_id, year, month)
+                for class_id, year, month in affected if class_id is not None
+            })
+        return len(packed)
+
+    @staticmethod
+    def months(student_id, start_date, end_date):
+        """AttendanceMonth rows covering the range, keyed by (year, month)"""
+        rows = AttendanceMonth.objects.filter(student_id=student_id).filter(
+            year__gte=start_date.year, year__lte=end_date.year
+        )
+        wanted = set(iter_months(start_date, end_date))
+        return {(row.year, row.month): row for row in rows if (row.year, row.month) in wanted}
+
+    @staticmethod
+    def summarize(student_id, start_date, end_date, school_day_mask=weekday_mask):
+        """
+        Same counts and daily records as AttendanceCalculator, from popcounts.
+        school_day_mask(year, month) gives the bits of days that count as school days.
+        """
+        rows = AttendanceBitmaps.months(student_id, start_date, end_date)
+        totals = {'total_school_days': 0, 'full_present_days': 0, 'half_days': 0, 'absent_days': 0}
+        daily = {}
+
+        for year, month in iter_months(start_date, end_date):
+            in_range = range_mask(year, month, start_date, end_date)
+            school_days = school_day_mask(year, month) & in_range
+            row = rows.get((year, month))
+            morning = row.morning_bits if row else 0
+            afternoon = row.afternoon_bits if row else 0
+            recorded = (row.morning_recorded | row.afternoon_recorded) if row else 0
+
+            full = morning & afternoon & school_days
+            half = (morning ^ afternoon) & school_days
+            totals['total_school_days'] += school_days.bit_count()
+            totals['full_present_days'] += full.bit_count()
+            totals['half_days'] += half.bit_count()
+            totals['absent_days'] += school_days.bit_count() - full.bit_count() - half.bit_count()
+
+            # Daily records: every taken day plus school days without attendance
+            days = (recorded & in_range) | school_days
+            while days:
+                bit = days & -days
+                days ^= bit
+                day = date(year, month, bit.bit_length())
+                record = {'date': day, 'morning': None, 'afternoon': None, 'status': 'ABSENT'}
+                for session in SESSIONS:
+                    if row and getattr(row, f'{session}_recorded') & bit:
+                        record[session] = 'PRESENT' if getattr(row, f'{session}_bits') & bit else 'ABSENT'
+                if full & bit:
+                    record['status'] = 'FULL_PRESENT'
+                elif half & bit:
+                    record['status'] = 'HALF_DAY'
+                daily[day.strftime('%Y-%m-%d')] = record
+
+        return totals, dict(sorted(daily.items()))
@@ -0,0 +1,60 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from apps.assessments.models import AcademicYear
+from apps.attendance.models import SchoolCalendar
+from apps.attendance.school_calendar import RESOURCE
+from apps.core.versioning import bump_version
+
+
+class Command(BaseCommand):
+    help = 'Create SchoolCalendar days for an academic year (Monday-Friday as school days)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--academic-year', help='Academic year name or id (default: current year)')
+        parser.add_argument('--holiday', action='append', default=[], metavar='YYYY-MM-DD[:Name]',
+                            help='Mark a date as a holiday (repeatable)')
+    
+    def handle(self, *args, **options):
+        academic_year = self.get_academic_year(options['academic_year'])
+        holidays = {}
+        for value in options['holiday']:
+            day, _, name = value.partition(':')
+            holidays[day] = name or 'Holiday'
+        
+        days = []
+        day = academic_year.start_date
+        while day <= academic_year.end_date:
+            holiday = holidays.get(day.isoformat())
+            days.append(SchoolCalendar(
+                academic_year=academic_year,
+                date=day,
+                is_school_day=day.weekday() < 5 and holiday is None,
+                description=holiday or ('Weekend' if day.weekday() >= 5 else '')
+            ))
+            day += timedelta(days=1)
+        
+        # Existing days (and holidays edited in the admin) are left alone
+        created = SchoolCalendar.objects.bulk_create(days, ignore_conflicts=True)
+        if holidays:
+            SchoolCalendar.objects.filter(date__in=list(holidays)).update(is_school_day=False)
+            for day, name in holidays.items():
+                SchoolCalendar.objects.filter(date=day).update(description=name)
+        bump_version(RESOURCE)
+        
+        school_days = SchoolCalendar.objects.filter(academic_year=academic_year, is_school_day=True).count()
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {academic_year.name}: {len(created)} days processed, {school_days} school days"
+        ))
+    
+    def get_academic_year(self, value):
+        if not value:
+            academic_year = AcademicYear.objects.filter(is_current=True).first()
+            if not academic_year:
+                raise CommandError('❌ No current academic year found')
+            return academic_year
+        
+        lookup = {'id': value} if value.isdigit() else {'name': value}
+        try:
+            return AcademicYear.objects.get(**lookup)
+        except AcademicYear.DoesNotExist:
+            raise CommandError(f"❌ Academic year '{value}' not found")
@@ -0,0 +1,29 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand
+from apps.attendance.services import AbsenteeismDetector
+
+
+class Command(BaseCommand):
+    help = 'Flag absence streaks and low rolling attendance for every student (run nightly)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Evaluate up to this date, YYYY-MM-DD (default: today)')
+        parser.add_argument('--streak-days', type=int, default=3, help='Consecutive absent school days to flag')
+        parser.add_argument('--min-rate', type=float, default=75, help='Flag students below this attendance %%')
+        parser.add_argument('--window-days', type=int, default=20, help='Rolling window in school days')
+    
+    def handle(self, *args, **options):
+        as_of = datetime.strptime(options['date'], '%Y-%m-%d').date() if options['date'] else None
+        self.stdout.write("🔄 Detecting chronic absenteeism...")
+        
+        report = AbsenteeismDetector.run(
+            as_of,
+            streak_days=options['streak_days'],
+            min_rate=options['min_rate'],
+            window_days=options['window_days']
+        )
+        
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {report['flagged']} of {len(report['students'])} students flagged "
+            f"({report['window_start']} to {report['as_of']}, {report['window_days']} school days)"
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from apps.attendance.bitmaps import AttendanceBitmaps
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the packed monthly attendance (AttendanceMonth) from AttendanceRecord rows'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--student', type=int, action='append', help='Only this student id (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows read and written per batch')
+    
+    def handle(self, *args, **options):
+        self.stdout.write("🔄 Rebuilding attendance bitmaps...")
+        months = AttendanceBitmaps.rebuild(options['student'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"✅ Rebuilt {months} student-months"))
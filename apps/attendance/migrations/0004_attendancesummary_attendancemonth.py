@@ -0,0 +1,50 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0004_alter_class_options_class_order'),
+        ('attendance', '0003_attendancesession_attendancerecord_delete_attendance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('month', models.IntegerField()),
+                ('total_school_days', models.IntegerField(default=0)),
+                ('full_present_days', models.IntegerField(default=0)),
+                ('half_days', models.IntegerField(default=0)),
+                ('absent_days', models.IntegerField(default=0)),
+                ('percentage', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='students.studentprofile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['student', 'year', 'month'], name='attendance__student_a5697d_idx')],
+                'unique_together': {('student', 'year', 'month')},
+            },
+        ),
+        migrations.CreateModel(
+            name='AttendanceMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('month', models.IntegerField()),
+                ('morning_bits', models.IntegerField(default=0)),
+                ('afternoon_bits', models.IntegerField(default=0)),
+                ('morning_recorded', models.IntegerField(default=0)),
+                ('afternoon_recorded', models.IntegerField(default=0)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_months', to='students.studentprofile')),
+            ],
+            options={
+                'unique_together': {('student', 'year', 'month')},
+            },
+        ),
+    ]
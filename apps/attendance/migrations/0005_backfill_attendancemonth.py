@@ -0,0 +1,34 @@
+from collections import defaultdict
+from django.db import migrations
+
+
+def backfill(apps, schema_editor):
+    AttendanceRecord = apps.get_model('attendance', 'AttendanceRecord')
+    AttendanceMonth = apps.get_model('attendance', 'AttendanceMonth')
+
+    packed = defaultdict(lambda: {'morning_bits': 0, 'afternoon_bits': 0,
+                                  'morning_recorded': 0, 'afternoon_recorded': 0})
+    for student_id, day, session, is_present in AttendanceRecord.objects.values_list(
+        'student_id', 'session__date', 'session__session', 'is_present'
+    ).iterator(chunk_size=2000):
+        bit = 1 << (day.day - 1)
+        row = packed[(student_id, day.year, day.month)]
+        row[f'{session}_recorded'] |= bit
+        if is_present:
+            row[f'{session}_bits'] |= bit
+
+    AttendanceMonth.objects.bulk_create([
+        AttendanceMonth(student_id=student_id, year=year, month=month, **fields)
+        for (student_id, year, month), fields in packed.items()
+    ], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0004_attendancesummary_attendancemonth'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
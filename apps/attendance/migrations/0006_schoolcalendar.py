@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0002_academicyear_remove_bulkuploadjob_uploaded_by_and_more'),
+        ('attendance', '0005_backfill_attendancemonth'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchoolCalendar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('is_school_day', models.BooleanField(default=True)),
+                ('description', models.CharField(blank=True, max_length=100)),
+                ('academic_year', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='calendar_days', to='assessments.academicyear')),
+            ],
+            options={
+                'ordering': ['date'],
+                'indexes': [models.Index(fields=['is_school_day', 'date'], name='attendance__is_scho_9f53c8_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0004_alter_class_options_class_order'),
+        ('attendance', '0006_schoolcalendar'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AbsenteeismFlag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('computed_for', models.DateField()),
+                ('current_streak', models.IntegerField(default=0)),
+                ('longest_streak', models.IntegerField(default=0)),
+                ('window_days', models.IntegerField(default=0)),
+                ('attendance_rate', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('is_streak', models.BooleanField(default=False)),
+                ('is_low_rate', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='absenteeism_flags', to='students.studentprofile')),
+            ],
+            options={
+                'ordering': ['-current_streak', 'attendance_rate'],
+                'indexes': [models.Index(fields=['computed_for'], name='attendance__compute_08a01a_idx')],
+            },
+        ),
+    ]
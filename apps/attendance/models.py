@@ -85,3 +85,72 @@ class AttendanceSummary(models.Model):
     
     def __str__(self):
         return f"{self.student} - {self.year}/{self.month:02d}: {self.percentage}%"
+
+class AttendanceMonth(models.Model):
+    """
+    Compact attendance for one student and month: bit (day - 1) of each
+    field is one day. *_bits hold presence, *_recorded mark days that were
+    taken. Kept in step with AttendanceRecord (see bitmaps.py).
+    """
+    student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE, related_name='attendance_months')
+    year = models.IntegerField()
+    month = models.IntegerField()
+    morning_bits = models.IntegerField(default=0)
+    afternoon_bits = models.IntegerField(default=0)
+    morning_recorded = models.IntegerField(default=0)
+    afternoon_recorded = models.IntegerField(default=0)
+    
+    class Meta:
+        unique_together = ['student', 'year', 'month']
+    
+    def __str__(self):
+        return f"{self.student} - {self.year}/{self.month:02d}"
+
+class SchoolCalendar(models.Model):
+    """One row per calendar day of an academic year; holidays have is_school_day=False"""
+    academic_year = models.ForeignKey('assessments.AcademicYear', on_delete=models.CASCADE, related_name='calendar_days')
+    date = models.DateField(unique=True)
+    is_school_day = models.BooleanField(default=True)
+    description = models.CharField(max_length=100, blank=True)
+    
+    class Meta:
+        ordering = ['date']
+        indexes = [
+            models.Index(fields=['is_school_day', 'date']),
+        ]
+    
+    def __str__(self):
+        kind = "School day" if self.is_school_day else (self.description or "Holiday")
+        return f"{self.date} - {kind}"
+
+class AbsenteeismFlag(models.Model):
+    """Students flagged by the nightly absenteeism detector (replaced on every run)"""
+    student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE, related_name='absenteeism_flags')
+    computed_for = models.DateField()
+    current_streak = models.IntegerField(default=0)
+    longest_streak = models.IntegerField(default=0)
+    window_days = models.IntegerField(default=0)
+    attendance_rate = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    is_streak = models.BooleanField(default=False)
+    is_low_rate = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-current_streak', 'attendance_rate']
+        indexes = [
+            models.Index(fields=['computed_for']),
+        ]
+    
+    def __str__(self):
+        return f"{self.student} - streak {self.current_streak}, {self.attendance_rate}%"
+
+class AttendanceSyncReceipt(models.Model):
+    """Result of an offline sync item, keyed by the client's idempotency key"""
+    idempotency_key = models.CharField(max_length=100, unique=True)
+    teacher = models.ForeignKey('users.User', on_delete=models.CASCADE)
+    session = models.ForeignKey(AttendanceSession, on_delete=models.SET_NULL, null=True, blank=True)
+    result = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.idempotency_key} ({self.teacher})"
@@ -0,0 +1,165 @@
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+from django.db.models import Exists, OuterRef
+from apps.core.metrics import record_cache
+from apps.core.versioning import get_version
+from .models import AttendanceRecord, SchoolCalendar
+
+RESOURCE = 'school-calendar'
+
+
+def count_weekdays(start_date, end_date):
+    """Monday-Friday days in [start_date, end_date] without iterating"""
+    if end_date < start_date:
+        return 0
+    weeks, extra = divmod((end_date - start_date).days + 1, 7)
+    first = start_date.weekday()
+    return weeks * 5 + sum(1 for offset in range(extra) if (first + offset) % 7 < 5)
+
+
+def iter_weekdays(start_date, end_date):
+    day = start_date
+    while day <= end_date:
+        if day.weekday() < 5:
+            yield day
+        day += timedelta(days=1)
+
+
+class SchoolDays:
+    """
+    Sorted index of SchoolCalendar school days, cached per process and
+    reloaded when the calendar version changes. Dates outside every
+    calendar-covered academic year fall back to Monday-Friday.
+    """
+
+    _index = None
+    _version = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def _load(cls):
+        school_days, covered = [], {}
+        for academic_year_id, day, is_school_day in SchoolCalendar.objects.order_by('date').values_list(
+            'academic_year_id', 'date', 'is_school_day'
+        ):
+            if is_school_day:
+                school_days.append(day)
+            first, last = covered.get(academic_year_id, (day, day))
+            covered[academic_year_id] = (min(first, day), max(last, day))
+        return {'school_days': school_days, 'covered': sorted(covered.values())}
+
+    @classmethod
+    def _get(cls):
+        version = get_version(RESOURCE)
+        fresh = cls._index is not None and cls._version == version
+        record_cache('school_days', fresh)
+        if not fresh:
+            with cls._lock:
+                if cls._index is None or cls._version != version:
+                    cls._index = cls._load()
+                    cls._version = version
+        return cls._index
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._index = None
+            cls._version = None
+
+    @classmethod
+    def _segments(cls, start_date, end_date):
+        """Split a range into (start, end, covered_by_calendar) pieces"""
+        cursor = start_date
+        for first, last in cls._get()['covered']:
+            if last < cursor or first > end_date:
+                continue
+            if first > cursor:
+                yield cursor, first - timedelta(days=1), False
+            yield max(first, cursor), min(last, end_date), True
+            cursor = min(last, end_date) + timedelta(days=1)
+            if cursor > end_date:
+                return
+        if cursor <= end_date:
+            yield cursor, end_date, False
+
+    @classmethod
+    def count(cls, start_date, end_date):
+        """School days in [start_date, end_date]: two bisects per covered year"""
+        school_days = cls._get()['school_days']
+        total = 0
+        for first, last, covered in cls._segments(start_date, end_date):
+            if covered:
+                total += bisect_right(school_days, last) - bisect_left(school_days, first)
+            else:
+                total += count_weekdays(first, last)
+        return total
+
+    @classmethod
+    def dates(cls, start_date, end_date):
+        """School days in [start_date, end_date] in order"""
+        school_days = cls._get()['school_days']
+        result = []
+        for first, last, covered in cls._segments(start_date, end_date):
+            if covered:
+                result.extend(school_days[bisect_left(school_days, first):bisect_right(school_days, last)])
+            else:
+                result.extend(iter_weekdays(first, last))
+        return result
+
+    @classmethod
+    def window_start(cls, end_date, school_days):
+        """First day of the window holding the last `school_days` school days up to end_date"""
+        lookback = max(school_days * 2, 14)
+        while True:
+            days = cls.dates(end_date - timedelta(days=lookback), end_date)
+            if len(days) >= school_days or lookback > 730:
+                return days[-school_days] if len(days) >= school_days else end_date - timedelta(days=lookback)
+            lookback *= 2
+
+    @classmethod
+    def is_school_day(cls, day):
+        return cls.count(day, day) == 1
+
+    @classmethod
+    def month_mask(cls, year, month):
+        """Bit (day - 1) set for every school day of the month"""
+        first = date(year, month, 1)
+        last = (date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)) - timedelta(days=1)
+        mask = 0
+        for day in cls.dates(first, last):
+            mask |= 1 << (day.day - 1)
+        return mask
+
+    @classmethod
+    def absent_dates(cls, student_id, start_date, end_date):
+        """
+        School days without any present record for the student. Calendar
+        days come from one anti-join (NOT EXISTS) query; days outside the
+        calendar fall back to weekdays minus the student's present dates.
+        """
+        present = AttendanceRecord.objects.filter(
+            student_id=student_id,
+            is_present=True,
+            session__date=OuterRef('date')
+        )
+        absent = list(SchoolCalendar.objects.filter(
+            is_school_day=True,
+            date__gte=start_date,
+            date__lte=end_date
+        ).filter(~Exists(present)).values_list('date', flat=True))
+
+        uncovered = [
+            day
+            for first, last, covered in cls._segments(start_date, end_date) if not covered
+            for day in iter_weekdays(first, last)
+        ]
+        if uncovered:
+            present_dates = set(AttendanceRecord.objects.filter(
+                student_id=student_id,
+                is_present=True,
+                session__date__gte=uncovered[0],
+                session__date__lte=uncovered[-1]
+            ).values_list('session__date', flat=True))
+            absent.extend(day for day in uncovered if day not in present_dates)
+        return sorted(absent)
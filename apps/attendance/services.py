@@ -1,7 +1,17 @@
-from django.db.models import Count, Q
+import calendar
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q, Window
+from django.db.models.functions import Lag
 from django.utils import timezone
 from datetime import datetime, timedelta
-from .models import AttendanceRecord, AttendanceSession, AttendanceSummary
+from .models import AbsenteeismFlag, AttendanceRecord, AttendanceSession, AttendanceSummary, AttendanceSyncReceipt
+from .bitmaps import AttendanceBitmaps, bitmaps_enabled
+from .school_calendar import SchoolDays, RESOURCE as CALENDAR_RESOURCE
+from apps.core.metrics import record_cache, record_event
+from apps.core.versioning import bump_version, get_versions
 from apps.students.models import StudentProfile
 
 class AttendanceCalculator:
@@ -25,6 +35,22 @@ class AttendanceCalculator:
         if not end_date:
             end_date = timezone.now().date()
         
+        if bitmaps_enabled():
+            # Popcounts over the packed monthly bitmaps instead of scanning records
+            totals, daily_attendance = AttendanceBitmaps.summarize(
+                student.id, start_date, end_date, school_day_mask=SchoolDays.month_mask
+            )
+            total_present_value = totals['full_present_days'] + (totals['half_days'] * 0.5)
+            percentage = (total_present_value / totals['total_school_days'] * 100) if totals['total_school_days'] > 0 else 0
+            return {
+                'student': student,
+                'start_date': start_date,
+                'end_date': end_date,
+                **totals,
+                'attendance_percentage': round(percentage, 2),
+                'daily_records': daily_attendance
+            }
+        
         # Get all attendance records for this student in the date range
         records = AttendanceRecord.objects.get_student_attendance(
             student, start_date, end_date
@@ -48,45 +74,30 @@ class AttendanceCalculator:
             session_key = record.session.session  # 'morning' or 'afternoon'
             daily_attendance[date_str][session_key] = record.status
         
-        # Calculate statistics
-        total_school_days = 0
+        # School days come from the calendar index; days without a present
+        # record come from an anti-join against the calendar
+        total_school_days = SchoolDays.count(start_date, end_date)
         full_present_days = 0
         half_days = 0
-        absent_days = 0
-        
-        # Iterate through all school days in range
-        current_date = start_date
-        while current_date <= end_date:
-            # Only count weekdays as school days
-            if current_date.weekday() < 5:  # Monday=0 to Friday=4
-                total_school_days += 1
-                date_str = current_date.strftime('%Y-%m-%d')
-                
-                if date_str in daily_attendance:
-                    morning = daily_attendance[date_str]['morning']
-                    afternoon = daily_attendance[date_str]['afternoon']
-                    
-                    # Determine overall status for the day
-                    if morning == 'PRESENT' and afternoon == 'PRESENT':
-                        full_present_days += 1
-                        daily_attendance[date_str]['status'] = 'FULL_PRESENT'
-                    elif morning == 'PRESENT' or afternoon == 'PRESENT':
-                        half_days += 1
-                        daily_attendance[date_str]['status'] = 'HALF_DAY'
-                    else:
-                        absent_days += 1
-                        daily_attendance[date_str]['status'] = 'ABSENT'
-                else:
-                    # No records for this date = absent
-                    absent_days += 1
-                    daily_attendance[date_str] = {
-                        'date': current_date,
-                        'morning': None,
-                        'afternoon': None,
-                        'status': 'ABSENT'
-                    }
-            
-            current_date += timedelta(days=1)
+        
+        for date_str, day in daily_attendance.items():
+            if not SchoolDays.is_school_day(day['date']):
+                continue
+            if day['morning'] == 'PRESENT' and day['afternoon'] == 'PRESENT':
+                full_present_days += 1
+                day['status'] = 'FULL_PRESENT'
+            elif day['morning'] == 'PRESENT' or day['afternoon'] == 'PRESENT':
+                half_days += 1
+                day['status'] = 'HALF_DAY'
+        
+        for absent_date in SchoolDays.absent_dates(student.id, start_date, end_date):
+            daily_attendance.setdefault(absent_date.strftime('%Y-%m-%d'), {
+                'date': absent_date,
+                'morning': None,
+                'afternoon': None,
+                'status': 'ABSENT'
+            })
+        absent_days = total_school_days - full_present_days - half_days
         
         # Calculate percentage (full day = 1.0, half day = 0.5)
         total_present_value = full_present_days + (half_days * 0.5)
@@ -189,3 +200,519 @@ class AttendanceCalculator:
             )
             return summary
         return None
+
+
+class AttendanceRecorder:
+    """Write path for attendance: apply only what changed in submitted sessions"""
+    
+    @staticmethod
+    def _parse(attendance):
+        submitted = {}
+        for entry in attendance:
+            try:
+                submitted[int(entry.get('student_id'))] = bool(entry.get('is_present', True))
+            except (TypeError, ValueError):
+                continue
+        return submitted
+    
+    @staticmethod
+    def record_session(student_class, date, session, teacher, attendance):
+        """
+        Save a session's attendance as a diff against the stored records.
+        attendance: dicts with student_id and is_present (default True).
+        Students outside the class roster are skipped; stored records for
+        students missing from the submission are removed.
+        """
+        return AttendanceRecorder.record_sessions(teacher, [{
+            'student_class': student_class,
+            'date': date,
+            'session': session,
+            'attendance': attendance,
+        }])[0]
+    
+    @staticmethod
+    def record_sessions(teacher, items):
+        """
+        Save many sessions (dicts with student_class, date, session, attendance)
+        in one transaction with a fixed number of bulk queries per batch.
+        Each (class, date, session) may appear only once.
+        """
+        keys = [(item['student_class'].id, item['date'], item['session']) for item in items]
+        if len(set(keys)) != len(keys):
+            raise ValueError('Each class, date and session may appear only once per batch')
+        if not items:
+            return []
+        
+        submitted = [AttendanceRecorder._parse(item['attendance']) for item in items]
+        
+        # One roster query validates every submitted id of every class
+        all_ids = {student_id for entries in submitted for student_id in entries}
+        roster = set(StudentProfile.objects.filter(
+            student_class_id__in={class_id for class_id, _, _ in keys}, id__in=list(all_ids)
+        ).values_list('id', 'student_class_id'))
+        submitted = [
+            {student_id: present for student_id, present in entries.items() if (student_id, class_id) in roster}
+            for entries, (class_id, _, _) in zip(submitted, keys)
+        ]
+        
+        session_filter = Q()
+        for class_id, day, session in keys:
+            session_filter |= Q(student_class_id=class_id, date=day, session=session)
+        
+        with transaction.atomic():
+            sessions = {
+                (obj.student_class_id, obj.date, obj.session): obj
+                for obj in AttendanceSession.objects.select_for_update().filter(session_filter)
+            }
+            new_sessions = [
+                AttendanceSession(student_class=item['student_class'], date=day, session=session, teacher=teacher)
+                for item, (class_id, day, session) in zip(items, keys) if (class_id, day, session) not in sessions
+            ]
+            if new_sessions:
+                AttendanceSession.objects.bulk_create(new_sessions, ignore_conflicts=True)
+            existing_sessions = list(sessions.values())
+            if existing_sessions:
+                now = timezone.now()
+                for obj in existing_sessions:
+                    obj.teacher, obj.updated_at = teacher, now
+                AttendanceSession.objects.bulk_update(existing_sessions, ['teacher', 'updated_at'])
+            if new_sessions:
+                # Reload so every session has its primary key on all backends
+                sessions = {
+                    (obj.student_class_id, obj.date, obj.session): obj
+                    for obj in AttendanceSession.objects.filter(session_filter)
+                }
+            
+            existing = {}
+            for session_id, student_id, is_present in AttendanceRecord.objects.filter(
+                session__in=list(sessions.values())
+            ).values_list('session_id', 'student_id', 'is_present'):
+                existing.setdefault(session_id, {})[student_id] = is_present
+            
+            changed, removed, results = [], Q(), []
+            marks, unmarks = {}, {}
+            for item, key, entries in zip(items, keys, submitted):
+                attendance_session = sessions[key]
+                stored = existing.get(attendance_session.id, {})
+                session_changed = [
+                    AttendanceRecord(session=attendance_session, student_id=student_id, is_present=present)
+                    for student_id, present in entries.items()
+                    if stored.get(student_id) != present
+                ]
+                session_removed = [student_id for student_id in stored if student_id not in entries]
+                changed.extend(session_changed)
+                if session_removed:
+                    removed |= Q(session=attendance_session, student_id__in=session_removed)
+                    unmarks.setdefault((key[1], key[2]), []).extend(session_removed)
+                
+                present_ids, absent_ids = marks.setdefault((key[1], key[2]), ([], []))
+                for record in session_changed:
+                    (present_ids if record.is_present else absent_ids).append(record.student_id)
+                
+                created_count = sum(1 for record in session_changed if record.student_id not in stored)
+                results.append({
+                    'session': attendance_session,
+                    'saved': len(entries),
+                    'created': created_count,
+                    'updated': len(session_changed) - created_count,
+                    'unchanged': len(entries) - len(session_changed),
+                    'removed': len(session_removed),
+                    'skipped': len(item['attendance']) - len(entries),
+                })
+            
+            if changed:
+                # marked_at only moves for rows whose status actually changed
+                AttendanceRecord.objects.bulk_create(
+                    changed,
+                    update_conflicts=True,
+                    unique_fields=['session', 'student'],
+                    update_fields=['is_present', 'marked_at']
+                )
+                # bulk_create skips post_save, so the monthly bitmaps are set here
+                for (day, session), (present_ids, absent_ids) in marks.items():
+                    AttendanceBitmaps.mark(day, session, present_ids=present_ids, absent_ids=absent_ids)
+            if removed:
+                # One UPDATE per (day, session) instead of the post_delete handler per record
+                for (day, session), student_ids in unmarks.items():
+                    AttendanceBitmaps.unmark(day, session, student_ids)
+                with AttendanceBitmaps.bulk_removal():
+                    AttendanceRecord.objects.filter(removed).delete()
+            
+            for class_id, day in {(class_id, day.replace(day=1)) for class_id, day, _ in keys}:
+                StudentCalendar.invalidate(class_id, day)
+        
+        record_event('attendance_sessions_marked', len(results))
+        record_event('attendance_records_changed', sum(r['created'] + r['updated'] + r['removed'] for r in results))
+        return results
+
+
+class AttendanceSync:
+    """Offline attendance replay: many sessions per request, each with an idempotency key"""
+    
+    MAX_ITEMS = 200
+    SESSIONS = ('morning', 'afternoon')
+    
+    @staticmethod
+    def _validate(item):
+        key = str(item.get('idempotency_key') or '').strip()
+        if not key or len(key) > 100:
+            return None, 'idempotency_key is required (max 100 characters)'
+        try:
+            class_id = int(item.get('class_id'))
+            day = datetime.strptime(str(item.get('date')), '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            return None, 'class_id and date (YYYY-MM-DD) are required'
+        session = item.get('session', 'morning')
+        if session not in AttendanceSync.SESSIONS:
+            return None, 'session must be morning or afternoon'
+        attendance = item.get('attendance')
+        if not isinstance(attendance, list) or not attendance:
+            return None, 'attendance must be a non-empty list'
+        return {'key': key, 'class_id': class_id, 'date': day, 'session': session, 'attendance': attendance}, None
+    
+    @staticmethod
+    def sync(teacher, items):
+        """
+        Apply a batch of queued mark_attendance payloads. Returns one result per
+        item: applied, duplicate (key seen before), superseded (a later item in
+        the batch targets the same class session) or error.
+        """
+        from apps.students.models import Class
+        
+        results = [None] * len(items)
+        parsed = {}
+        for index, item in enumerate(items):
+            item = item if isinstance(item, dict) else {}
+            data, error = AttendanceSync._validate(item)
+            if error:
+                results[index] = {'idempotency_key': item.get('idempotency_key'), 'status': 'error', 'message': error}
+            else:
+                parsed[index] = data
+        
+        # Keys replayed from earlier syncs return their stored result
+        receipts = {
+            receipt.idempotency_key: receipt
+            for receipt in AttendanceSyncReceipt.objects.filter(
+                idempotency_key__in=[data['key'] for data in parsed.values()]
+            )
+        }
+        seen_keys = {}
+        for index, data in list(parsed.items()):
+            receipt = receipts.get(data['key'])
+            if receipt and receipt.teacher_id != teacher.id:
+                results[index] = {'idempotency_key': data['key'], 'status': 'error',
+                                  'message': 'idempotency_key already used by another user'}
+            elif receipt:
+                results[index] = {**receipt.result, 'status': 'duplicate'}
+            elif data['key'] in seen_keys:
+                results[index] = {'idempotency_key': data['key'], 'status': 'duplicate',
+                                  'duplicate_of': seen_keys[data['key']]}
+            else:
+                seen_keys[data['key']] = index
+                continue
+            del parsed[index]
+        
+        classes = Class.objects.in_bulk({data['class_id'] for data in parsed.values()})
+        latest = {}
+        for index, data in list(parsed.items()):
+            if data['class_id'] not in classes:
+                results[index] = {'idempotency_key': data['key'], 'status': 'error', 'message': 'Class not found'}
+                del parsed[index]
+                continue
+            latest[(data['class_id'], data['date'], data['session'])] = index
+        
+        applied = sorted(latest.values())
+        superseded = [index for index in parsed if index not in latest.values()]
+        
+        with transaction.atomic():
+            outcomes = AttendanceRecorder.record_sessions(teacher, [
+                {
+                    'student_class': classes[parsed[index]['class_id']],
+                    'date': parsed[index]['date'],
+                    'session': parsed[index]['session'],
+                    'attendance': parsed[index]['attendance'],
+                }
+                for index in applied
+            ])
+            
+            receipts = []
+            for index, outcome in zip(applied, outcomes):
+                results[index] = {
+                    'idempotency_key': parsed[index]['key'],
+                    'status': 'applied',
+                    'session_id': outcome['session'].id,
+                    'changes': {name: outcome[name] for name in ('created', 'updated', 'unchanged', 'removed', 'skipped')},
+                }
+                receipts.append(AttendanceSyncReceipt(
+                    idempotency_key=parsed[index]['key'], teacher=teacher,
+                    session=outcome['session'], result=results[index]
+                ))
+            for index in superseded:
+                data = parsed[index]
+                results[index] = {
+                    'idempotency_key': data['key'],
+                    'status': 'superseded',
+                    'session_id': results[latest[(data['class_id'], data['date'], data['session'])]]['session_id'],
+                }
+                receipts.append(AttendanceSyncReceipt(
+                    idempotency_key=data['key'], teacher=teacher, result=results[index]
+                ))
+            AttendanceSyncReceipt.objects.bulk_create(receipts)
+        
+        return results
+
+
+class AttendanceReport:
+    """School-wide attendance counts per class session in one grouped query"""
+    
+    @staticmethod
+    def _rate(present, total):
+        return round((present / total) * 100, 1) if total > 0 else 0
+    
+    @staticmethod
+    def session_counts(start_date, end_date, sessions=('morning', 'afternoon')):
+        """One row per class session with total/present/absent record counts"""
+        return list(AttendanceSession.objects.filter(
+            date__gte=start_date,
+            date__lte=end_date,
+            session__in=sessions
+        ).annotate(
+            total=Count('records'),
+            present=Count('records', filter=Q(records__is_present=True)),
+            absent=Count('records', filter=Q(records__is_present=False))
+        ).values(
+            'date', 'session', 'student_class_id', 'student_class__name',
+            'teacher__username', 'teacher__first_name', 'teacher__last_name',
+            'total', 'present', 'absent'
+        ).order_by('date', 'student_class__order', 'student_class__name', 'session'))
+    
+    @staticmethod
+    def school_report(start_date, end_date, sessions=('morning', 'afternoon')):
+        """Totals, per-session class rows and a daily per-class matrix"""
+        rows = AttendanceReport.session_counts(start_date, end_date, sessions)
+        
+        classes_data = []
+        matrix = {}
+        class_ids = set()
+        total_students = total_present = total_absent = 0
+        for row in rows:
+            teacher_name = f"{row['teacher__first_name']} {row['teacher__last_name']}".strip() or row['teacher__username']
+            counts = {
+                'total_students': row['total'],
+                'present_count': row['present'],
+                'absent_count': row['absent'],
+                'attendance_rate': AttendanceReport._rate(row['present'], row['total']),
+                'teacher_name': teacher_name
+            }
+            classes_data.append({
+                'id': row['student_class_id'],
+                'name': row['student_class__name'],
+                'date': row['date'].strftime('%Y-%m-%d'),
+                'session': row['session'],
+                **counts
+            })
+            
+            day = matrix.setdefault(row['date'], {})
+            cell = day.setdefault(row['student_class_id'], {
+                'id': row['student_class_id'],
+                'name': row['student_class__name'],
+                'morning': None,
+                'afternoon': None
+            })
+            cell[row['session']] = counts
+            
+            class_ids.add(row['student_class_id'])
+            total_students += row['total']
+            total_present += row['present']
+            total_absent += row['absent']
+        
+        return {
+            'start_date': start_date.strftime('%Y-%m-%d'),
+            'end_date': end_date.strftime('%Y-%m-%d'),
+            'sessions': list(sessions),
+            'total_classes': len(class_ids),
+            'total_sessions': len(rows),
+            'total_students': total_students,
+            'total_present': total_present,
+            'total_absent': total_absent,
+            'overall_attendance_rate': AttendanceReport._rate(total_present, total_students),
+            'classes': classes_data,
+            'matrix': [
+                {'date': day.strftime('%Y-%m-%d'), 'classes': list(cells.values())}
+                for day, cells in matrix.items()
+            ]
+        }
+
+
+class AbsenteeismDetector:
+    """School-wide absence streaks and rolling attendance rates in one pass"""
+    
+    @staticmethod
+    def detect(as_of=None, streak_days=3, min_rate=75, window_days=20):
+        """
+        Metrics for every student over the last window_days school days.
+        Only days on which the student has a record, or their class held a
+        session after they joined, count, so classes whose attendance was
+        never taken and newly enrolled students are not flagged. A streak is
+        consecutive marked days without any present session; gaps between
+        present days come from LAG() over each student's present dates.
+        """
+        as_of = as_of or timezone.localdate()
+        window_from = SchoolDays.window_start(as_of, window_days)
+        school_days = SchoolDays.count(window_from, as_of)
+        in_window = {'session__date__gte': window_from, 'session__date__lte': as_of}
+        
+        # Marked (day, session) pairs: the class's sessions plus the student's own records
+        class_sessions = defaultdict(set)
+        for class_id, day, session in AttendanceSession.objects.filter(
+            date__gte=window_from, date__lte=as_of
+        ).values_list('student_class_id', 'date', 'session'):
+            class_sessions[class_id].add((day, session))
+        own_sessions = defaultdict(set)
+        for student_id, day, session in AttendanceRecord.objects.filter(**in_window).values_list(
+            'student_id', 'session__date', 'session__session'
+        ):
+            own_sessions[student_id].add((day, session))
+        
+        present = AttendanceRecord.objects.filter(is_present=True, **in_window)
+        present_sessions = dict(present.values('student_id').annotate(
+            sessions=Count('id')
+        ).values_list('student_id', 'sessions'))
+        
+        gaps = defaultdict(list)
+        for student_id, day, previous_day in present.annotate(
+            day=F('session__date'),
+            previous_day=Window(
+                expression=Lag('session__date'),
+                partition_by=F('student_id'),
+                order_by=F('session__date').asc()
+            )
+        ).values_list('student_id', 'day', 'previous_day').order_by('student_id', 'session__date'):
+            gaps[student_id].append((day, previous_day))
+        
+        results = []
+        for student_id, class_id, joined in StudentProfile.objects.filter(
+            student_class__isnull=False
+        ).values_list('id', 'student_class_id', 'user__date_joined'):
+            # Class sessions held before the student joined do not count against them
+            joined = timezone.localdate(joined) if joined else window_from
+            marked = {key for key in class_sessions.get(class_id, ()) if key[0] >= joined}
+            marked |= own_sessions.get(student_id, set())
+            days = sorted({day for day, _ in marked})
+            
+            longest, last_present = 0, None
+            for day, previous_day in gaps.get(student_id, ()):
+                # Marked days strictly between the previous present day and this one
+                gap = bisect_left(days, day) - (bisect_right(days, previous_day) if previous_day else 0)
+                longest, last_present = max(longest, gap), day
+            current = len(days) - (bisect_right(days, last_present) if last_present else 0)
+            longest = max(longest, current)
+            
+            rate = (present_sessions.get(student_id, 0) / len(marked) * 100) if marked else 100
+            rate = round(min(rate, 100), 2)
+            results.append({
+                'student_id': student_id,
+                'current_streak': current,
+                'longest_streak': longest,
+                'attendance_rate': rate,
+                'is_streak': current >= streak_days,
+                'is_low_rate': rate < min_rate,
+            })
+        
+        return {
+            'as_of': as_of,
+            'window_start': window_from,
+            'window_days': school_days,
+            'students': results
+        }
+    
+    @staticmethod
+    def run(as_of=None, streak_days=3, min_rate=75, window_days=20):
+        """Detect and replace the stored flags (for the nightly job)"""
+        report = AbsenteeismDetector.detect(as_of, streak_days, min_rate, window_days)
+        flags = [
+            AbsenteeismFlag(
+                computed_for=report['as_of'],
+                window_days=report['window_days'],
+                student_id=entry['student_id'],
+                current_streak=entry['current_streak'],
+                longest_streak=entry['longest_streak'],
+                attendance_rate=entry['attendance_rate'],
+                is_streak=entry['is_streak'],
+                is_low_rate=entry['is_low_rate'],
+            )
+            for entry in report['students']
+            if entry['is_streak'] or entry['is_low_rate']
+        ]
+        with transaction.atomic():
+            AbsenteeismFlag.objects.all().delete()
+            AbsenteeismFlag.objects.bulk_create(flags)
+        return {**report, 'flagged': len(flags)}
+
+
+class StudentCalendar:
+    """Cached month calendar per student, rebuilt when the class/month attendance changes"""
+    
+    CACHE_TIMEOUT = 60 * 60 * 24 * 7
+    
+    @staticmethod
+    def resource(class_id, year, month):
+        return f'attendance-month:{class_id}:{year}-{month:02d}'
+    
+    @staticmethod
+    def invalidate(class_id, day):
+        bump_version(StudentCalendar.resource(class_id, day.year, day.month))
+    
+    @staticmethod
+    def build(student_id, year, month):
+        """Month grid (weeks of day cells or None) plus the month's counts"""
+        start_date = datetime(year, month, 1).date()
+        end_date = start_date.replace(day=calendar.monthrange(year, month)[1])
+        summary = AttendanceCalculator.get_student_attendance_summary(student_id, start_date, end_date)
+        if not summary:
+            return None
+        
+        daily = summary['daily_records']
+        weeks = []
+        for week in calendar.monthcalendar(year, month):
+            cells = []
+            for day in week:
+                if day == 0:
+                    cells.append(None)
+                    continue
+                date_str = f'{year}-{month:02d}-{day:02d}'
+                record = daily.get(date_str)
+                cells.append({
+                    'day': day,
+                    'date': date_str,
+                    'status': record['status'] if record else 'NO_SCHOOL',
+                    'morning': record['morning'] if record else None,
+                    'afternoon': record['afternoon'] if record else None,
+                })
+            weeks.append(cells)
+        
+        return {
+            'student_id': student_id,
+            'year': year,
+            'month': month,
+            'month_name': calendar.month_name[month],
+            'total_school_days': summary['total_school_days'],
+            'full_present_days': summary['full_present_days'],
+            'half_days': summary['half_days'],
+            'absent_days': summary['absent_days'],
+            'attendance_percentage': summary['attendance_percentage'],
+            'weeks': weeks,
+        }
+    
+    @staticmethod
+    def month(student, year, month):
+        """Cached payload; one cache read when the class/month has not changed"""
+        resource = StudentCalendar.resource(student.student_class_id, year, month)
+        versions = get_versions(resource, CALENDAR_RESOURCE)
+        key = f'student-calendar:{student.id}:{year}-{month:02d}:{versions[resource]}:{versions[CALENDAR_RESOURCE]}'
+        payload = cache.get(key)
+        record_cache('student_calendar', payload is not None)
+        if payload is None:
+            payload = StudentCalendar.build(student.id, year, month)
+            cache.set(key, payload, StudentCalendar.CACHE_TIMEOUT)
+        return payload
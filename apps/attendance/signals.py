@@ -0,0 +1,36 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from apps.core.versioning import bump_on_change
+from .bitmaps import AttendanceBitmaps
+from .models import AttendanceRecord, AttendanceSession, SchoolCalendar
+from .school_calendar import RESOURCE as CALENDAR_RESOURCE
+from .services import StudentCalendar
+
+
+@receiver(post_save, sender=AttendanceRecord)
+def mark_attendance_bitmap(sender, instance, **kwargs):
+    """Single-record writes (admin, shell) keep AttendanceMonth in step"""
+    session = instance.session
+    StudentCalendar.invalidate(session.student_class_id, session.date)
+    AttendanceBitmaps.mark(
+        session.date, session.session,
+        present_ids=[instance.student_id] if instance.is_present else [],
+        absent_ids=[] if instance.is_present else [instance.student_id]
+    )
+
+
+@receiver(post_delete, sender=AttendanceRecord)
+def unmark_attendance_bitmap(sender, instance, **kwargs):
+    """Single-record deletes; bulk removals unmark once for the whole batch"""
+    if AttendanceBitmaps.in_bulk_removal():
+        return
+    try:
+        session = instance.session
+    except AttendanceSession.DoesNotExist:
+        return
+    StudentCalendar.invalidate(session.student_class_id, session.date)
+    AttendanceBitmaps.unmark(session.date, session.session, [instance.student_id])
+
+
+# Every process reloads its school-day index after calendar edits
+bump_on_change(CALENDAR_RESOURCE, SchoolCalendar)
@@ -0,0 +1,24 @@
+from datetime import datetime
+from apps.jobs.registry import task
+from .bitmaps import AttendanceBitmaps
+from .services import AbsenteeismDetector
+
+
+@task('attendance.rebuild_bitmaps')
+def rebuild_bitmaps(job, student_ids=None):
+    return {'months': AttendanceBitmaps.rebuild(student_ids)}
+
+
+@task('attendance.detect_absenteeism')
+def detect_absenteeism(job, as_of=None, streak_days=3, min_rate=75, window_days=20):
+    """as_of is YYYY-MM-DD (default: today)"""
+    report = AbsenteeismDetector.run(
+        datetime.strptime(as_of, '%Y-%m-%d').date() if as_of else None,
+        streak_days=streak_days, min_rate=min_rate, window_days=window_days
+    )
+    return {
+        'as_of': report['as_of'],
+        'window_start': report['window_start'],
+        'students': len(report['students']),
+        'flagged': report['flagged'],
+    }
@@ -1,3 +1,252 @@
-afrom django.test import TestCase
+from datetime import date
+from unittest import mock
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from apps.assessments.models import AcademicYear
+from apps.students.models import Class, StudentProfile
+from apps.users.models import User
+from .bitmaps import AttendanceBitmaps
+from .models import AbsenteeismFlag, AttendanceMonth, AttendanceRecord, SchoolCalendar
+from .school_calendar import SchoolDays
+from .services import AbsenteeismDetector, AttendanceCalculator, AttendanceRecorder, AttendanceReport, AttendanceSync, StudentCalendar
 
-# Create your tests here.
+
+class AttendanceRecorderTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        SchoolDays.clear()
+        self.teacher = User.objects.create(username="teacher1", role="teacher")
+        self.class_obj = Class.objects.create(name="1st", class_group="1-5")
+        other_class = Class.objects.create(name="2nd", class_group="1-5")
+        self.students = []
+        for roll in range(3):
+            user = User.objects.create(username=f"student{roll}")
+            self.students.append(StudentProfile.objects.create(
+                user=user, student_class=self.class_obj, roll_number=str(roll),
+                mother_phone='', father_phone=''
+            ))
+        self.outsider = StudentProfile.objects.create(
+            user=User.objects.create(username="outsider"), student_class=other_class,
+            roll_number='1', mother_phone='', father_phone=''
+        )
+    
+    def record(self, attendance):
+        return AttendanceRecorder.record_session(
+            self.class_obj, date(2025, 1, 6), 'morning', self.teacher, attendance
+        )
+    
+    def test_resubmission_applies_only_the_diff(self):
+        first = self.record([{'student_id': s.id, 'is_present': True} for s in self.students])
+        self.assertEqual((first['created'], first['updated']), (3, 0))
+        kept = AttendanceRecord.objects.get(student=self.students[0])
+        
+        # Removals are unmarked once by the recorder, not again by the post_delete handler
+        with mock.patch.object(AttendanceBitmaps, 'unmark', wraps=AttendanceBitmaps.unmark) as unmark:
+            second = self.record([
+                {'student_id': self.students[0].id, 'is_present': True},
+                {'student_id': self.students[1].id, 'is_present': False},
+                {'student_id': self.outsider.id, 'is_present': True},
+            ])
+        self.assertEqual(unmark.call_count, 1)
+        self.assertEqual(
+            (second['unchanged'], second['updated'], second['removed'], second['skipped']),
+            (1, 1, 1, 1)
+        )
+        
+        records = dict(AttendanceRecord.objects.values_list('student_id', 'is_present'))
+        self.assertEqual(records, {self.students[0].id: True, self.students[1].id: False})
+        unchanged = AttendanceRecord.objects.get(student=self.students[0])
+        self.assertEqual((unchanged.pk, unchanged.marked_at), (kept.pk, kept.marked_at))
+        # The removed student's morning is forgotten in the monthly bitmap too
+        removed = AttendanceMonth.objects.get(student=self.students[2], year=2025, month=1)
+        self.assertEqual((removed.morning_bits, removed.morning_recorded), (0, 0))
+    
+    def test_school_report_in_one_query(self):
+        self.record([
+            {'student_id': self.students[0].id, 'is_present': True},
+            {'student_id': self.students[1].id, 'is_present': False},
+        ])
+        AttendanceRecorder.record_session(
+            self.class_obj, date(2025, 1, 6), 'afternoon', self.teacher,
+            [{'student_id': self.students[0].id, 'is_present': True}]
+        )
+        
+        with self.assertNumQueries(1):
+            report = AttendanceReport.school_report(date(2025, 1, 6), date(2025, 1, 7))
+        
+        self.assertEqual((report['total_classes'], report['total_sessions']), (1, 2))
+        self.assertEqual((report['total_present'], report['total_absent']), (2, 1))
+        cell = report['matrix'][0]['classes'][0]
+        self.assertEqual(cell['morning']['attendance_rate'], 50.0)
+        self.assertEqual(cell['afternoon']['present_count'], 1)
+    
+    def test_bitmap_summary_matches_record_scan(self):
+        student = self.students[0]
+        for day, morning, afternoon in [(6, True, True), (7, True, False), (8, False, False), (11, True, True)]:
+            for session, present in (('morning', morning), ('afternoon', afternoon)):
+                AttendanceRecorder.record_session(
+                    self.class_obj, date(2025, 1, day), session, self.teacher,
+                    [{'student_id': student.id, 'is_present': present}]
+                )
+        AttendanceRecord.objects.filter(student=student, session__date=date(2025, 1, 8)).first().delete()
+        
+        start, end = date(2025, 1, 1), date(2025, 2, 3)
+        with override_settings(ATTENDANCE_BITMAPS=False):
+            expected = AttendanceCalculator.get_student_attendance_summary(student.id, start, end)
+        actual = AttendanceCalculator.get_student_attendance_summary(student.id, start, end)
+        
+        for key in ('total_school_days', 'full_present_days', 'half_days', 'absent_days', 'attendance_percentage'):
+            self.assertEqual(actual[key], expected[key], key)
+        self.assertEqual(actual['daily_records'], dict(sorted(expected['daily_records'].items())))
+        
+        row = AttendanceMonth.objects.get(student=student, year=2025, month=1)
+        AttendanceBitmaps.rebuild()
+        rebuilt = AttendanceMonth.objects.get(student=student, year=2025, month=1)
+        self.assertEqual(
+            (row.morning_bits, row.afternoon_bits, row.morning_recorded, row.afternoon_recorded),
+            (rebuilt.morning_bits, rebuilt.afternoon_bits, rebuilt.morning_recorded, rebuilt.afternoon_recorded)
+        )
+    
+    def test_school_calendar_holidays(self):
+        year = AcademicYear.objects.create(
+            name="2024-2025", start_date=date(2025, 1, 1), end_date=date(2025, 1, 31), is_current=True
+        )
+        SchoolCalendar.objects.bulk_create([
+            SchoolCalendar(academic_year=year, date=date(2025, 1, day),
+                           is_school_day=date(2025, 1, day).weekday() < 5 and day != 7)
+            for day in range(1, 32)
+        ])
+        SchoolCalendar.objects.get(date=date(2025, 1, 1)).save()  # bump the calendar version
+        
+        # January 2025 has 23 weekdays; the 7th is a holiday; February falls back to weekdays
+        self.assertEqual(SchoolDays.count(date(2025, 1, 1), date(2025, 1, 31)), 22)
+        self.assertEqual(SchoolDays.count(date(2025, 1, 1), date(2025, 2, 3)), 23)
+        self.assertFalse(SchoolDays.is_school_day(date(2025, 1, 7)))
+        
+        student = self.students[0]
+        self.record([{'student_id': student.id, 'is_present': True}])
+        absent = SchoolDays.absent_dates(student.id, date(2025, 1, 6), date(2025, 1, 10))
+        self.assertEqual([day.day for day in absent], [8, 9, 10])
+        
+        with override_settings(ATTENDANCE_BITMAPS=False):
+            expected = AttendanceCalculator.get_student_attendance_summary(student.id, date(2025, 1, 1), date(2025, 1, 31))
+        actual = AttendanceCalculator.get_student_attendance_summary(student.id, date(2025, 1, 1), date(2025, 1, 31))
+        self.assertEqual((expected['half_days'], expected['absent_days']), (1, 21))
+        self.assertEqual((actual['half_days'], actual['absent_days']), (1, 21))
+    
+    def test_absenteeism_streaks_and_rates(self):
+        # Mon 6 .. Fri 17 January 2025; student 0 present throughout,
+        # student 1 present on the 6th and 13th only, student 2 never present
+        for day in (6, 7, 8, 9, 10, 13, 14, 15, 16, 17):
+            for session in ('morning', 'afternoon'):
+                AttendanceRecorder.record_session(
+                    self.class_obj, date(2025, 1, day), session, self.teacher, [
+                        {'student_id': self.students[0].id, 'is_present': True},
+                        {'student_id': self.students[1].id, 'is_present': day in (6, 13)},
+                        {'student_id': self.students[2].id, 'is_present': False},
+                    ]
+                )
+        
+        # Joined after those sessions (date_joined is now) and never marked
+        newcomer = StudentProfile.objects.create(
+            user=User.objects.create(username="newcomer"), student_class=self.class_obj,
+            roll_number="99", mother_phone='', father_phone=''
+        )
+        
+        report = AbsenteeismDetector.run(date(2025, 1, 17), streak_days=3, min_rate=75, window_days=10)
+        by_student = {entry['student_id']: entry for entry in report['students']}
+        
+        self.assertEqual(report['window_days'], 10)
+        self.assertEqual(by_student[self.students[0].id]['attendance_rate'], 100)
+        self.assertEqual(
+            (by_student[self.students[1].id]['current_streak'], by_student[self.students[1].id]['longest_streak']),
+            (4, 4)
+        )
+        self.assertEqual(by_student[self.students[1].id]['attendance_rate'], 20)
+        self.assertEqual(by_student[self.students[2].id]['current_streak'], 10)
+        # The outsider's class never took attendance in the window
+        self.assertEqual(
+            (by_student[self.outsider.id]['current_streak'], by_student[self.outsider.id]['attendance_rate']),
+            (0, 100)
+        )
+        self.assertEqual(by_student[newcomer.id]['current_streak'], 0)
+        self.assertEqual(
+            set(AbsenteeismFlag.objects.values_list('student_id', flat=True)),
+            {self.students[1].id, self.students[2].id}
+        )
+        
+        client = APIClient()
+        client.force_authenticate(self.teacher)
+        response = client.get(f'/api/attendance/absenteeism/?class_id={self.class_obj.id}')
+        self.assertEqual(len(response.data['flags']), 2)
+        self.assertEqual(client.get('/api/attendance/absenteeism/?class_id=1st').status_code, 400)
+    
+    def test_offline_sync_is_idempotent(self):
+        items = [
+            {'idempotency_key': 'k1', 'class_id': self.class_obj.id, 'date': '2025-01-06', 'session': 'morning',
+             'attendance': [{'student_id': s.id, 'is_present': True} for s in self.students]},
+            {'idempotency_key': 'k2', 'class_id': self.class_obj.id, 'date': '2025-01-06', 'session': 'afternoon',
+             'attendance': [{'student_id': self.students[0].id, 'is_present': False}]},
+            {'idempotency_key': 'k3', 'class_id': 999, 'date': '2025-01-06', 'session': 'morning',
+             'attendance': [{'student_id': self.students[0].id}]},
+        ]
+        results = AttendanceSync.sync(self.teacher, items)
+        self.assertEqual([r['status'] for r in results], ['applied', 'applied', 'error'])
+        self.assertEqual(AttendanceRecord.objects.count(), 4)
+        
+        replay = AttendanceSync.sync(self.teacher, items[:2])
+        self.assertEqual([r['status'] for r in replay], ['duplicate', 'duplicate'])
+        self.assertEqual(replay[0]['changes'], results[0]['changes'])
+        self.assertEqual(AttendanceRecord.objects.count(), 4)
+    
+    def test_student_calendar_is_cached_until_class_month_changes(self):
+        student = self.students[0]
+        self.record([{'student_id': s.id, 'is_present': True} for s in self.students])
+        
+        payload = StudentCalendar.month(student, 2025, 1)
+        monday = payload['weeks'][1][0]
+        self.assertEqual((monday['date'], monday['status'], monday['morning']), ('2025-01-06', 'HALF_DAY', 'PRESENT'))
+        self.assertEqual(payload['weeks'][0][0], None)
+        with self.assertNumQueries(0):
+            self.assertEqual(StudentCalendar.month(student, 2025, 1), payload)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            AttendanceRecorder.record_session(
+                self.class_obj, date(2025, 1, 6), 'afternoon', self.teacher,
+                [{'student_id': student.id, 'is_present': True}]
+            )
+        self.assertEqual(StudentCalendar.month(student, 2025, 1)['weeks'][1][0]['status'], 'FULL_PRESENT')
+    
+    def test_rebuild_refreshes_cached_calendars(self):
+        student = self.students[0]
+        self.record([{'student_id': s.id, 'is_present': True} for s in self.students])
+        # Drifted bitmaps end up in the cached calendar...
+        AttendanceMonth.objects.filter(student=student).update(morning_bits=0)
+        self.assertEqual(StudentCalendar.month(student, 2025, 1)['weeks'][1][0]['status'], 'ABSENT')
+        
+        # ...until the rebuild repairs them
+        with self.captureOnCommitCallbacks(execute=True):
+            AttendanceBitmaps.rebuild()
+        self.assertEqual(StudentCalendar.month(student, 2025, 1)['weeks'][1][0]['status'], 'HALF_DAY')
+    
+    @override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+    def test_session_changelist_query_count_is_flat(self):
+        admin_user = User.objects.create_superuser(username="admin", password="pass12345", email="a@example.com")
+        self.client.force_login(admin_user)
+        self.record([{'student_id': s.id, 'is_present': True} for s in self.students])
+        
+        def changelist_queries():
+            with CaptureQueriesContext(connection) as context:
+                self.assertEqual(self.client.get('/admin/attendance/attendancesession/').status_code, 200)
+            return len(context)
+        
+        one_row = changelist_queries()
+        for day in (7, 8, 9):
+            AttendanceRecorder.record_session(
+                self.class_obj, date(2025, 1, day), 'morning', self.teacher,
+                [{'student_id': s.id, 'is_present': False} for s in self.students]
+            )
+        self.assertEqual(changelist_queries(), one_row)
@@ -1,11 +1,13 @@
 from django.urls import path
-from . import views
+from . import views, api_views
 
 urlpatterns = [
     # Your existing API URLs
     path('class/<int:class_id>/students/', views.get_class_students, name='get_class_students'),
     path('report/', views.get_attendance_report, name='get_attendance_report'),
     path('mark/', views.mark_attendance, name='mark_attendance'),
+    path('sync/', views.sync_attendance, name='sync_attendance'),
+    path('absenteeism/', api_views.absenteeism_flags, name='absenteeism_flags'),
     path('<int:class_id>/', views.get_attendance, name='get_attendance'),
     path('class/<int:class_id>/', views.get_attendance, name='get_attendance_short'),
 
@@ -16,4 +18,5 @@ urlpatterns = [
     path('dashboard/', views.attendance_dashboard, name='attendance_dashboard'),
     path('class/<int:class_id>/students/', views.class_students_summary, name='class_students_summary'),
     path('student/<int:student_id>/calendar/', views.student_calendar_view, name='student_calendar'),
+    path('student/<int:student_id>/calendar/data/', views.student_calendar_data, name='student_calendar_data'),
 ]
@@ -6,6 +6,8 @@ from django.utils import timezone
 from datetime import datetime
 from apps.students.models import StudentProfile, Class
 from .models import AttendanceSession, AttendanceRecord
+from .services import AttendanceRecorder, AttendanceReport, AttendanceSync, StudentCalendar
+from django.db import IntegrityError
 from django.shortcuts import render, get_object_or_404
 
 @api_view(['GET'])
@@ -52,89 +54,46 @@ def get_class_students(request, class_id):
 @permission_classes([IsAuthenticated])
 def get_attendance_report(request):
     """
-    Get comprehensive attendance report for all classes for a specific date and session
+    Get comprehensive attendance report for all classes for a date (or start_date/end_date range)
+    and session (morning, afternoon or both), with a daily per-class matrix
     """
     try:
         date_str = request.GET.get('date')
+        start_str = request.GET.get('start_date') or date_str
+        end_str = request.GET.get('end_date') or start_str
         session = request.GET.get('session', 'morning')
         
-        if not date_str:
+        if not start_str:
             return Response({
                 'success': False,
                 'message': 'Date parameter required'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        attendance_date = datetime.strptime(date_str, '%Y-%m-%d').date()
-        
-        # Get all attendance sessions for the specified date and session
-        attendance_sessions = AttendanceSession.objects.filter(
-            date=attendance_date,
-            session=session
-        ).select_related('student_class', 'teacher')
-        
-        if not attendance_sessions.exists():
+        if session not in ('morning', 'afternoon', 'both'):
             return Response({
-                'success': True,
-                'data': {
-                    'total_classes': 0,
-                    'total_students': 0,
-                    'total_present': 0,
-                    'total_absent': 0,
-                    'overall_attendance_rate': 0,
-                    'classes': []
-                }
-            })
+                'success': False,
+                'message': 'Session must be morning, afternoon or both'
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Calculate overall statistics
-        total_classes = attendance_sessions.count()
-        total_students = 0
-        total_present = 0
-        total_absent = 0
-        classes_data = []
+        start_date = datetime.strptime(start_str, '%Y-%m-%d').date()
+        end_date = datetime.strptime(end_str, '%Y-%m-%d').date()
+        if end_date < start_date:
+            return Response({
+                'success': False,
+                'message': 'end_date must not be before start_date'
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        for session_obj in attendance_sessions:
-            # Get attendance records for this session
-            records = AttendanceRecord.objects.filter(session=session_obj)
-            
-            class_total_students = records.count()
-            class_present_count = records.filter(is_present=True).count()
-            class_absent_count = records.filter(is_present=False).count()
-            
-            # Calculate class attendance rate
-            if class_total_students > 0:
-                class_attendance_rate = round((class_present_count / class_total_students) * 100, 1)
-            else:
-                class_attendance_rate = 0
-            
-            classes_data.append({
-                'id': session_obj.student_class.id,
-                'name': session_obj.student_class.name,
-                'total_students': class_total_students,
-                'present_count': class_present_count,
-                'absent_count': class_absent_count,
-                'attendance_rate': class_attendance_rate,
-                'teacher_name': f"{session_obj.teacher.first_name} {session_obj.teacher.last_name}".strip() or session_obj.teacher.username
-            })
-            
-            # Add to overall totals
-            total_students += class_total_students
-            total_present += class_present_count
-            total_absent += class_absent_count
+        sessions = ('morning', 'afternoon') if session == 'both' else (session,)
         
-        # Calculate overall attendance rate
-        overall_attendance_rate = round((total_present / total_students) * 100, 1) if total_students > 0 else 0
+        # Counts for every class session in the range come from one grouped query
+        report = AttendanceReport.school_report(start_date, end_date, sessions)
         
         return Response({
             'success': True,
             'data': {
-                'date': date_str,
+                'date': start_str,
                 'session': session,
-                'total_classes': total_classes,
-                'total_students': total_students,
-                'total_present': total_present,
-                'total_absent': total_absent,
-                'overall_attendance_rate': overall_attendance_rate,
-                'classes': classes_data
+                **report
             }
         })
         
@@ -165,7 +124,6 @@ def mark_attendance(request):
         # Parse date
         attendance_date = datetime.strptime(date_str, '%Y-%m-%d').date()
         
-        # Get or create attendance session
         try:
             student_class = Class.objects.get(id=class_id)
         except Class.DoesNotExist:
@@ -174,51 +132,69 @@ def mark_attendance(request):
                 'message': 'Class not found'
             }, status=status.HTTP_404_NOT_FOUND)
         
-        attendance_session, created = AttendanceSession.objects.get_or_create(
-            date=attendance_date,
-            session=session,
-            student_class=student_class,
-            defaults={'teacher': request.user}
+        # Diff against the stored records and write only the changes
+        result = AttendanceRecorder.record_session(
+            student_class, attendance_date, session, request.user, attendance_data
         )
         
-        if not created:
-            # Update existing session
-            attendance_session.teacher = request.user
-            attendance_session.updated_at = timezone.now()
-            attendance_session.save()
+        return Response({
+            'success': True,
+            'message': f"Attendance saved successfully for {result['saved']} students",
+            'session_id': result['session'].id,
+            'changes': {
+                'created': result['created'],
+                'updated': result['updated'],
+                'unchanged': result['unchanged'],
+                'removed': result['removed'],
+                'skipped': result['skipped']
+            }
+        })
         
-        # Clear existing records for this session (in case of updates)
-        AttendanceRecord.objects.filter(session=attendance_session).delete()
+    except Exception as e:
+        return Response({
+            'success': False,
+            'message': f'Error saving attendance: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def sync_attendance(request):
+    """
+    Replay queued offline attendance in one request.
+    Body: {"items": [{"idempotency_key", "class_id", "date", "session", "attendance"}, ...]}
+    """
+    try:
+        items = request.data.get('items')
+        if not isinstance(items, list) or not items:
+            return Response({
+                'success': False,
+                'message': 'items must be a non-empty list'
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Create new attendance records
-        attendance_records = []
-        for record in attendance_data:
-            student_id = record.get('student_id')
-            is_present = record.get('is_present', True)
-            
-            try:
-                student = StudentProfile.objects.get(id=student_id)
-                attendance_records.append(AttendanceRecord(
-                    session=attendance_session,
-                    student=student,
-                    is_present=is_present
-                ))
-            except StudentProfile.DoesNotExist:
-                continue
+        if len(items) > AttendanceSync.MAX_ITEMS:
+            return Response({
+                'success': False,
+                'message': f'At most {AttendanceSync.MAX_ITEMS} items per sync'
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Bulk create records
-        AttendanceRecord.objects.bulk_create(attendance_records)
+        results = AttendanceSync.sync(request.user, items)
         
         return Response({
             'success': True,
-            'message': f'Attendance saved successfully for {len(attendance_records)} students',
-            'session_id': attendance_session.id
+            'message': f"{sum(1 for r in results if r['status'] == 'applied')} of {len(results)} items applied",
+            'results': results
         })
         
+    except IntegrityError:
+        # Another request stored one of these keys concurrently; a retry returns duplicates
+        return Response({
+            'success': False,
+            'message': 'Sync conflicted with a concurrent request, please retry'
+        }, status=status.HTTP_409_CONFLICT)
     except Exception as e:
         return Response({
             'success': False,
-            'message': f'Error saving attendance: {str(e)}'
+            'message': f'Error syncing attendance: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 @api_view(['GET'])
@@ -330,7 +306,7 @@ def get_student_attendance_summary(request, student_id):
 # ADD Django views for HTML pages (not API)
 def attendance_dashboard(request):
     """HTML view: Dashboard showing all classes"""
-    classes = Class.objects.all() # Rely on Meta ordering
+    classes = Class.objects.with_student_count() # Rely on Meta ordering
     return render(request, 'attendance/dashboard.html', {'classes': classes})
 
 def class_students_summary(request, class_id):
@@ -352,10 +328,8 @@ def class_students_summary(request, class_id):
         'student_summaries': student_summaries
     })
 
-def student_calendar_view(request, student_id):
-    """Individual student calendar view with safe parameter parsing"""
-    student = get_object_or_404(StudentProfile, id=student_id)
-    
+def _calendar_month(request):
+    """year/month from the query string, defaulting to the current month"""
     # SAFE parsing with default values
     def safe_int(value, default):
         """Safely convert to int with fallback to default"""
@@ -366,53 +340,47 @@ def student_calendar_view(request, student_id):
         except (ValueError, TypeError):
             return default
     
-    # Get month/year from request with safe defaults
-    year = safe_int(request.GET.get('year'), datetime.now().year)
-    month = safe_int(request.GET.get('month'), datetime.now().month)
+    now = datetime.now()
+    year = safe_int(request.GET.get('year'), now.year)
+    month = safe_int(request.GET.get('month'), now.month)
     
     # Validate month range (1-12)
     if not (1 <= month <= 12):
-        month = datetime.now().month
-    
-    # Calculate month date range
-    start_date = datetime(year, month, 1).date()
-    if month == 12:
-        end_date = datetime(year + 1, 1, 1).date() - timedelta(days=1)
-    else:
-        end_date = datetime(year, month + 1, 1).date() - timedelta(days=1)
-    
-    # Get attendance summary
-    summary = AttendanceCalculator.get_student_attendance_summary(
-        student_id, start_date, end_date
-    )
-    
-    # Create calendar matrix
-    cal = calendar.monthcalendar(year, month)
-    calendar_data = []
+        month = now.month
+    return year, month
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def student_calendar_data(request, student_id):
+    """Cached month calendar of a student as JSON for the app"""
+    try:
+        student = StudentProfile.objects.filter(id=student_id).only('id', 'student_class_id').first()
+        if not student:
+            return Response({
+                'success': False,
+                'message': 'Student not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        year, month = _calendar_month(request)
+        return Response({
+            'success': True,
+            'calendar': StudentCalendar.month(student, year, month)
+        })
+    except Exception as e:
+        return Response({
+            'success': False,
+            'message': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def student_calendar_view(request, student_id):
+    """Individual student calendar view with safe parameter parsing"""
+    student = get_object_or_404(StudentProfile, id=student_id)
+    year, month = _calendar_month(request)
     
-    for week in cal:
-        week_data = []
-        for day in week:
-            if day == 0:
-                week_data.append(None)
-            else:
-                date = datetime(year, month, day).date()
-                date_str = date.strftime('%Y-%m-%d')
-                
-                day_info = {
-                    'day': day,
-                    'date': date,
-                    'status': 'NO_SCHOOL'
-                }
-                
-                if date_str in summary['daily_records']:
-                    record = summary['daily_records'][date_str]
-                    day_info['status'] = record['status']
-                elif date.weekday() < 5:  # Weekday
-                    day_info['status'] = 'ABSENT'
-                
-                week_data.append(day_info)
-        calendar_data.append(week_data)
+    # Summary and calendar grid come from one cached payload
+    payload = StudentCalendar.month(student, year, month)
     
     # Navigation with safe URLs
     prev_month = month - 1 if month > 1 else 12
@@ -422,9 +390,9 @@ def student_calendar_view(request, student_id):
     
     return render(request, 'attendance/student_calendar.html', {
         'student': student,
-        'summary': summary,
-        'calendar_data': calendar_data,
-        'current_month': calendar.month_name[month],
+        'summary': payload,
+        'calendar_data': payload['weeks'],
+        'current_month': payload['month_name'],
         'current_year': year,
         'prev_month': prev_month,
         'prev_year': prev_year,
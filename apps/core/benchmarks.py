@@ -0,0 +1,267 @@
+"""
+Endpoint benchmarks against the synthetic school (generate_school_data).
+
+Each case is one hot endpoint called through the Django test client, so no
+server or network is involved. A run happens inside a transaction that is
+rolled back, so the write endpoints (marks save, payments) leave the dataset
+as it was and runs stay comparable with the stored baseline. Entries cached
+during the run can hold the rolled-back rows, so the cache is cleared before
+and after it. Baselines are only comparable on the database vendor they
+were recorded on.
+
+The settings_import case times a fresh interpreter importing the settings in
+production mode, the part of a cold start that runs before any request.
+
+ThroughputBenchmark puts concurrent GET load on a running server instead,
+to compare gunicorn worker profiles (benchmark_throughput).
+"""
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import Client
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+from apps.assessments.models import StudentMark
+from apps.attendance.models import AttendanceSession
+from apps.fees.models import FeeStructure, StudentFee
+from apps.students.models import Class, StudentProfile
+from apps.users.models import User
+from .instrumentation import QueryRecorder
+
+JSON = 'application/json'
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+class EndpointBenchmark:
+    """Times each hot endpoint and counts its queries"""
+
+    def __init__(self, prefix='syn', iterations=20, warmup=3, only=None, log=None):
+        self.prefix = prefix
+        self.iterations = iterations
+        self.warmup = warmup
+        self.only = set(only or ())
+        self.log = log or (lambda name, result: None)
+
+    def fixtures(self):
+        """The principal, class, exam, student and latest school day the cases run against"""
+        principal = User.objects.filter(username=f'{self.prefix}_principal').first()
+        if principal is None:
+            raise BenchmarkError(f"No synthetic data with prefix '{self.prefix}'; run generate_school_data first")
+        cls = Class.objects.filter(name__startswith=f'{self.prefix}-').order_by('-order', 'id').first()
+        student = StudentProfile.objects.filter(student_class=cls).select_related('user').order_by('id').first()
+        marks = StudentMark.objects.filter(student__student_class=cls).order_by('exam__order', 'exam_id')
+        exam_id = marks.values_list('exam_id', flat=True).first()
+        sheet = {}
+        for student_id, subject_id, obtained in marks.filter(exam_id=exam_id).values_list(
+            'student_id', 'subject_id', 'marks_obtained'
+        ):
+            sheet.setdefault(str(student_id), {})[str(subject_id)] = str(obtained)
+        day = AttendanceSession.objects.filter(student_class=cls).order_by('-date').values_list(
+            'date', flat=True
+        ).first()
+
+        # record_payment pays against the current month's fee
+        now = timezone.now()
+        structure, _ = FeeStructure.objects.get_or_create(
+            class_group=cls.class_group, fee_month=now.strftime('%b-%Y'),
+            defaults={'amount': 2000, 'due_date': now.date()}
+        )
+        StudentFee.objects.get_or_create(student=student, fee_structure=structure, defaults={'amount_due': 2000})
+
+        return {
+            'principal': principal, 'class_id': cls.id, 'exam_id': exam_id, 'student': student,
+            'marks': sheet, 'date': day.isoformat() if day else now.date().isoformat(),
+        }
+
+    def cases(self, f):
+        """(name, method, path, payload)"""
+        student_id = f['student'].id
+        return [
+            ('principal_dashboard', 'GET', '/api/dashboard/principal/summary/', None),
+            ('fee_dashboard', 'GET', '/api/fees/dashboard/', None),
+            ('marks_sheet_load', 'POST', '/api/assessments/marks-sheet-data/',
+             {'class_id': f['class_id'], 'exam_id': f['exam_id']}),
+            ('marks_sheet_save', 'POST', '/api/assessments/save-marks-sheet/',
+             {'exam_id': f['exam_id'], 'marks': f['marks']}),
+            ('report_card', 'GET', f'/api/assessments/student-marks/{student_id}/', None),
+            ('class_attendance_today', 'GET', f"/api/attendance/{f['class_id']}/?date={f['date']}&session=morning", None),
+            ('school_attendance_report', 'GET', f"/api/attendance/report/?date={f['date']}&session=both", None),
+            ('student_search', 'GET', f"/api/students/search/?q={f['student'].user.last_name[:4]}", None),
+            ('fee_status', 'GET', f'/api/fees/student-status/?student_id={student_id}', None),
+            ('record_payment', 'POST', '/api/fees/record-payment/',
+             {'student_id': student_id, 'mode': 'PAY', 'amount_paid': 1, 'payment_method': 'CASH'}),
+        ]
+
+    def read_requests(self):
+        """GET paths of the cases and a bearer token, for load from outside the process"""
+        with transaction.atomic():
+            f = self.fixtures()
+            paths = [path for _, method, path, _ in self.cases(f) if method == 'GET']
+            token = str(AccessToken.for_user(f['principal']))
+            transaction.set_rollback(True)
+        return paths, token
+
+    def _call(self, client, name, method, path, payload):
+        if method == 'GET':
+            response = client.get(path)
+        else:
+            response = client.post(path, json.dumps(payload), content_type=JSON)
+        body = response.json() if response.get('Content-Type', '').startswith(JSON) else {}
+        if response.status_code >= 400 or body.get('success') is False:
+            raise BenchmarkError(f'{name} failed with {response.status_code}: {response.content[:200]!r}')
+
+    def measure(self, client, name, method, path, payload):
+        for _ in range(self.warmup):
+            self._call(client, name, method, path, payload)
+        timings, queries = [], []
+        for _ in range(self.iterations):
+            recorder = QueryRecorder()
+            start = time.perf_counter()
+            with recorder.record():
+                self._call(client, name, method, path, payload)
+            timings.append((time.perf_counter() - start) * 1000)
+            queries.append(recorder.count)
+        return {
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'queries': percentile(queries, 50),
+        }
+
+    def measure_settings_import(self):
+        """Fresh interpreter importing config.settings with DEBUG off; it must not touch the database"""
+        env = dict(os.environ, DJANGO_DEBUG='False')
+        timings = []
+        for _ in range(self.iterations):
+            start = time.perf_counter()
+            result = subprocess.run(
+                [sys.executable, '-c', 'import config.settings'],
+                cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, timeout=60
+            )
+            timings.append((time.perf_counter() - start) * 1000)
+            if result.returncode:
+                raise BenchmarkError(f'settings import failed: {result.stderr[-200:]}')
+        return {
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'queries': 0,
+        }
+
+    def run(self):
+        """{case name: {'p50_ms', 'p95_ms', 'queries'}}"""
+        results = {}
+        cache.clear()
+        try:
+            with transaction.atomic():
+                f = self.fixtures()
+                client = Client(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(f['principal'])}")
+                client.force_login(f['principal'])  # the marks sheet views use the session
+                for name, method, path, payload in self.cases(f):
+                    if self.only and name not in self.only:
+                        continue
+                    results[name] = self.measure(client, name, method, path, payload)
+                    self.log(name, results[name])
+                transaction.set_rollback(True)
+        finally:
+            cache.clear()
+        if not self.only or 'settings_import' in self.only:
+            results['settings_import'] = self.measure_settings_import()
+            self.log('settings_import', results['settings_import'])
+        return results
+
+    @staticmethod
+    def baseline_document(results, iterations):
+        return {
+            'meta': {
+                'iterations': iterations,
+                'database': connection.vendor,
+                'recorded_at': timezone.now().isoformat(timespec='seconds'),
+            },
+            'endpoints': results,
+        }
+
+    @staticmethod
+    def check_baseline(document):
+        """Refuse a baseline recorded on another database vendor; its timings and query counts do not carry over"""
+        recorded_on = document.get('meta', {}).get('database')
+        if recorded_on != connection.vendor:
+            raise BenchmarkError(
+                f'Baseline was recorded on {recorded_on}, this database is {connection.vendor}; '
+                f'record one with --update and --baseline pointing to a file for {connection.vendor}'
+            )
+
+    @staticmethod
+    def compare(results, baseline, threshold=0.5, slack_ms=5.0):
+        """
+        Regression messages: any extra query, or p50/p95 more than `threshold`
+        (a fraction) plus `slack_ms` above the baseline.
+        """
+        regressions = []
+        for name, current in results.items():
+            previous = baseline.get(name)
+            if not previous:
+                continue
+            if current['queries'] > previous['queries']:
+                regressions.append(f"{name}: {current['queries']} queries (baseline {previous['queries']})")
+            for key in ('p50_ms', 'p95_ms'):
+                limit = previous[key] * (1 + threshold) + slack_ms
+                if current[key] > limit:
+                    regressions.append(f'{name}: {key} {current[key]} (baseline {previous[key]}, limit {limit:.2f})')
+        return regressions
+
+
+class ThroughputBenchmark:
+    """`concurrency` clients request `paths` in turn against `base_url` for `duration` seconds"""
+
+    def __init__(self, base_url, paths, token, concurrency=16, duration=15):
+        self.base_url = base_url.rstrip('/')
+        self.paths = paths
+        self.headers = {'Authorization': f'Bearer {token}'}
+        self.concurrency = concurrency
+        self.duration = duration
+
+    def _client(self, offset, deadline):
+        timings, errors = [], 0
+        index = offset
+        while time.monotonic() < deadline:
+            request = urllib.request.Request(self.base_url + self.paths[index % len(self.paths)], headers=self.headers)
+            index += 1
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=30) as response:
+                    response.read()
+            except (urllib.error.URLError, OSError):
+                errors += 1
+                continue
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings, errors
+
+    def run(self):
+        deadline = time.monotonic() + self.duration
+        with ThreadPoolExecutor(self.concurrency) as executor:
+            results = list(executor.map(lambda offset: self._client(offset, deadline), range(self.concurrency)))
+        timings = [timing for client_timings, _ in results for timing in client_timings]
+        return {
+            'requests': len(timings),
+            'errors': sum(errors for _, errors in results),
+            'requests_per_second': round(len(timings) / self.duration, 1),
+            'p50_ms': round(percentile(timings, 50), 1) if timings else None,
+            'p95_ms': round(percentile(timings, 95), 1) if timings else None,
+        }
@@ -0,0 +1,143 @@
+"""
+PostgreSQL backend that shares a per-process pool of psycopg2 connections.
+
+Django keeps one connection per thread; with CONN_MAX_AGE that connection
+stays open for the life of the thread. Here closing a connection (at the
+end of every request, as CONN_MAX_AGE is 0) returns it to a pool shared
+by all threads of the worker, so a gthread worker holds at most
+POOL['max_size'] server connections however many threads it runs.
+
+DATABASES['default'] = {'ENGINE': 'apps.core.db.pooled', 'CONN_MAX_AGE': 0,
+                        'POOL': {'max_size': 4, 'timeout': 10}, ...}
+"""
+import os
+import threading
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+from django.db.utils import OperationalError
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+from apps.core.metrics import gauge
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    """At most `max_size` connections out at once; checkout waits `timeout` seconds for one"""
+
+    def __init__(self, max_size=4, timeout=10):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle = []
+        self.in_use = 0
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _reset(connection):
+        """Roll back anything left open; False when the connection is unusable"""
+        try:
+            if connection.closed:
+                return False
+            if connection.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+            return connection.get_transaction_status() == TRANSACTION_STATUS_IDLE
+        except Exception:
+            return False
+
+    @classmethod
+    def _alive(cls, connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except Exception:
+            return False
+        return cls._reset(connection)
+
+    @staticmethod
+    def _discard(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def get(self, connect, check=False):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise OperationalError(
+                f'No database connection free after {self.timeout}s (pool max_size {self.max_size})'
+            )
+        try:
+            while True:
+                with self._lock:
+                    connection = self.idle.pop() if self.idle else None
+                if connection is None:
+                    connection = connect()
+                    break
+                # Idle connections can be dropped by the server or a proxy
+                if not connection.closed and (not check or self._alive(connection)):
+                    break
+                self._discard(connection)
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self.in_use += 1
+        return connection
+
+    def put(self, connection, discard=False):
+        reusable = not discard and self._reset(connection)
+        with self._lock:
+            self.in_use -= 1
+            if reusable:
+                self.idle.append(connection)
+        if not reusable:
+            self._discard(connection)
+        self._slots.release()
+
+    def close(self):
+        with self._lock:
+            idle, self.idle = self.idle, []
+        for connection in idle:
+            self._discard(connection)
+
+
+def get_pool(settings_dict):
+    """One pool per process and database; forked workers never share a parent's connections"""
+    key = (os.getpid(), settings_dict['HOST'], settings_dict['PORT'], settings_dict['NAME'], settings_dict['USER'])
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = ConnectionPool(**settings_dict.get('POOL', {}))
+    return pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        pool = get_pool(self.settings_dict)
+        connection = pool.get(
+            lambda: super(DatabaseWrapper, self).get_new_connection(conn_params),
+            check=self.settings_dict['CONN_HEALTH_CHECKS']
+        )
+        # The parent sets this while connecting; reused connections need it too
+        self.isolation_level = IsolationLevel(
+            self.settings_dict['OPTIONS'].get('isolation_level', IsolationLevel.READ_COMMITTED)
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                # Closed inside atomic() the wrapper keeps its reference, so the
+                # connection must not go back to other threads
+                get_pool(self.settings_dict).put(self.connection, discard=self.in_atomic_block)
+
+
+@gauge('db_pool_connections', 'Pooled database connections in this worker', ('state',))
+def pool_connections():
+    pools = [pool for (pid, *_), pool in list(_pools.items()) if pid == os.getpid()]
+    return {
+        ('in_use',): sum(pool.in_use for pool in pools),
+        ('idle',): sum(len(pool.idle) for pool in pools),
+    }
@@ -0,0 +1,56 @@
+"""
+Conditional GET for views whose payload only changes with version counters.
+
+The ETag and Last-Modified values come from apps.core.versioning, so a
+revalidation that ends in 304 Not Modified reads the cache and nothing else.
+"""
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+from .versioning import get_versions
+
+
+def _versions_etag(request, resources):
+    versions = get_versions(*resources)
+    raw = request.get_full_path() + ''.join(f'|{name}:{versions[name]}' for name in resources)
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def _versions_last_modified(resources):
+    newest = max(get_versions(*resources).values())
+    return datetime.fromtimestamp(newest / 1000, tz=timezone.utc)
+
+
+def conditional_get(*resources, max_age=60, private=True):
+    """
+    ETag / Last-Modified / Cache-Control for a view driven by version counters.
+    Use under @api_view (after authentication) or via method_decorator on APIView.get.
+    """
+    def decorator(view_func):
+        @condition(
+            etag_func=lambda request, *args, **kwargs: _versions_etag(request, resources),
+            last_modified_func=lambda request, *args, **kwargs: _versions_last_modified(resources),
+        )
+        def conditional_view(request, *args, **kwargs):
+            return view_func(request, *args, **kwargs)
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_func(request, *args, **kwargs)
+
+            response = conditional_view(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                # Clients may reuse the payload for max_age, then revalidate
+                patch_cache_control(
+                    response, max_age=max_age, must_revalidate=True,
+                    **({'private': True} if private else {'public': True})
+                )
+                if private:
+                    patch_vary_headers(response, ['Authorization'])
+            return response
+
+        return wrapper
+    return decorator
@@ -0,0 +1,109 @@
+"""
+Per-request query and latency instrumentation.
+
+QueryRecorder hooks every database connection with execute_wrapper, so it
+works with DEBUG off. RequestInstrumentationMiddleware uses it to log one
+structured line per request, add a Server-Timing header, feed the /metrics
+request histograms and warn when a request goes over its query budget or
+repeats the same query shape.
+"""
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from django.conf import settings
+from django.db import connections
+from . import metrics
+
+logger = logging.getLogger('apps.core.requests')
+
+_PLACEHOLDER_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """Query shape: parameters are already placeholders, IN/VALUES lists of any length collapse"""
+    return _WHITESPACE.sub(' ', _PLACEHOLDER_LIST.sub('(...)', sql)).strip()
+
+
+class QueryRecorder:
+    """Counts, times and fingerprints the queries run while recording"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    @contextmanager
+    def record(self):
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+            yield self
+
+    def duplicates(self, minimum=2):
+        """Fingerprints run at least `minimum` times, most repeated first"""
+        return {sql: count for sql, count in self.fingerprints.most_common() if count >= minimum}
+
+
+class RequestInstrumentationMiddleware:
+    """
+    Settings:
+    REQUEST_INSTRUMENTATION (default True) switches it off,
+    REQUEST_QUERY_BUDGET (default 50) queries before a warning,
+    REQUEST_DUPLICATE_QUERY_LIMIT (default 5) repeats of one query shape before a warning.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'REQUEST_INSTRUMENTATION', True)
+        self.query_budget = getattr(settings, 'REQUEST_QUERY_BUDGET', 50)
+        self.duplicate_limit = getattr(settings, 'REQUEST_DUPLICATE_QUERY_LIMIT', 5)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with recorder.record():
+            response = self.get_response(request)
+        total = time.perf_counter() - start
+
+        request.query_stats = recorder
+        view = request.resolver_match.view_name if request.resolver_match else ''
+        # Unmatched paths share one label so 404 scans cannot blow up the metrics
+        metrics.observe_request(view or 'unmatched', request.method, response.status_code, total, recorder.count)
+        response['Server-Timing'] = (
+            f'db;dur={recorder.duration * 1000:.1f};desc="{recorder.count} queries", '
+            f'total;dur={total * 1000:.1f}'
+        )
+
+        entry = {
+            'method': request.method,
+            'path': request.path,
+            'view': view,
+            'status': response.status_code,
+            'duration_ms': round(total * 1000, 1),
+            'db_ms': round(recorder.duration * 1000, 1),
+            'queries': recorder.count,
+        }
+        duplicates = recorder.duplicates(self.duplicate_limit)
+        if recorder.count > self.query_budget or duplicates:
+            entry['query_budget'] = self.query_budget
+            entry['duplicates'] = [{'sql': sql[:300], 'count': count} for sql, count in list(duplicates.items())[:5]]
+            logger.warning(json.dumps(entry))
+        else:
+            logger.info(json.dumps(entry))
+        return response
@@ -0,0 +1,80 @@
+import contextlib
+import io
+import json
+import logging
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from apps.core.benchmarks import BenchmarkError, EndpointBenchmark
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the hot endpoints against the synthetic school and compare with the stored baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help='Timed requests per endpoint')
+        parser.add_argument('--warmup', type=int, default=3, help='Untimed requests per endpoint first')
+        parser.add_argument('--prefix', default='syn', help='Prefix used by generate_school_data')
+        parser.add_argument('--endpoint', action='append', help='Only run this case (repeatable)')
+        parser.add_argument(
+            '--baseline',
+            default=getattr(settings, 'ENDPOINT_BENCHMARK_BASELINE', Path(settings.BASE_DIR) / 'benchmarks' / 'endpoints.json'),
+            help='Baseline JSON file'
+        )
+        parser.add_argument('--threshold', type=float, default=0.5, help='Allowed latency growth as a fraction')
+        parser.add_argument('--slack-ms', type=float, default=5.0, help='Allowed latency growth in ms on top of --threshold')
+        parser.add_argument('--update', action='store_true', help='Write the results as the new baseline')
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('❌ --iterations must be at least 1')
+        path = Path(options['baseline'])
+        stored = json.loads(path.read_text()) if path.exists() else None
+        if stored is not None and not (options['update'] and not options['endpoint']):
+            # Comparing with, or merging into, a baseline from another database is meaningless
+            try:
+                EndpointBenchmark.check_baseline(stored)
+            except BenchmarkError as e:
+                raise CommandError(f'❌ {e}')
+        benchmark = EndpointBenchmark(
+            prefix=options['prefix'], iterations=options['iterations'], warmup=options['warmup'],
+            only=options['endpoint'], log=self.report
+        )
+
+        self.stdout.write(f"⏱️ Benchmarking endpoints ({options['iterations']} runs each, p50 / p95 / queries)...")
+        # Keep request logs and debug prints from the views out of the report
+        logging.disable(logging.WARNING)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                results = benchmark.run()
+        except BenchmarkError as e:
+            raise CommandError(f'❌ {e}')
+        finally:
+            logging.disable(logging.NOTSET)
+
+        if options['update'] or stored is None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            document = EndpointBenchmark.baseline_document(results, options['iterations'])
+            if stored is not None and options['endpoint']:
+                # Partial runs only replace their own entries
+                stored['endpoints'].update(results)
+                document['endpoints'] = stored['endpoints']
+            path.write_text(json.dumps(document, indent=2, sort_keys=True) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'✅ Baseline written to {path}'))
+            return
+
+        baseline = stored['endpoints']
+        missing = sorted(set(results) - set(baseline))
+        if missing:
+            self.stdout.write(f"⚠️ Not in the baseline yet: {', '.join(missing)}")
+        regressions = EndpointBenchmark.compare(results, baseline, options['threshold'], options['slack_ms'])
+        if regressions:
+            for regression in regressions:
+                self.stdout.write(self.style.ERROR(f'   {regression}'))
+            raise CommandError(f'❌ {len(regressions)} regression(s) against {path}')
+        self.stdout.write(self.style.SUCCESS(f'✅ No regressions against {path}'))
+
+    def report(self, name, result):
+        self.stdout.write(
+            f"   {name:<26} {result['p50_ms']:>8.1f}ms {result['p95_ms']:>8.1f}ms {result['queries']:>5} queries"
+        )
@@ -0,0 +1,102 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from apps.core.benchmarks import BenchmarkError, EndpointBenchmark, ThroughputBenchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Start gunicorn with each worker profile from gunicorn.conf.py (sync, gthread) and measure '
+        'requests per second over the read endpoints of benchmark_endpoints'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', default='sync,gthread', help='Comma separated GUNICORN_PROFILE values')
+        parser.add_argument('--workers', type=int, default=2, help='WEB_CONCURRENCY for every profile')
+        parser.add_argument('--threads', type=int, default=4, help='GUNICORN_THREADS for gthread')
+        parser.add_argument('--concurrency', type=int, default=16, help='Concurrent clients')
+        parser.add_argument('--duration', type=float, default=15, help='Seconds of load per profile')
+        parser.add_argument('--url', help='Benchmark this running server instead of starting gunicorn')
+        parser.add_argument('--prefix', default='syn', help='Prefix used by generate_school_data')
+        parser.add_argument('--output', help='Also write the results to this JSON file')
+
+    def handle(self, *args, **options):
+        try:
+            paths, token = EndpointBenchmark(prefix=options['prefix']).read_requests()
+        except BenchmarkError as e:
+            raise CommandError(f'❌ {e}')
+
+        results = {}
+        if options['url']:
+            results['url'] = self.measure(options['url'], paths, token, options)
+        else:
+            for profile in options['profiles'].split(','):
+                results[profile] = self.run_profile(profile.strip(), paths, token, options)
+
+        baseline = results.get('sync')
+        for name, result in results.items():
+            if baseline and name != 'sync' and baseline['requests_per_second']:
+                change = result['requests_per_second'] / baseline['requests_per_second'] - 1
+                self.stdout.write(f"📈 {name} vs sync: {change:+.0%} requests per second")
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(results, indent=2) + '\n')
+            self.stdout.write(self.style.SUCCESS(f"✅ Results written to {options['output']}"))
+
+    def measure(self, url, paths, token, options):
+        result = ThroughputBenchmark(
+            url, paths, token, concurrency=options['concurrency'], duration=options['duration']
+        ).run()
+        self.stdout.write(
+            f"   {result['requests_per_second']} req/s, p50 {result['p50_ms']}ms, p95 {result['p95_ms']}ms, "
+            f"{result['requests']} requests, {result['errors']} errors"
+        )
+        return result
+
+    def run_profile(self, profile, paths, token, options):
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        url = f'http://127.0.0.1:{port}'
+        env = dict(
+            os.environ,
+            GUNICORN_PROFILE=profile,
+            WEB_CONCURRENCY=str(options['workers']),
+            GUNICORN_THREADS=str(options['threads']),
+            # The benchmark sends far more than a day's worth of API requests
+            API_THROTTLE_USER='100000000/day',
+        )
+        self.stdout.write(f"🚀 {profile}: {options['workers']} workers" + (
+            f" x {options['threads']} threads" if profile == 'gthread' else ''
+        ))
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', 'config.wsgi:application',
+             '--config', str(Path(settings.BASE_DIR) / 'gunicorn.conf.py'), '--bind', f'127.0.0.1:{port}'],
+            cwd=settings.BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            self.wait_until_ready(url, server)
+            # Warm every worker's caches before timing
+            ThroughputBenchmark(url, paths, token, concurrency=options['concurrency'], duration=2).run()
+            return self.measure(url, paths, token, options)
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    def wait_until_ready(self, url, server, timeout=60):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f'❌ gunicorn exited with code {server.returncode}')
+            try:
+                with urllib.request.urlopen(f'{url}/ready', timeout=2):
+                    return
+            except OSError:
+                time.sleep(0.5)
+        raise CommandError(f'❌ gunicorn did not become ready within {timeout}s')
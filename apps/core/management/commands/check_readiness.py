@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from apps.core.readiness import wait_until_ready
+
+
+class Command(BaseCommand):
+    help = 'Report the configuration and check the database and cache; with --wait, retry until they are up'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wait', type=float, default=0, help='Seconds to keep retrying (release phase)')
+        parser.add_argument('--interval', type=float, default=2, help='Seconds between retries')
+
+    def handle(self, *args, **options):
+        database = settings.DATABASES['default']
+        self.stdout.write(f"🔧 DEBUG: {settings.DEBUG}")
+        self.stdout.write(f"🔧 ALLOWED_HOSTS: {settings.ALLOWED_HOSTS}")
+        self.stdout.write(f"🔧 SECURE_SSL_REDIRECT: {settings.SECURE_SSL_REDIRECT}")
+        self.stdout.write(f"🔧 CSRF_TRUSTED_ORIGINS: {getattr(settings, 'CSRF_TRUSTED_ORIGINS', 'N/A')}")
+        self.stdout.write(f"🔧 STATICFILES_STORAGE: {settings.STATICFILES_STORAGE}")
+        self.stdout.write(f"🗄️ Database: {connection.vendor} {database.get('HOST') or ''} {database['NAME']}")
+        self.stdout.write(f"🔌 Connections: {getattr(settings, 'DB_POOL', 'persistent')}")
+        self.stdout.write(f"🗃️ Cache: {settings.CACHES['default']['BACKEND']}")
+
+        report = wait_until_ready(options['wait'], options['interval'], log=self.stdout.write)
+        for name, check in report['checks'].items():
+            if check['ok']:
+                self.stdout.write(self.style.SUCCESS(f"✅ {name}: {check['latency_ms']}ms"))
+            else:
+                self.stdout.write(self.style.ERROR(f"❌ {name}: {check['error']}"))
+        if not report['ready']:
+            raise CommandError('❌ Not ready')
+
+        if getattr(settings, 'DB_POOL', '') == 'pgbouncer':
+            # PgBouncer hands out server connections per transaction, so a SET TIME ZONE would not stick
+            with connection.cursor() as cursor:
+                cursor.execute('SHOW TIME ZONE')
+                zone = cursor.fetchone()[0]
+            if zone != settings.TIME_ZONE:
+                self.stdout.write(self.style.WARNING(
+                    f"⚠️ Database timezone is {zone}; set the role's timezone to {settings.TIME_ZONE} for transaction pooling"
+                ))
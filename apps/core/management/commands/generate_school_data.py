@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.core.synthetic import DEFAULT_YEAR, SchoolDataGenerator
+
+
+class Command(BaseCommand):
+    help = 'Generate a deterministic synthetic school (classes, students, attendance, marks, fees) for load testing'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--classes', type=int, default=12, help='Classes, spread over LKG-10 (12 levels)')
+        parser.add_argument('--students', type=int, default=40, help='Students per class')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed; the same seed builds the same school')
+        parser.add_argument('--prefix', default='syn', help='Prefix of generated usernames and class names')
+        parser.add_argument('--year', default=DEFAULT_YEAR, help='Academic year (by name) to fill from start to end')
+        parser.add_argument('--flush', action='store_true', help='Delete data from a previous run with this prefix first')
+    
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if options['classes'] < 1 or options['students'] < 1:
+            raise CommandError('❌ --classes and --students must be at least 1')
+        if SchoolDataGenerator.existing(prefix):
+            if not options['flush']:
+                raise CommandError(f"❌ Synthetic data with prefix '{prefix}' exists; use --flush to replace it")
+            deleted = SchoolDataGenerator.flush(prefix)
+            self.stdout.write(f"🗑️ Deleted {deleted} rows from the previous run")
+        
+        self.stdout.write(
+            f"🏫 Generating {options['classes']} classes x {options['students']} students (seed {options['seed']})..."
+        )
+        try:
+            counts = SchoolDataGenerator(
+                classes=options['classes'],
+                students=options['students'],
+                seed=options['seed'],
+                prefix=prefix,
+                year=options['year'],
+                log=self.stdout.write
+            ).run()
+        except ValueError as e:
+            raise CommandError(f'❌ {e}')
+        
+        rows = sum(value for key, value in counts.items() if key != 'seconds')
+        self.stdout.write(self.style.SUCCESS(f"✅ Generated {rows} rows in {counts['seconds']}s"))
+        self.stdout.write(f"🔑 Log in as {prefix}_principal / {prefix}_teacher1 with password 'synthetic123'")
@@ -0,0 +1,271 @@
+"""
+In-process Prometheus-style metrics.
+
+Hot paths only touch a per-thread shard (no locks); a scrape merges the
+shards. Each gunicorn worker publishes its merged snapshot to the shared
+cache, so /metrics on any worker reports the sum over all workers.
+
+A worker registers by claiming a numbered slot with cache.add (atomic, so
+two workers never share one) and writes its snapshot under that slot. A
+scrape that finds a worker silent for METRICS_WORKER_TTL folds its last
+snapshot into a persistent retired total and frees the slot, so counters
+never go down when workers exit or are recycled. A worker retired while
+it was only idle re-registers and from then on publishes its counts minus
+what was already folded.
+"""
+import os
+import threading
+import time
+import uuid
+from itertools import count
+from bisect import bisect_left
+from django.conf import settings
+from django.core.cache import cache
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+SLOT_KEY = 'metrics:slot:{}'
+WORKER_KEY = 'metrics:worker:{}'
+RETIRED_KEY = 'metrics:retired'
+RETIRE_LOCK_KEY = 'metrics:retire-lock'
+SLOT_SCAN = 32  # slots read per get_many; scanning stops at the first empty batch
+
+_metrics = {}
+_gauges = {}
+_shards = []
+_local = threading.local()
+_last_publish = [0.0]
+_registration = {'pid': None, 'slot': None, 'token': None, 'published': {}, 'folded': {}}
+_publish_lock = threading.Lock()
+
+
+def _shard():
+    shard = getattr(_local, 'shard', None)
+    if shard is None:
+        shard = _local.shard = {}
+        _shards.append(shard)  # list.append is atomic
+    return shard
+
+
+class Counter:
+    type = 'counter'
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name, self.help, self.labelnames = name, help_text, tuple(labelnames)
+        _metrics[name] = self
+
+    def inc(self, amount=1, **labels):
+        shard = _shard()
+        key = (self.name, tuple(str(labels[label]) for label in self.labelnames))
+        shard[key] = shard.get(key, 0) + amount
+
+
+class Histogram:
+    type = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help_text, tuple(labelnames)
+        self.buckets = tuple(buckets)
+        _metrics[name] = self
+
+    def observe(self, value, **labels):
+        shard = _shard()
+        key = (self.name, tuple(str(labels[label]) for label in self.labelnames))
+        # [count per bucket..., count above the last bucket, sum]
+        values = shard.get(key)
+        if values is None:
+            values = shard[key] = [0] * (len(self.buckets) + 2)
+        values[bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+
+
+def gauge(name, help_text, labelnames=()):
+    """Register func() -> {label values tuple: value}, evaluated at scrape time"""
+    def decorator(func):
+        _gauges[name] = (help_text, tuple(labelnames), func)
+        return func
+    return decorator
+
+
+REQUESTS = Counter('http_requests_total', 'HTTP requests by view, method and status', ('view', 'method', 'status'))
+REQUEST_LATENCY = Histogram('http_request_duration_seconds', 'Request wall time by view', ('view',))
+REQUEST_QUERIES = Histogram('http_request_db_queries', 'DB queries per request by view', ('view',), QUERY_BUCKETS)
+CACHE_LOOKUPS = Counter('cache_lookups_total', 'Application cache lookups by cache and result', ('cache', 'result'))
+EVENTS = Counter('business_events_total', 'Business events (payments, attendance sessions, ...)', ('event',))
+PAYMENTS_AMOUNT = Counter('payments_amount_total', 'Sum of recorded fee payment amounts')
+
+
+def observe_request(view, method, status, seconds, queries):
+    REQUESTS.inc(view=view, method=method, status=status)
+    REQUEST_LATENCY.observe(seconds, view=view)
+    REQUEST_QUERIES.observe(queries, view=view)
+    maybe_publish()
+
+
+def record_cache(name, hit):
+    CACHE_LOOKUPS.inc(cache=name, result='hit' if hit else 'miss')
+
+
+def record_event(event, amount=1):
+    EVENTS.inc(amount, event=event)
+
+
+def record_payment_amount(amount):
+    PAYMENTS_AMOUNT.inc(float(amount))
+
+
+def _merge(merged, items):
+    for key, value in items:
+        if isinstance(value, list):
+            current = merged.setdefault(key, [0] * len(value))
+            for index, item in enumerate(value):
+                current[index] += item
+        else:
+            merged[key] = merged.get(key, 0) + value
+
+
+def snapshot():
+    """This process' values merged over threads: {(name, labels): value or [buckets..., sum]}"""
+    merged = {}
+    for shard in list(_shards):
+        _merge(merged, list(shard.items()))
+    return merged
+
+
+def _subtract(values, folded):
+    result = {}
+    for key, value in values.items():
+        previous = folded.get(key)
+        if previous is None:
+            result[key] = value
+        elif isinstance(value, list):
+            result[key] = [item - old for item, old in zip(value, previous)]
+        else:
+            result[key] = value - previous
+    return result
+
+
+def _claim_slot(token):
+    for slot in count():
+        if cache.add(SLOT_KEY.format(slot), token, None):
+            return slot
+
+
+def publish():
+    """Store this worker's snapshot in the shared cache for other workers' scrapes"""
+    with _publish_lock:
+        state = _registration
+        if state['pid'] != os.getpid():
+            # A forked child must not publish under its parent's slot
+            state.update(pid=os.getpid(), slot=None, token=None, published={}, folded={})
+        if state['slot'] is not None and cache.get(SLOT_KEY.format(state['slot'])) != state['token']:
+            # Retired by a scrape while idle: what it last published is in the retired total now
+            _merge(state['folded'], state['published'].items())
+            state['slot'] = None
+        if state['slot'] is None:
+            state['token'] = uuid.uuid4().hex
+            state['slot'] = _claim_slot(state['token'])
+        now = time.time()
+        state['published'] = _subtract(snapshot(), state['folded'])
+        cache.set(WORKER_KEY.format(state['slot']), {'seen': now, 'values': state['published']}, None)
+        _last_publish[0] = now
+
+
+def maybe_publish():
+    if time.time() - _last_publish[0] > getattr(settings, 'METRICS_PUBLISH_INTERVAL', 15):
+        publish()
+
+
+def _workers():
+    """{slot: token} of every registered worker"""
+    workers = {}
+    for start in count(0, SLOT_SCAN):
+        keys = {SLOT_KEY.format(slot): slot for slot in range(start, start + SLOT_SCAN)}
+        found = cache.get_many(list(keys))
+        if not found:
+            return workers
+        workers.update((keys[key], token) for key, token in found.items())
+
+
+def _retire(slot, token):
+    """Fold a silent worker's last snapshot into the retired total and free its slot"""
+    if not cache.add(RETIRE_LOCK_KEY, 1, 30):
+        return  # another scrape is retiring; whatever is left waits for the next one
+    try:
+        if cache.get(SLOT_KEY.format(slot)) != token:
+            return
+        record = cache.get(WORKER_KEY.format(slot))
+        retired = cache.get(RETIRED_KEY) or {}
+        if record:
+            _merge(retired, record['values'].items())
+        cache.set(RETIRED_KEY, retired, None)
+        cache.delete_many([WORKER_KEY.format(slot), SLOT_KEY.format(slot)])
+    finally:
+        cache.delete(RETIRE_LOCK_KEY)
+
+
+def collect():
+    """Retired total plus the snapshot of every live worker (this one is always fresh)"""
+    publish()
+    ttl = getattr(settings, 'METRICS_WORKER_TTL', 300)
+    workers = _workers()
+    records = cache.get_many([WORKER_KEY.format(slot) for slot in workers])
+    now = time.time()
+    for slot, token in workers.items():
+        record = records.get(WORKER_KEY.format(slot))
+        if record and now - record['seen'] > ttl:
+            _retire(slot, token)
+
+    # One read for the retired total and the live snapshots, after any retirement
+    keys = [RETIRED_KEY] + [WORKER_KEY.format(slot) for slot in _workers()]
+    merged = {}
+    for key, value in cache.get_many(keys).items():
+        _merge(merged, (value if key == RETIRED_KEY else value['values']).items())
+    return merged
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def render():
+    """Prometheus text exposition format 0.0.4"""
+    values = collect()
+    by_metric = {}
+    for (name, labels), value in values.items():
+        by_metric.setdefault(name, []).append((labels, value))
+
+    lines = []
+    for name, metric in _metrics.items():
+        lines.append(f'# HELP {name} {metric.help}')
+        lines.append(f'# TYPE {name} {metric.type}')
+        for labels, value in sorted(by_metric.get(name, []), key=lambda item: item[0]):
+            if metric.type == 'counter':
+                lines.append(f'{name}{_labels(metric.labelnames, labels)} {value}')
+                continue
+            cumulative = 0
+            for bound, count in zip(metric.buckets + ('+Inf',), value[:-1]):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(metric.labelnames, labels, [("le", bound)])} {cumulative}')
+            lines.append(f'{name}_sum{_labels(metric.labelnames, labels)} {value[-1]}')
+            lines.append(f'{name}_count{_labels(metric.labelnames, labels)} {cumulative}')
+
+    for name, (help_text, labelnames, func) in _gauges.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} gauge')
+        for labels, value in sorted(func().items()):
+            lines.append(f'{name}{_labels(labelnames, labels)} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def reset():
+    """Forget this process' values and registration (tests)"""
+    for shard in list(_shards):
+        shard.clear()
+    _last_publish[0] = 0.0
+    _registration.update(pid=None, slot=None, token=None, published={}, folded={})
@@ -0,0 +1,436 @@
+"""
+Deterministic synthetic school for local load testing and benchmarks.
+
+Everything is derived from one random.Random(seed) and written with
+bulk_create, so the same options always produce the same school: the
+academic year is pinned by name and covered in full, whatever today's
+date or whichever year is marked current.
+Synthetic users and classes carry a name prefix so they can be removed
+again without touching real data.
+"""
+import hashlib
+import io
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, time as dt_time, timedelta
+from decimal import Decimal
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.db import transaction
+from django.utils import timezone
+from apps.assessments.grading import GradeTable, GradingEngine
+from apps.assessments.models import (
+    AcademicYear, ClassSubjectMapping, Exam, StudentExamSummary, StudentMark, Subject
+)
+from apps.assessments.ranking import RankingService
+from apps.assessments.reference import RESOURCE as REFERENCE_RESOURCE
+from apps.attendance.bitmaps import AttendanceBitmaps
+from apps.attendance.models import AttendanceRecord, AttendanceSession
+from apps.attendance.school_calendar import SchoolDays
+from apps.core.versioning import bump_version
+from apps.fees.models import ConcessionRequest, FeeStructure, FeeTransaction, StudentFee
+from apps.notifications.models import ANNOUNCEMENTS_RESOURCE, Announcement
+from apps.students.models import Class, StudentProfile
+from apps.students.roster import RESOURCE as ROSTER_RESOURCE
+from apps.teachers.models import TeacherProfile
+from apps.users.models import User
+
+# (level, class_group, cr_class subject key) in school order
+LEVELS = [
+    ('LKG', 'pre', 'pre'), ('UKG', 'pre', 'pre'),
+    ('1', '1-5', '1-2'), ('2', '1-5', '1-2'), ('3', '1-5', '3-5'), ('4', '1-5', '3-5'), ('5', '1-5', '3-5'),
+    ('6', '6-10', '6-7'), ('7', '6-10', '6-7'),
+    ('8', '6-10', '8-10'), ('9', '6-10', '8-10'), ('10', '6-10', '8-10'),
+]
+MONTHLY_FEE = {'pre': Decimal('1500'), '1-5': Decimal('2000'), '6-10': Decimal('2500')}
+FIRST_NAMES = ['Aarav', 'Ananya', 'Bhavya', 'Charan', 'Divya', 'Eshwar', 'Gayatri', 'Harsha', 'Ishaan', 'Jahnavi',
+               'Karthik', 'Lakshmi', 'Manoj', 'Nandini', 'Pranav', 'Rithika', 'Sai', 'Tejaswi', 'Varun', 'Yamini']
+LAST_NAMES = ['Reddy', 'Rao', 'Naidu', 'Sharma', 'Varma', 'Kumar', 'Chowdary', 'Goud', 'Patel', 'Shaik']
+PAYMENT_METHODS = ['CASH', 'CASH', 'UPI', 'UPI', 'BANK_TRANSFER', 'CHEQUE']
+BATCH_SIZE = 5000
+DEFAULT_YEAR = '2024-2025'  # the year setup_assessments seeds
+PASSWORD = 'synthetic123'
+
+
+class SchoolDataGenerator:
+    """Builds classes, people, a year of attendance, marks, fees and announcements"""
+
+    def __init__(self, classes=12, students=40, seed=42, prefix='syn', year=DEFAULT_YEAR, log=None):
+        self.classes = classes
+        self.students = students
+        self.year = year
+        self.rng = random.Random(seed)
+        self.prefix = prefix
+        self.log = log or (lambda message: None)
+        self.counts = {}
+
+    # -- helpers -------------------------------------------------------------
+
+    def _step(self, name, func):
+        started = time.monotonic()
+        count = func()
+        self.counts[name] = count
+        self.log(f"✓ {name}: {count} rows in {time.monotonic() - started:.1f}s")
+
+    @staticmethod
+    def existing(prefix):
+        return User.objects.filter(username__startswith=f'{prefix}_').exists()
+
+    @staticmethod
+    def flush(prefix):
+        """Delete everything a previous run with this prefix created"""
+        # The students' AttendanceMonth rows go with them, so nothing needs unmarking
+        with transaction.atomic(), AttendanceBitmaps.bulk_removal():
+            deleted = AttendanceRecord.objects.filter(student__user__username__startswith=f'{prefix}_').delete()[0]
+            users = User.objects.filter(username__startswith=f'{prefix}_').delete()[0]
+            classes = Class.objects.filter(name__startswith=f'{prefix}-').delete()[0]
+        bump_version(ROSTER_RESOURCE)
+        bump_version(REFERENCE_RESOURCE)
+        bump_version(ANNOUNCEMENTS_RESOURCE)
+        return deleted + users + classes
+
+    @staticmethod
+    def checksums(prefix):
+        """
+        SHA-256 per kind of generated row, over natural keys rather than ids or
+        timestamps, so two runs with the same options and seed compare equal
+        """
+        users = f'{prefix}_'
+        tables = {
+            'users': (User.objects.filter(username__startswith=users), (
+                'username', 'first_name', 'last_name', 'role'
+            )),
+            'students': (StudentProfile.objects.filter(user__username__startswith=users), (
+                'user__username', 'student_class__name', 'roll_number', 'mother_phone', 'father_phone'
+            )),
+            'attendance': (AttendanceRecord.objects.filter(student__user__username__startswith=users), (
+                'student__user__username', 'session__date', 'session__session', 'is_present'
+            )),
+            'marks': (StudentMark.objects.filter(student__user__username__startswith=users), (
+                'student__user__username', 'exam__name', 'subject__name', 'marks_obtained', 'grade'
+            )),
+            'fees': (StudentFee.objects.filter(student__user__username__startswith=users), (
+                'student__user__username', 'fee_structure__fee_month', 'total_amount', 'balance_amount'
+            )),
+            'payments': (FeeTransaction.objects.filter(student_fee__student__user__username__startswith=users), (
+                'student_fee__student__user__username', 'student_fee__fee_structure__fee_month',
+                'payment_date', 'amount_paid', 'payment_method'
+            )),
+        }
+        checksums = {}
+        for name, (queryset, fields) in tables.items():
+            digest = hashlib.sha256()
+            for row in queryset.order_by(*fields).values_list(*fields).iterator(chunk_size=BATCH_SIZE):
+                digest.update(repr(row).encode())
+            checksums[name] = digest.hexdigest()
+        return checksums
+
+    # -- steps ---------------------------------------------------------------
+
+    def reference_data(self):
+        call_command('setup_assessments', stdout=io.StringIO())
+        self.academic_year = AcademicYear.objects.filter(name=self.year).first()
+        if self.academic_year is None:
+            raise ValueError(f"No academic year named '{self.year}'")
+        self.exams = list(Exam.objects.filter(is_active=True).order_by('exam_type', 'order'))
+        self.subjects = {subject.name: subject for subject in Subject.objects.all()}
+        return 1 + len(self.exams) + len(self.subjects)
+
+    def create_classes(self):
+        rows = []
+        for index in range(self.classes):
+            level, class_group, _ = LEVELS[index % len(LEVELS)]
+            section = chr(ord('A') + index // len(LEVELS))
+            rows.append(Class(
+                name=f'{self.prefix}-{level}{section}', class_group=class_group,
+                order=index % len(LEVELS)
+            ))
+        Class.objects.bulk_create(rows)
+        self.class_list = list(Class.objects.filter(name__startswith=f'{self.prefix}-').order_by('id'))
+        self.subject_key = {
+            cls.id: LEVELS[index % len(LEVELS)][2] for index, cls in enumerate(self.class_list)
+        }
+        return len(self.class_list)
+
+    def map_subjects(self):
+        from apps.assessments.management.commands.cr_class import DEFAULT_SUBJECTS
+        mappings = []
+        self.main_subjects, self.class_subjects = {}, {}
+        for cls in self.class_list:
+            config = DEFAULT_SUBJECTS[self.subject_key[cls.id]]
+            main = [self.subjects[name] for name in config['main'] if name in self.subjects]
+            optional = [self.subjects[name] for name in config['optional'] if name in self.subjects]
+            self.main_subjects[cls.id] = main
+            self.class_subjects[cls.id] = main + optional
+            mappings.extend(
+                ClassSubjectMapping(student_class=cls, subject=subject, is_main_subject=subject in main,
+                                    academic_year=self.academic_year)
+                for subject in main + optional
+            )
+        ClassSubjectMapping.objects.bulk_create(mappings, ignore_conflicts=True)
+        return len(mappings)
+
+    def create_people(self):
+        password = make_password(PASSWORD)
+        users = [User(username=f'{self.prefix}_principal', first_name='Synthetic', last_name='Principal',
+                      role='principal', password=password, is_staff=True)]
+        for index, cls in enumerate(self.class_list):
+            users.append(User(
+                username=f'{self.prefix}_teacher{index + 1}', first_name=self.rng.choice(FIRST_NAMES),
+                last_name=self.rng.choice(LAST_NAMES), role='teacher', password=password
+            ))
+            for roll in range(1, self.students + 1):
+                users.append(User(
+                    username=f'{self.prefix}_s{index + 1}_{roll}', first_name=self.rng.choice(FIRST_NAMES),
+                    last_name=self.rng.choice(LAST_NAMES), role='student', password=password
+                ))
+        User.objects.bulk_create(users, batch_size=BATCH_SIZE)
+        ids = dict(User.objects.filter(username__startswith=f'{self.prefix}_').values_list('username', 'id'))
+        self.principal_id = ids[f'{self.prefix}_principal']
+
+        self.teacher_ids, profiles, teachers = {}, [], []
+        for index, cls in enumerate(self.class_list):
+            teacher_id = ids[f'{self.prefix}_teacher{index + 1}']
+            self.teacher_ids[cls.id] = teacher_id
+            teachers.append(TeacherProfile(user_id=teacher_id, subjects='Mathematics,Science'))
+            profiles.extend(
+                StudentProfile(
+                    user_id=ids[f'{self.prefix}_s{index + 1}_{roll}'], student_class=cls, roll_number=str(roll),
+                    mother_phone=f'9{self.rng.randrange(10 ** 8, 10 ** 9)}',
+                    father_phone=f'9{self.rng.randrange(10 ** 8, 10 ** 9)}'
+                )
+                for roll in range(1, self.students + 1)
+            )
+        TeacherProfile.objects.bulk_create(teachers)
+        StudentProfile.objects.bulk_create(profiles, batch_size=BATCH_SIZE)
+
+        self.roster = defaultdict(list)
+        for student_id, class_id in StudentProfile.objects.filter(
+            student_class__in=self.class_list
+        ).order_by('id').values_list('id', 'student_class_id'):
+            self.roster[class_id].append(student_id)
+        # Each student gets a stable attendance rate and ability for the whole year
+        self.attendance_rate = {sid: self.rng.uniform(0.7, 0.99) for ids_ in self.roster.values() for sid in ids_}
+        self.ability = {sid: self.rng.uniform(0.35, 0.95) for ids_ in self.roster.values() for sid in ids_}
+        return len(users) + len(profiles) + len(teachers)
+
+    def create_attendance(self):
+        year = self.academic_year
+        days = SchoolDays.dates(year.start_date, year.end_date)
+        marked_at = timezone.now()
+
+        sessions = [
+            AttendanceSession(date=day, session=session, student_class=cls, teacher_id=self.teacher_ids[cls.id])
+            for cls in self.class_list for day in days for session in ('morning', 'afternoon')
+        ]
+        AttendanceSession.objects.bulk_create(sessions, batch_size=BATCH_SIZE)
+        session_ids = {
+            (class_id, day, session): session_id
+            for session_id, class_id, day, session in AttendanceSession.objects.filter(
+                student_class__in=self.class_list
+            ).values_list('id', 'student_class_id', 'date', 'session')
+        }
+
+        total = 0
+        batch = []
+        for cls in self.class_list:
+            for day in days:
+                for student_id in self.roster[cls.id]:
+                    rate = self.attendance_rate[student_id]
+                    morning = self.rng.random() < rate
+                    # Afternoon mostly follows the morning
+                    afternoon = morning if self.rng.random() < 0.9 else not morning
+                    for session, present in (('morning', morning), ('afternoon', afternoon)):
+                        batch.append(AttendanceRecord(
+                            session_id=session_ids[(cls.id, day, session)], student_id=student_id,
+                            is_present=present, marked_at=marked_at
+                        ))
+                if len(batch) >= BATCH_SIZE:
+                    AttendanceRecord.objects.bulk_create(batch)
+                    total += len(batch)
+                    batch = []
+        AttendanceRecord.objects.bulk_create(batch)
+        total += len(batch)
+
+        # bulk_create skips the signals that keep the monthly bitmaps in step
+        AttendanceBitmaps.rebuild([sid for ids_ in self.roster.values() for sid in ids_])
+        return len(sessions) + total
+
+    def create_marks(self):
+        table = GradeTable.load()
+        teacher_of = self.teacher_ids
+        marks = []
+        for cls in self.class_list:
+            for exam in self.exams:
+                for student_id in self.roster[cls.id]:
+                    ability = self.ability[student_id]
+                    for subject in self.class_subjects[cls.id]:
+                        max_marks = exam.get_max_marks(cls.class_group, subject)
+                        absent = self.rng.random() < 0.01
+                        score = 0 if absent else max(0.0, min(1.0, self.rng.gauss(ability, 0.1))) * max_marks
+                        mark = StudentMark(
+                            student_id=student_id, subject=subject, exam=exam, academic_year=self.academic_year,
+                            marks_obtained=Decimal(str(round(score))), max_marks=max_marks, is_absent=absent,
+                            entered_by_id=teacher_of[cls.id]
+                        )
+                        # Attach what grading reads without extra queries
+                        mark.student = StudentProfile(id=student_id, student_class=cls)
+                        marks.append(mark)
+        GradingEngine.grade_marks(marks, table, fetch_partners=False)
+        for start in range(0, len(marks), BATCH_SIZE):
+            StudentMark.objects.bulk_create(marks[start:start + BATCH_SIZE])
+
+        # Exam summaries over main subjects, ranked within the class
+        main_ids = {cls_id: {subject.id for subject in subjects} for cls_id, subjects in self.main_subjects.items()}
+        totals = defaultdict(lambda: [Decimal('0'), 0, 0])
+        for mark in marks:
+            if mark.subject.id in main_ids[mark.student.student_class.id]:
+                entry = totals[(mark.student.student_class.id, mark.exam.id, mark.student_id)]
+                entry[0] += mark.marks_obtained
+                entry[1] += mark.max_marks
+                entry[2] += 1
+
+        summaries = []
+        by_class_exam = defaultdict(list)
+        for (class_id, exam_id, student_id), entry in totals.items():
+            by_class_exam[(class_id, exam_id)].append((student_id, entry))
+        classes = {cls.id: cls for cls in self.class_list}
+        exams = {exam.id: exam for exam in self.exams}
+        for (class_id, exam_id), rows in by_class_exam.items():
+            rows.sort(key=lambda row: row[1][0], reverse=True)
+            rank, previous = 0, None
+            for position, (student_id, (obtained, max_total, count)) in enumerate(rows, start=1):
+                if obtained != previous:
+                    rank, previous = position, obtained
+                percentage = float(obtained) / max_total * 100 if max_total else 0
+                grade, grade_point = table.lookup_percentage(
+                    classes[class_id].class_group, exams[exam_id].exam_type, percentage
+                )
+                summaries.append(StudentExamSummary(
+                    student_id=student_id, exam_id=exam_id, academic_year=self.academic_year,
+                    total_marks_obtained=obtained, total_max_marks=max_total,
+                    percentage=Decimal(str(round(percentage, 2))), overall_grade=grade,
+                    overall_grade_point=grade_point, class_rank=rank, subjects_count=count
+                ))
+        StudentExamSummary.objects.bulk_create(summaries, batch_size=BATCH_SIZE)
+
+        for exam in self.exams:
+            RankingService.invalidate(exam.id, self.academic_year.id)
+        return len(marks) + len(summaries)
+
+    def create_fees(self):
+        year = self.academic_year
+        months = []
+        day = year.start_date.replace(day=1)
+        while day <= year.end_date:
+            months.append(day)
+            day = (day + timedelta(days=32)).replace(day=1)
+
+        structures = {}
+        for class_group, amount in MONTHLY_FEE.items():
+            for month in months:
+                structures[(class_group, month)], _ = FeeStructure.objects.get_or_create(
+                    class_group=class_group, fee_month=month.strftime('%b-%Y'),
+                    defaults={'amount': amount, 'due_date': month.replace(day=10)}
+                )
+
+        concessions = {}
+        requests = []
+        for cls in self.class_list:
+            for student_id in self.roster[cls.id]:
+                if self.rng.random() < 0.1:
+                    concessions[student_id] = Decimal(self.rng.choice([10, 20, 25, 50])) / 100
+                    requests.append(ConcessionRequest(
+                        student_id=student_id, requested_by_id=self.teacher_ids[cls.id],
+                        fee_structure=structures[(cls.class_group, months[0])],
+                        concession_amount=MONTHLY_FEE[cls.class_group] * concessions[student_id],
+                        reason='Sibling / financial concession', status='APPROVED',
+                        approved_by_id=self.principal_id
+                    ))
+        ConcessionRequest.objects.bulk_create(requests)
+
+        fees, payments = [], []
+        for cls in self.class_list:
+            amount = MONTHLY_FEE[cls.class_group]
+            for student_id in self.roster[cls.id]:
+                concession = (amount * concessions.get(student_id, 0)).quantize(Decimal('0.01'))
+                total = amount - concession
+                for month in months:
+                    roll = self.rng.random()
+                    if roll < 0.7:
+                        parts = [total]
+                    elif roll < 0.9:
+                        paid = (total * Decimal(self.rng.choice([25, 50, 75])) / 100).quantize(Decimal('1'))
+                        parts = [paid] if self.rng.random() < 0.5 else [paid / 2, paid - paid / 2]
+                    else:
+                        parts = []
+                    paid_at = [
+                        timezone.make_aware(datetime.combine(month.replace(day=min(28, 5 + 7 * index)), dt_time(10)))
+                        for index in range(len(parts))
+                    ]
+                    method = self.rng.choice(PAYMENT_METHODS)
+                    balance = total - sum(parts, Decimal('0'))
+                    fee = StudentFee(
+                        student_id=student_id, fee_structure=structures[(cls.class_group, month)],
+                        amount_due=amount, concession_amount=concession, total_amount=total, final_amount=total,
+                        balance_amount=balance, is_paid=balance <= 0,
+                        payment_method=method if parts else '', payment_date=paid_at[-1] if parts else None
+                    )
+                    fees.append(fee)
+                    payments.append([(part, at, method) for part, at in zip(parts, paid_at)])
+        StudentFee.objects.bulk_create(fees, batch_size=BATCH_SIZE)
+        # Backends that do not return ids from bulk inserts get them from one lookup
+        if any(fee.pk is None for fee in fees):
+            lookup = {
+                (student_id, structure_id): fee_id
+                for fee_id, student_id, structure_id in StudentFee.objects.filter(
+                    student__student_class__in=self.class_list
+                ).values_list('id', 'student_id', 'fee_structure_id')
+            }
+            for fee in fees:
+                fee.pk = lookup[(fee.student_id, fee.fee_structure_id)]
+
+        transactions = [
+            FeeTransaction(
+                student_fee_id=fee.pk, amount_paid=part, payment_method=method,
+                receipt_number=f'{self.prefix.upper()}-{fee.pk}-{index + 1}', payment_date=at,
+                recorded_by_id=self.principal_id
+            )
+            for fee, parts in zip(fees, payments) for index, (part, at, method) in enumerate(parts)
+        ]
+        FeeTransaction.objects.bulk_create(transactions, batch_size=BATCH_SIZE)
+        return len(structures) + len(requests) + len(fees) + len(transactions)
+
+    def create_announcements(self):
+        titles = ['Parent-teacher meeting', 'Holiday notice', 'Exam schedule', 'Sports day', 'Fee reminder',
+                  'Science fair', 'Uniform update', 'Annual day rehearsal']
+        announcements = [
+            Announcement(
+                title=f'{self.rng.choice(titles)} #{index + 1}',
+                message='Synthetic announcement for load testing. ' * self.rng.randint(1, 5),
+                created_by_id=self.principal_id,
+                target_role=self.rng.choice(['all', 'teachers', 'students']),
+                is_pinned=index < 3
+            )
+            for index in range(30)
+        ]
+        Announcement.objects.bulk_create(announcements)
+        return len(announcements)
+
+    def run(self):
+        started = time.monotonic()
+        self._step('Reference data', self.reference_data)
+        with transaction.atomic():
+            self._step('Classes', self.create_classes)
+            self._step('Subject mappings', self.map_subjects)
+            self._step('Users and profiles', self.create_people)
+            self._step('Attendance sessions and records', self.create_attendance)
+            self._step('Marks and exam summaries', self.create_marks)
+            self._step('Fees, concessions and payments', self.create_fees)
+            self._step('Announcements', self.create_announcements)
+        # Bulk inserts skip the signals that bump these
+        for resource in (ROSTER_RESOURCE, REFERENCE_RESOURCE, ANNOUNCEMENTS_RESOURCE):
+            bump_version(resource)
+        self.counts['seconds'] = round(time.monotonic() - started, 1)
+        return self.counts
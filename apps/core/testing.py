@@ -0,0 +1,22 @@
+from contextlib import contextmanager
+from .instrumentation import QueryRecorder
+
+
+class QueryBudgetMixin:
+    """TestCase mixin asserting how many queries (and repeats of one query shape) a block may run"""
+
+    @contextmanager
+    def assertQueryBudget(self, max_queries, max_repeats=None):
+        recorder = QueryRecorder()
+        with recorder.record():
+            yield recorder
+
+        problems = []
+        if recorder.count > max_queries:
+            problems.append(f'{recorder.count} queries run, budget is {max_queries}')
+        if max_repeats is not None:
+            problems.extend(
+                f'{count}x {sql}' for sql, count in recorder.duplicates(max_repeats + 1).items()
+            )
+        if problems:
+            self.fail('Query budget exceeded:\n' + '\n'.join(problems))
@@ -0,0 +1,212 @@
+import os
+import subprocess
+import sys
+from datetime import date
+from unittest import mock
+from django.conf import settings
+from django.core.cache import cache
+from django.db.utils import OperationalError
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_INTRANS
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from apps.assessments.models import AcademicYear
+from apps.attendance.models import AttendanceSession
+from apps.students.models import Class, StudentProfile
+from apps.users.models import User
+from . import metrics
+from .benchmarks import BenchmarkError, EndpointBenchmark
+from .db.pooled.base import ConnectionPool
+from .instrumentation import fingerprint
+from .synthetic import SchoolDataGenerator
+from .testing import QueryBudgetMixin
+
+
+class RequestInstrumentationTestCase(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username="teacher1", role="teacher"))
+        cls = Class.objects.create(name="1st", class_group="1-5")
+        for roll in range(3):
+            StudentProfile.objects.create(
+                user=User.objects.create(username=f"s{roll}"), student_class=cls,
+                roll_number=str(roll), mother_phone='', father_phone=''
+            )
+        self.class_id = cls.id
+    
+    def test_fingerprint_collapses_in_lists(self):
+        self.assertEqual(
+            fingerprint('SELECT 1 FROM t WHERE id IN (%s, %s,\n %s) AND x = %s'),
+            'SELECT 1 FROM t WHERE id IN (...) AND x = %s'
+        )
+    
+    @override_settings(REQUEST_QUERY_BUDGET=0)
+    def test_server_timing_and_budget_warning(self):
+        with self.assertLogs('apps.core.requests', 'WARNING') as logs:
+            response = self.client.get(f'/api/attendance/class/{self.class_id}/students/')
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="\d+ queries", total;dur=[\d.]+')
+        self.assertIn('"query_budget": 0', logs.output[0])
+    
+    def test_class_students_query_budget(self):
+        with self.assertQueryBudget(3, max_repeats=1):
+            response = self.client.get(f'/api/attendance/class/{self.class_id}/students/')
+            # An error response would pass any budget
+            self.assertEqual(response.status_code, 200)
+
+
+class MetricsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+    
+    @override_settings(DEBUG=True)
+    def test_metrics_exposition(self):
+        self.client.get('/health/')
+        metrics.record_cache('class_roster', hit=False)
+        metrics.record_event('payments_recorded')
+        metrics.record_payment_amount('1500.50')
+        
+        body = self.client.get('/metrics').content.decode()
+        self.assertIn('http_requests_total{view="health_with_slash",method="GET",status="200"} 1', body)
+        self.assertIn('http_request_duration_seconds_count{view="health_with_slash"} 1', body)
+        self.assertIn('http_request_db_queries_bucket{view="health_with_slash",le="1"} 1', body)
+        self.assertIn('cache_lookups_total{cache="class_roster",result="miss"} 1', body)
+        self.assertIn('business_events_total{event="payments_recorded"} 1', body)
+        self.assertIn('payments_amount_total 1500.5', body)
+        self.assertIn('jobs_queue_depth{status="queued"} 0', body)
+    
+    def test_counters_survive_a_worker_going_away(self):
+        # Worker A publishes, then a fresh registration stands in for worker B
+        metrics.record_event('payments_recorded')
+        metrics.publish()
+        slot_a = metrics._registration['slot']
+        metrics.reset()
+        metrics.record_event('payments_recorded', 2)
+        self.assertEqual(metrics.collect()[('business_events_total', ('payments_recorded',))], 3)
+        self.assertNotEqual(metrics._registration['slot'], slot_a)
+        
+        # A exits; once it has been silent past the TTL its counts move to the retired total
+        key = metrics.WORKER_KEY.format(slot_a)
+        cache.set(key, dict(cache.get(key), seen=0), None)
+        self.assertEqual(metrics.collect()[('business_events_total', ('payments_recorded',))], 3)
+        self.assertIsNone(cache.get(key))
+        
+        # B retired while idle publishes only what it counted since
+        key = metrics.WORKER_KEY.format(metrics._registration['slot'])
+        cache.set(key, dict(cache.get(key), seen=0), None)
+        metrics._retire(metrics._registration['slot'], metrics._registration['token'])
+        metrics.record_event('payments_recorded')
+        self.assertEqual(metrics.collect()[('business_events_total', ('payments_recorded',))], 4)
+    
+    def test_metrics_token(self):
+        # Without a token only DEBUG serves the metrics
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        with override_settings(METRICS_TOKEN='s3cret'):
+            self.assertEqual(self.client.get('/metrics').status_code, 401)
+            self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
+
+
+class SchoolDataGeneratorTestCase(TestCase):
+    def test_generate_and_flush(self):
+        counts = SchoolDataGenerator(classes=2, students=3, seed=7).run()
+        self.assertEqual(counts['Classes'], 2)
+        self.assertEqual(StudentProfile.objects.filter(user__username__startswith='syn_').count(), 6)
+        self.assertTrue(SchoolDataGenerator.existing('syn'))
+        
+        SchoolDataGenerator.flush('syn')
+        self.assertFalse(SchoolDataGenerator.existing('syn'))
+        self.assertFalse(Class.objects.filter(name__startswith='syn-').exists())
+    
+    def test_same_seed_builds_the_same_school(self):
+        # Generated in the middle of the year, with another year marked current...
+        AcademicYear.objects.create(
+            name="2030-2031", start_date=date(2030, 6, 1), end_date=date(2031, 5, 31), is_current=True
+        )
+        with mock.patch('django.utils.timezone.localdate', return_value=date(2024, 9, 15)):
+            SchoolDataGenerator(classes=2, students=3, seed=7).run()
+        first = SchoolDataGenerator.checksums('syn')
+        last_day = AttendanceSession.objects.order_by('-date').values_list('date', flat=True).first()
+        self.assertEqual(last_day, date(2025, 5, 30))  # the last weekday of the 2024-2025 year
+        SchoolDataGenerator.flush('syn')
+        
+        # ...and again on another day with no year marked current
+        AcademicYear.objects.update(is_current=False)
+        SchoolDataGenerator(classes=2, students=3, seed=7).run()
+        self.assertEqual(SchoolDataGenerator.checksums('syn'), first)
+        SchoolDataGenerator.flush('syn')
+        SchoolDataGenerator(classes=2, students=3, seed=8).run()
+        self.assertNotEqual(SchoolDataGenerator.checksums('syn')['attendance'], first['attendance'])
+
+    def test_endpoint_benchmark(self):
+        SchoolDataGenerator(classes=2, students=3).run()
+        results = EndpointBenchmark(iterations=2, warmup=1).run()
+        self.assertIn('marks_sheet_save', results)
+        self.assertIn('settings_import', results)
+        self.assertEqual(EndpointBenchmark.compare(results, results), [])
+        
+        slower = {name: dict(result, queries=result['queries'] + 1) for name, result in results.items()}
+        self.assertEqual(len(EndpointBenchmark.compare(slower, results)), len(results))
+        
+        document = EndpointBenchmark.baseline_document(results, 2)
+        EndpointBenchmark.check_baseline(document)
+        document['meta']['database'] = 'oracle'
+        with self.assertRaises(BenchmarkError):
+            EndpointBenchmark.check_baseline(document)
+
+
+class StartupTestCase(TestCase):
+    def test_settings_import_is_pure(self):
+        # Production mode with an unreachable database used to block in wait_for_db() and print;
+        # the import time itself is the settings_import case of benchmark_endpoints
+        env = dict(os.environ, DJANGO_DEBUG='False', DATABASE_URL='postgres://u:p@127.0.0.1:1/none')
+        files = set(os.listdir(settings.BASE_DIR))
+        result = subprocess.run(
+            [sys.executable, '-c', 'import config.settings'],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, timeout=30
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual((result.stdout, result.stderr), ('', ''))
+        self.assertEqual(set(os.listdir(settings.BASE_DIR)), files)
+    
+    def test_readiness(self):
+        response = self.client.get('/ready')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['checks']['database']['ok'])
+        
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}):
+            response = self.client.get('/ready')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['checks']['cache']['error'], 'RuntimeError')
+
+
+class FakeConnection:
+    closed = 0
+    status = TRANSACTION_STATUS_IDLE
+    
+    def get_transaction_status(self):
+        return self.status
+    
+    def rollback(self):
+        self.status = TRANSACTION_STATUS_IDLE
+    
+    def close(self):
+        self.closed = 1
+
+
+class ConnectionPoolTestCase(TestCase):
+    def test_checkout_limit_reuse_and_discard(self):
+        pool = ConnectionPool(max_size=1, timeout=0.05)
+        first = pool.get(FakeConnection)
+        with self.assertRaises(OperationalError):
+            pool.get(FakeConnection)
+        
+        # Returned mid-transaction: rolled back, then handed out again
+        first.status = TRANSACTION_STATUS_INTRANS
+        pool.put(first)
+        self.assertIs(pool.get(FakeConnection), first)
+        self.assertEqual(first.status, TRANSACTION_STATUS_IDLE)
+        
+        pool.put(first, discard=True)
+        self.assertTrue(first.closed)
+        self.assertIsNot(pool.get(FakeConnection), first)
+        self.assertEqual((pool.in_use, len(pool.idle)), (1, 0))
@@ -0,0 +1,62 @@
+"""
+Version counters for cached data, shared through the default cache.
+
+A version is a millisecond timestamp of the last change, so it doubles as a
+Last-Modified value. Caches fold the version into their keys (or compare it
+against a local copy) and are invalidated by bumping it on writes. Bumps
+wait for the writer's transaction to commit: bumping earlier would let a
+concurrent reader cache the old rows under the new version.
+"""
+import time
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+KEY_PREFIX = 'version:'
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+def get_versions(*resources):
+    """Current version of each resource, initialising any that are missing"""
+    keys = {f'{KEY_PREFIX}{resource}': resource for resource in resources}
+    found = cache.get_many(list(keys))
+    versions = {}
+    for key, resource in keys.items():
+        version = found.get(key)
+        if version is None:
+            cache.add(key, _now_ms(), None)
+            version = cache.get(key)
+        versions[resource] = version
+    return versions
+
+
+def get_version(resource):
+    """Current version of a single resource"""
+    return get_versions(resource)[resource]
+
+
+def bump_version(*resources):
+    """Mark resources as changed once the current transaction commits (at once outside one)"""
+    transaction.on_commit(lambda: _bump(resources))
+
+
+def _bump(resources):
+    now = _now_ms()
+    current = cache.get_many([f'{KEY_PREFIX}{resource}' for resource in resources])
+    cache.set_many({
+        f'{KEY_PREFIX}{resource}': max(now, current.get(f'{KEY_PREFIX}{resource}', 0) + 1)
+        for resource in resources
+    }, None)
+
+
+def bump_on_change(resource, *models):
+    """Bump a resource whenever any instance of the given models is saved or deleted"""
+    def handler(sender, **kwargs):
+        bump_version(resource)
+
+    for model in models:
+        post_save.connect(handler, sender=model, weak=False, dispatch_uid=f'bump:{resource}:{model._meta.label}')
+        post_delete.connect(handler, sender=model, weak=False, dispatch_uid=f'bump-delete:{resource}:{model._meta.label}')
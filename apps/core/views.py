@@ -0,0 +1,35 @@
+import hmac
+import logging
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_GET
+from . import metrics
+from .readiness import readiness
+
+logger = logging.getLogger(__name__)
+
+
+@require_GET
+def metrics_view(request):
+    """Prometheus scrape endpoint, summed over every live gunicorn worker"""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+        if not hmac.compare_digest(supplied, token):
+            return HttpResponse('Unauthorized', status=401, content_type='text/plain')
+    elif not settings.DEBUG:
+        return HttpResponse('Set METRICS_TOKEN to enable /metrics', status=403, content_type='text/plain')
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@never_cache
+@require_GET
+def readiness_view(request):
+    """503 until the database and cache answer; error details stay in the server log"""
+    report = readiness()
+    for name, check in report['checks'].items():
+        if not check['ok']:
+            logger.warning(f"Readiness check failed for {name}: {check['error']}")
+            check['error'] = check['error'].split(':', 1)[0]
+    return JsonResponse(report, status=200 if report['ready'] else 503)
@@ -0,0 +1,114 @@
+from django.core.cache import cache
+from django.utils import timezone
+from apps.assessments.reference import ReferenceData
+from apps.attendance.models import AttendanceSession
+from apps.core.metrics import record_cache
+from apps.core.versioning import get_version
+from apps.notifications.models import Announcement, ANNOUNCEMENTS_RESOURCE
+from apps.students.roster import ClassRoster
+
+ANNOUNCEMENTS_LIMIT = 20
+CACHE_TIMEOUT = 60 * 60 * 24
+
+
+class BootstrapService:
+    """Startup payload for the mobile app, built from cached reference data"""
+
+    @staticmethod
+    def profile(user):
+        return {
+            'id': user.id,
+            'username': user.username,
+            'email': user.email,
+            'first_name': user.first_name,
+            'last_name': user.last_name,
+            'full_name': user.get_full_name(),
+            'role': user.role
+        }
+
+    @staticmethod
+    def classes(user):
+        return [dict(cls) for cls in ClassRoster.summary()]
+
+    @staticmethod
+    def exams(user):
+        return [
+            {'id': exam.id, 'name': exam.name, 'type': exam.exam_type, 'order': exam.order,
+             'is_active': exam.is_active}
+            for exam in sorted(ReferenceData.exams(), key=lambda exam: exam.order)
+        ]
+
+    @staticmethod
+    def subjects(user):
+        return [
+            {'id': subject.id, 'name': subject.name, 'code': subject.code}
+            for subject in sorted(ReferenceData.subjects(), key=lambda subject: subject.name)
+        ]
+
+    @staticmethod
+    def announcements(user):
+        key = f'bootstrap-announcements:{get_version(ANNOUNCEMENTS_RESOURCE)}'
+        data = cache.get(key)
+        record_cache('bootstrap_announcements', data is not None)
+        if data is None:
+            data = [{
+                'id': a.id,
+                'title': a.title,
+                'message': a.message,
+                'created_by': a.created_by.get_full_name() or a.created_by.username,
+                'target_role': a.target_role,
+                'is_pinned': a.is_pinned,
+                'created_at': a.created_at.strftime('%Y-%m-%d %H:%M'),
+            } for a in Announcement.objects.select_related('created_by')[:ANNOUNCEMENTS_LIMIT]]
+            cache.set(key, data, CACHE_TIMEOUT)
+        return data
+
+    @staticmethod
+    def attendance_status(user):
+        """Sessions already marked today, per class"""
+        today = timezone.localdate()
+        marked = {}
+        for class_id, session in AttendanceSession.objects.filter(date=today).values_list(
+            'student_class_id', 'session'
+        ):
+            marked.setdefault(class_id, set()).add(session)
+        return [
+            {
+                'class_id': cls['id'],
+                'date': today.isoformat(),
+                'morning_marked': 'morning' in marked.get(cls['id'], ()),
+                'afternoon_marked': 'afternoon' in marked.get(cls['id'], ()),
+            }
+            for cls in ClassRoster.summary()
+        ]
+
+
+SECTIONS = {
+    'profile': BootstrapService.profile,
+    'classes': BootstrapService.classes,
+    'exams': BootstrapService.exams,
+    'subjects': BootstrapService.subjects,
+    'announcements': BootstrapService.announcements,
+    'attendance_status': BootstrapService.attendance_status,
+}
+
+
+def _select_fields(data, fields):
+    if isinstance(data, list):
+        return [{key: item[key] for key in fields if key in item} for item in data]
+    return {key: data[key] for key in fields if key in data}
+
+
+def build_bootstrap(user, include=None, fields=None):
+    """
+    Build the requested sections (all by default).
+    fields maps a section name to the keys to keep in each of its items.
+    """
+    fields = fields or {}
+    payload = {}
+    for name in include or SECTIONS:
+        data = SECTIONS[name](user)
+        if name in fields:
+            data = _select_fields(data, fields[name])
+        payload[name] = data
+    return payload
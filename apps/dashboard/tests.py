@@ -0,0 +1,38 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+from apps.assessments.models import Exam
+from apps.assessments.reference import ReferenceData
+from apps.students.models import Class
+from apps.users.models import User
+
+
+class BootstrapTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        ReferenceData.clear()
+        self.user = User.objects.create(username="teacher1", first_name="Asha", role="teacher")
+        Class.objects.create(name="1st", class_group="1-5", order=1)
+        Exam.objects.create(name="FA1", exam_type="FA", order=1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+    
+    def test_all_sections(self):
+        data = self.client.get('/api/bootstrap/').json()['data']
+        self.assertEqual(
+            set(data), {'profile', 'classes', 'exams', 'subjects', 'announcements', 'attendance_status'}
+        )
+        self.assertEqual(data['profile']['role'], 'teacher')
+        self.assertEqual(data['classes'][0]['student_count'], 0)
+        self.assertFalse(data['attendance_status'][0]['morning_marked'])
+    
+    def test_sparse_fieldsets_use_cached_reference_data(self):
+        self.client.get('/api/bootstrap/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/bootstrap/?include=classes,exams&fields[classes]=id,name')
+        data = response.json()['data']
+        self.assertEqual(set(data), {'classes', 'exams'})
+        self.assertEqual(set(data['classes'][0]), {'id', 'name'})
+        
+        response = self.client.get('/api/bootstrap/?include=grades')
+        self.assertEqual(response.status_code, 400)
@@ -7,6 +7,7 @@ from apps.students.models import StudentProfile, Class
 from apps.fees.models import StudentFee, FeeStructure
 from apps.attendance.models import AttendanceSession, AttendanceRecord
 from apps.assessments.models import StudentExamSummary
+from .bootstrap import SECTIONS, build_bootstrap
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -80,3 +81,29 @@ def principal_dashboard_summary(request):
             }
         }
     })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def bootstrap(request):
+    """
+    Everything the app needs at startup in one response.
+    ?include=profile,classes limits the sections; ?fields[classes]=id,name limits the keys.
+    """
+    include = [name for name in request.query_params.get('include', '').split(',') if name]
+    unknown = [name for name in include if name not in SECTIONS]
+    if unknown:
+        return Response({
+            'success': False,
+            'message': f"Unknown sections: {', '.join(unknown)}"
+        }, status=400)
+    
+    fields = {}
+    for param, value in request.query_params.items():
+        if param.startswith('fields[') and param.endswith(']'):
+            fields[param[len('fields['):-1]] = [key for key in value.split(',') if key]
+    
+    return Response({
+        'success': True,
+        'data': build_bootstrap(request.user, include or None, fields)
+    })
@@ -0,0 +1,34 @@
+from apps.jobs.registry import task
+from apps.students.models import StudentProfile
+from .models import FeeStructure, StudentFee
+
+
+@task('fees.assign_structure')
+def assign_structure(job, fee_structure_id, class_ids=None):
+    """
+    Create the StudentFee of a fee structure for every student who does not
+    have one yet: students of class_ids, or of the structure's class group.
+    """
+    structure = FeeStructure.objects.get(id=fee_structure_id)
+    students = StudentProfile.objects.all()
+    if class_ids:
+        students = students.filter(student_class_id__in=class_ids)
+    else:
+        students = students.filter(student_class__class_group=structure.class_group)
+    
+    assigned = set(StudentFee.objects.filter(fee_structure=structure).values_list('student_id', flat=True))
+    student_ids = [sid for sid in students.values_list('id', flat=True) if sid not in assigned]
+    # bulk_create skips StudentFee.save(), so fill in what save() would derive
+    StudentFee.objects.bulk_create([
+        StudentFee(
+            student_id=student_id,
+            fee_structure=structure,
+            amount_due=structure.amount,
+            total_amount=structure.amount,
+            final_amount=structure.amount,
+            balance_amount=structure.amount,
+            is_paid=structure.amount <= 0,
+        )
+        for student_id in student_ids
+    ], batch_size=1000)
+    return {'created': len(student_ids), 'already_assigned': len(assigned)}
@@ -9,6 +9,7 @@ from calendar import month_abbr
 from .models import StudentFee, FeeStructure, FeeTransaction
 from apps.students.models import StudentProfile, Class
 from django.shortcuts import get_object_or_404
+from apps.core.metrics import record_event, record_payment_amount
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -195,6 +196,7 @@ def record_payment(request):
                 }
             )
             # update_or_create save() handles balance_amount for new ones in our updated model
+            record_event('fees_assigned')
             
             return Response({'success': True, 'message': 'Fee assigned successfully'})
             
@@ -230,6 +232,8 @@ def record_payment(request):
             fee_record.payment_date = now
             fee_record.receipt_number = receipt
             fee_record.save()
+            record_event('payments_recorded')
+            record_payment_amount(amount_paid)
             
             return Response({
                 'success': True, 
@@ -0,0 +1,18 @@
+from django.contrib import admin
+from .models import Job
+from .services import JobQueue
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'task', 'status', 'progress', 'attempts', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'task')
+    list_select_related = ('created_by',)
+    readonly_fields = ('attempts', 'progress', 'progress_message', 'result', 'error', 'worker',
+                       'created_at', 'started_at', 'heartbeat_at', 'finished_at')
+    actions = ['retry_jobs']
+    
+    def retry_jobs(self, request, queryset):
+        count = JobQueue.retry(queryset)
+        self.message_user(request, f'Requeued {count} jobs.')
+    retry_jobs.short_description = "Retry selected jobs"
@@ -0,0 +1,90 @@
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from apps.jobs.services import JobQueue
+from apps.jobs.worker import run_job, setup_process
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=2, help='Jobs run at the same time')
+        parser.add_argument('--pool', choices=['thread', 'process'], default='thread',
+                            help='thread for IO/DB-bound jobs, process for CPU-bound ones')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Seconds between polls when the queue is empty')
+        parser.add_argument('--stale-after', type=int, default=3600,
+                            help='Requeue running jobs whose worker has not sent a heartbeat for this many seconds')
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty')
+
+    def handle(self, *args, **options):
+        concurrency = options['concurrency']
+        if concurrency < 1:
+            raise CommandError('❌ --concurrency must be at least 1')
+
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+        if options['pool'] == 'process':
+            executor = ProcessPoolExecutor(
+                max_workers=concurrency,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=setup_process
+            )
+        else:
+            executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='job')
+
+        self.stopping = False
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, self.stop)
+
+        self.stdout.write(f"👷 Worker {worker} started ({options['pool']} pool x {concurrency})")
+        requeued, failed = JobQueue.requeue_stale(options['stale_after'])
+        if requeued or failed:
+            self.stdout.write(f"♻️  Requeued {requeued} stale jobs, failed {failed}")
+
+        running = set()
+        last_stale_check = time.monotonic()
+        try:
+            while not self.stopping:
+                for future in [future for future in running if future.done()]:
+                    running.discard(future)
+                    self.report(future)
+
+                close_old_connections()
+                claimed = JobQueue.claim(worker, concurrency - len(running))
+                for job_id in claimed:
+                    self.stdout.write(f"▶️  Job #{job_id}")
+                    running.add(executor.submit(run_job, job_id))
+
+                if time.monotonic() - last_stale_check > options['stale_after'] / 4:
+                    # Jobs that never call set_progress stay alive through this heartbeat
+                    JobQueue.heartbeat(worker)
+                    JobQueue.requeue_stale(options['stale_after'])
+                    last_stale_check = time.monotonic()
+
+                if not claimed:
+                    if options['once'] and not running:
+                        break
+                    time.sleep(options['sleep'] if not running else min(options['sleep'], 0.2))
+        finally:
+            self.stdout.write("⏳ Waiting for running jobs...")
+            executor.shutdown(wait=True)
+            for future in running:
+                self.report(future)
+        self.stdout.write(self.style.SUCCESS(f"✅ Worker {worker} stopped"))
+
+    def stop(self, signum, frame):
+        self.stopping = True
+
+    def report(self, future):
+        try:
+            job_id, status = future.result()
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f"❌ Job crashed the worker pool: {e}"))
+            return
+        style = self.style.SUCCESS if status == 'succeeded' else self.style.WARNING
+        self.stdout.write(style(f"{'✅' if status == 'succeeded' else '⚠️ '} Job #{job_id} {status}"))
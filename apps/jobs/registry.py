@@ -0,0 +1,26 @@
+TASKS = {}
+
+
+class UnknownTask(KeyError):
+    pass
+
+
+def task(name, max_attempts=3):
+    """
+    Register a function as a background task under `name`.
+    The function is called as func(job, **kwargs) and its return value
+    (anything JSON serialisable) is stored as the job result.
+    """
+    def decorator(func):
+        func.task_name = name
+        func.max_attempts = max_attempts
+        TASKS[name] = func
+        return func
+    return decorator
+
+
+def get_task(name):
+    try:
+        return TASKS[name]
+    except KeyError:
+        raise UnknownTask(name)
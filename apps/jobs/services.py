@@ -0,0 +1,138 @@
+import json
+import traceback
+from datetime import timedelta
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+from apps.core.metrics import gauge
+from .models import Job
+from .registry import UnknownTask, get_task
+
+RETRY_DELAY = 30  # seconds, doubled on every further attempt
+
+
+class JobQueue:
+    """Enqueue, claim and run Job rows; PostgreSQL claims with SKIP LOCKED, SQLite with a guarded UPDATE"""
+
+    @staticmethod
+    def enqueue(task, kwargs=None, user=None, priority=0, run_after=None, max_attempts=None):
+        """Queue a registered task; returns the Job to hand back to the client for polling"""
+        func = get_task(task)
+        return Job.objects.create(
+            task=task,
+            kwargs=kwargs or {},
+            created_by=user if user is not None and user.is_authenticated else None,
+            priority=priority,
+            run_after=run_after or timezone.now(),
+            max_attempts=max_attempts or func.max_attempts,
+        )
+
+    @staticmethod
+    def claim(worker, limit=1):
+        """Mark up to `limit` due jobs as running for `worker` and return their ids"""
+        if limit <= 0:
+            return []
+        now = timezone.now()
+        claimed = []
+        with transaction.atomic():
+            due = Job.objects.filter(status=Job.QUEUED, run_after__lte=now).order_by('-priority', 'run_after', 'id')
+            if connection.features.has_select_for_update_skip_locked:
+                # Concurrent workers skip rows another worker has locked instead of waiting on them
+                due = due.select_for_update(skip_locked=True)
+            for job_id in list(due.values_list('id', flat=True)[:limit]):
+                # The status guard keeps two workers from claiming the same row where SKIP LOCKED is missing
+                if Job.objects.filter(id=job_id, status=Job.QUEUED).update(
+                    status=Job.RUNNING, worker=worker, started_at=now, heartbeat_at=now,
+                    attempts=F('attempts') + 1, progress=0, progress_message=''
+                ):
+                    claimed.append(job_id)
+        return claimed
+
+    @staticmethod
+    def heartbeat(worker):
+        """Mark the jobs `worker` is running as alive; returns how many it holds"""
+        return Job.objects.filter(status=Job.RUNNING, worker=worker).update(heartbeat_at=timezone.now())
+
+    @staticmethod
+    def execute(job_id):
+        """Run a claimed job and store its result, or schedule a retry / mark it failed"""
+        job = Job.objects.get(id=job_id)
+        if job.status != Job.RUNNING:
+            return job.status
+        # Only this claim may finish the job; requeue_stale may have handed it to another worker since
+        claimed = Job.objects.filter(id=job.id, status=Job.RUNNING, worker=job.worker, attempts=job.attempts)
+        try:
+            func = get_task(job.task)
+            result = func(job, **job.kwargs)
+            json.dumps(result, cls=DjangoJSONEncoder)
+        except Exception as e:
+            now = timezone.now()
+            error = traceback.format_exc()
+            if job.attempts < job.max_attempts and not isinstance(e, UnknownTask):
+                status = Job.QUEUED
+                updated = claimed.update(
+                    status=Job.QUEUED, error=error, worker='',
+                    run_after=now + timedelta(seconds=RETRY_DELAY * 2 ** (job.attempts - 1))
+                )
+            else:
+                status = Job.FAILED
+                updated = claimed.update(status=Job.FAILED, error=error, finished_at=now)
+        else:
+            status = Job.SUCCEEDED
+            updated = claimed.update(
+                status=Job.SUCCEEDED, result=result, error='',
+                progress=100, finished_at=timezone.now()
+            )
+        if not updated:
+            # Whatever the row says now (requeued, or finished by another worker) stands
+            return Job.objects.filter(id=job.id).values_list('status', flat=True).first()
+        return status
+
+    @staticmethod
+    def requeue_stale(timeout):
+        """Running jobs without a heartbeat for `timeout` seconds go back to the queue (or fail)"""
+        now = timezone.now()
+        cutoff = now - timedelta(seconds=timeout)
+        stale = Job.objects.filter(status=Job.RUNNING).filter(
+            Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+        )
+        failed = stale.filter(attempts__gte=F('max_attempts')).update(
+            status=Job.FAILED, finished_at=now, error='Worker stopped before the job finished'
+        )
+        requeued = stale.update(status=Job.QUEUED, worker='', run_after=now)
+        return requeued, failed
+
+    @staticmethod
+    def retry(queryset):
+        """Put finished or failed jobs back in the queue with a fresh attempt budget"""
+        return queryset.exclude(status=Job.RUNNING).update(
+            status=Job.QUEUED, attempts=0, run_after=timezone.now(), error='', worker='',
+            result=None, progress=0, progress_message='', finished_at=None
+        )
+
+    @staticmethod
+    def describe(job):
+        return {
+            'id': job.id,
+            'task': job.task,
+            'status': job.status,
+            'progress': job.progress,
+            'progress_message': job.progress_message,
+            'attempts': job.attempts,
+            'max_attempts': job.max_attempts,
+            'result': job.result,
+            'error': job.error.strip().splitlines()[-1] if job.error else '',
+            'created_at': job.created_at.isoformat(),
+            'started_at': job.started_at.isoformat() if job.started_at else None,
+            'heartbeat_at': job.heartbeat_at.isoformat() if job.heartbeat_at else None,
+            'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        }
+
+
+@gauge('jobs_queue_depth', 'Background jobs waiting, running or failed', ('status',))
+def queue_depth():
+    counts = dict(Job.objects.filter(
+        status__in=[Job.QUEUED, Job.RUNNING, Job.FAILED]
+    ).values_list('status').annotate(total=Count('id')).order_by())
+    return {(status,): counts.get(status, 0) for status in (Job.QUEUED, Job.RUNNING, Job.FAILED)}
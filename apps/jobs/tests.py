@@ -0,0 +1,92 @@
+from datetime import timedelta
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from apps.users.models import User
+from .models import Job
+from .registry import TASKS, task
+from .services import JobQueue
+
+calls = []
+
+
+@task('tests.count', max_attempts=2)
+def count_task(job, upto, fail_first=False):
+    calls.append(upto)
+    if fail_first and len(calls) == 1:
+        raise RuntimeError('first attempt fails')
+    job.set_progress(50, 'halfway')
+    return {'total': sum(range(upto))}
+
+
+@task('tests.taken_over')
+def taken_over_task(job):
+    # As if the worker went quiet, requeue_stale ran and another worker claimed the job
+    Job.objects.filter(id=job.id).update(worker='w2', attempts=job.attempts + 1)
+    return {'done': True}
+
+
+class JobQueueTestCase(TestCase):
+    def setUp(self):
+        calls.clear()
+    
+    def test_claim_run_and_retry(self):
+        job = JobQueue.enqueue('tests.count', {'upto': 5, 'fail_first': True}, priority=1)
+        later = JobQueue.enqueue('tests.count', {'upto': 3}, run_after=timezone.now() + timedelta(hours=1))
+        
+        self.assertEqual(JobQueue.claim('w1', limit=5), [job.id])
+        self.assertEqual(JobQueue.claim('w2', limit=5), [])
+        self.assertEqual(JobQueue.execute(job.id), Job.QUEUED)
+        job.refresh_from_db()
+        self.assertIn('first attempt fails', job.error)
+        self.assertGreater(job.run_after, timezone.now())
+        
+        Job.objects.filter(id=job.id).update(run_after=timezone.now())
+        self.assertEqual(JobQueue.claim('w1'), [job.id])
+        self.assertEqual(JobQueue.execute(job.id), Job.SUCCEEDED)
+        job.refresh_from_db()
+        self.assertEqual((job.attempts, job.result, job.progress, job.error), (2, {'total': 10}, 100, ''))
+        self.assertEqual(Job.objects.get(id=later.id).status, Job.QUEUED)
+    
+    def test_stale_jobs_are_requeued_or_failed(self):
+        job = JobQueue.enqueue('tests.count', {'upto': 1})
+        two_hours_ago = timezone.now() - timedelta(hours=2)
+        JobQueue.claim('dead-worker')
+        Job.objects.filter(id=job.id).update(started_at=two_hours_ago, heartbeat_at=two_hours_ago)
+        self.assertEqual(JobQueue.requeue_stale(3600), (1, 0))
+        
+        JobQueue.claim('dead-worker')
+        Job.objects.filter(id=job.id).update(started_at=two_hours_ago, heartbeat_at=two_hours_ago)
+        self.assertEqual(JobQueue.requeue_stale(3600), (0, 1))
+        self.assertEqual(Job.objects.get(id=job.id).status, Job.FAILED)
+    
+    def test_heartbeat_keeps_long_jobs_and_stale_claims_cannot_finish(self):
+        job = JobQueue.enqueue('tests.count', {'upto': 3})
+        JobQueue.claim('slow-worker')
+        Job.objects.filter(id=job.id).update(started_at=timezone.now() - timedelta(hours=2))
+        self.assertEqual(JobQueue.heartbeat('slow-worker'), 1)
+        self.assertEqual(JobQueue.requeue_stale(3600), (0, 0))
+        
+        
+        job = JobQueue.enqueue('tests.taken_over')
+        JobQueue.claim('w1')
+        self.assertEqual(JobQueue.execute(job.id), Job.RUNNING)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.worker, job.result), (Job.RUNNING, 'w2', None))
+    
+    def test_api_enqueue_and_status(self):
+        self.assertIn('assessments.regrade', TASKS)
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username="teacher", role="teacher"))
+        self.assertEqual(client.post('/api/jobs/', {'task': 'tests.count'}, format='json').status_code, 403)
+        
+        principal = User.objects.create(username="head", role="principal")
+        client.force_authenticate(principal)
+        response = client.post('/api/jobs/', {'task': 'tests.count', 'kwargs': {'upto': 4}}, format='json')
+        self.assertEqual(response.status_code, 202)
+        job_id = response.data['job']['id']
+        
+        JobQueue.claim('w1')
+        JobQueue.execute(job_id)
+        data = client.get(f'/api/jobs/{job_id}/').data['job']
+        self.assertEqual((data['status'], data['result']), ('succeeded', {'total': 6}))
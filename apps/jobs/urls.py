@@ -0,0 +1,7 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('', views.enqueue_job, name='enqueue_job'),
+    path('<int:job_id>/', views.job_status, name='job_status'),
+]
@@ -0,0 +1,75 @@
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework import status
+from .models import Job
+from .registry import TASKS, UnknownTask
+from .services import JobQueue
+
+STAFF_ROLES = ('principal', 'admin')
+
+
+def _is_staff(user):
+    return user.is_staff or user.role in STAFF_ROLES
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def enqueue_job(request):
+    """Queue a registered task: {"task": "...", "kwargs": {...}}"""
+    try:
+        if not _is_staff(request.user):
+            return Response({
+                'success': False,
+                'message': 'Only principals and admins can start background jobs'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        kwargs = request.data.get('kwargs') or {}
+        if not isinstance(kwargs, dict):
+            return Response({
+                'success': False,
+                'message': 'kwargs must be an object'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            job = JobQueue.enqueue(request.data.get('task', ''), kwargs, user=request.user)
+        except UnknownTask:
+            return Response({
+                'success': False,
+                'message': f'Unknown task. Available: {", ".join(sorted(TASKS))}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'success': True,
+            'message': 'Job queued',
+            'job': JobQueue.describe(job)
+        }, status=status.HTTP_202_ACCEPTED)
+    except Exception as e:
+        return Response({
+            'success': False,
+            'message': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def job_status(request, job_id):
+    """Status, progress and result of a job started by the user (any job for principals/admins)"""
+    try:
+        jobs = Job.objects.all() if _is_staff(request.user) else Job.objects.filter(created_by=request.user)
+        job = jobs.filter(id=job_id).first()
+        if not job:
+            return Response({
+                'success': False,
+                'message': 'Job not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        return Response({
+            'success': True,
+            'job': JobQueue.describe(job)
+        })
+    except Exception as e:
+        return Response({
+            'success': False,
+            'message': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -0,0 +1,21 @@
+"""
+Functions run inside the worker pool.
+
+Process pools start fresh interpreters (spawn), which unpickle these
+functions before Django is set up, so this module must not import models
+at import time.
+"""
+from django.db import connections
+
+
+def setup_process():
+    import django
+    django.setup()
+
+
+def run_job(job_id):
+    from .services import JobQueue
+    try:
+        return job_id, JobQueue.execute(job_id)
+    finally:
+        connections.close_all()
@@ -2,6 +2,9 @@
 from django.db import models
 from django.conf import settings
 
+# Version counter bumped on every announcement write (see signals.py)
+ANNOUNCEMENTS_RESOURCE = 'announcements'
+
 class Announcement(models.Model):
     TARGET_CHOICES = [
         ('all', 'All Staff'),
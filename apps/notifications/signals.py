@@ -0,0 +1,4 @@
+from apps.core.versioning import bump_on_change
+from .models import Announcement, ANNOUNCEMENTS_RESOURCE
+
+bump_on_change(ANNOUNCEMENTS_RESOURCE, Announcement)
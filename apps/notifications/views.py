@@ -3,10 +3,12 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from .models import Announcement
+from apps.core.http import conditional_get
+from .models import Announcement, ANNOUNCEMENTS_RESOURCE
 
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
+@conditional_get(ANNOUNCEMENTS_RESOURCE, max_age=60)
 def announcements_list_create(request):
     """
     GET: List all announcements
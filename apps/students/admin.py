@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.urls import reverse
 from django.utils.html import format_html
+from apps.users.exports import stream_export
 from .models import StudentProfile, Class
 
 # Keep your existing StudentProfileInline
@@ -18,18 +19,29 @@ class StudentProfileInline(admin.TabularInline):
 class ClassAdmin(admin.ModelAdmin):
     list_display = ('name', 'student_count', 'view_students_link')
     inlines = [StudentProfileInline]
+    actions = ['export_roster_to_csv']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_student_count()
     
     def student_count(self, obj):
-        return obj.studentprofile_set.count()
+        return obj.student_count
     student_count.short_description = 'Number of Students'
+    student_count.admin_order_field = 'student_count'
     
     def view_students_link(self, obj):
-        count = obj.studentprofile_set.count()
+        count = obj.student_count
         if count > 0:
             url = reverse("admin:students_studentprofile_changelist") + f"?student_class__id={obj.id}"
             return format_html('<a href="{}">View {} Students</a>', url, count)
         return "No students"
     view_students_link.short_description = 'Students'
+    
+    def export_roster_to_csv(self, request, queryset):
+        return stream_export('students', StudentProfile.objects.filter(student_class__in=queryset).order_by(
+            'student_class__order', 'student_class__name', 'roll_number'
+        ))
+    export_roster_to_csv.short_description = "Export student roster of selected classes to CSV"
 
 # Keep your existing StudentProfileAdmin as is
 @admin.register(StudentProfile)
@@ -37,3 +49,12 @@ class StudentProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'student_class', 'roll_number', 'mother_phone', 'father_phone')
     search_fields = ('user__first_name', 'user__last_name', 'roll_number')
     list_filter = ('student_class',)
+    actions = ['export_students_to_csv', 'export_parent_phones_to_csv']
+    
+    def export_students_to_csv(self, request, queryset):
+        return stream_export('students', queryset)
+    export_students_to_csv.short_description = "Export selected students to CSV"
+    
+    def export_parent_phones_to_csv(self, request, queryset):
+        return stream_export('parent_phones', queryset)
+    export_parent_phones_to_csv.short_description = "Export parent phone list of selected students to CSV"
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0003_class_class_group'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='class',
+            options={'ordering': ['order', 'name']},
+        ),
+        migrations.AddField(
+            model_name='class',
+            name='order',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -1,11 +1,18 @@
 from django.db import models
 from apps.users.models import User
 
+class ClassQuerySet(models.QuerySet):
+    def with_student_count(self):
+        """Annotate student_count in the same query instead of one COUNT per class"""
+        return self.annotate(student_count=models.Count('studentprofile'))
+
 class Class(models.Model):
     name = models.CharField(max_length=30)
     class_group  = models.CharField(max_length=10, choices=[('pre','Pre-Primary'),('1-5','Primary'),('6-10','Secondary')]) # E.g. "A", "B", etc.
     order = models.IntegerField(default=0)
     
+    objects = ClassQuerySet.as_manager()
+    
     class Meta:
         ordering = ['order', 'name']
     
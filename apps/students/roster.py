@@ -0,0 +1,34 @@
+from django.core.cache import cache
+from apps.core.metrics import record_cache
+from apps.core.versioning import get_version
+from .models import Class
+
+RESOURCE = 'class-roster'
+CACHE_TIMEOUT = 60 * 60 * 24
+
+
+class ClassRoster:
+    """Cached list of classes with student counts, rebuilt after class or student changes"""
+
+    @staticmethod
+    def summary():
+        """Classes in Meta order as dicts: id, name, class_group, order, student_count"""
+        key = f'class-roster:{get_version(RESOURCE)}'
+        classes = cache.get(key)
+        record_cache('class_roster', classes is not None)
+        if classes is None:
+            classes = list(
+                Class.objects.with_student_count().values(
+                    'id', 'name', 'class_group', 'order', 'student_count'
+                )
+            )
+            cache.set(key, classes, CACHE_TIMEOUT)
+        return classes
+
+    @staticmethod
+    def student_counts():
+        return {cls['id']: cls['student_count'] for cls in ClassRoster.summary()}
+
+    @staticmethod
+    def student_count(class_id):
+        return ClassRoster.student_counts().get(class_id, 0)
@@ -0,0 +1,6 @@
+from apps.core.versioning import bump_on_change
+from .models import Class, StudentProfile
+from .roster import RESOURCE as ROSTER_RESOURCE
+
+# Classes joining or students joining, leaving or moving class change the roster
+bump_on_change(ROSTER_RESOURCE, Class, StudentProfile)
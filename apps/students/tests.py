@@ -1,3 +1,39 @@
+from django.core.cache import cache
 from django.test import TestCase
+from apps.users.models import User
+from .models import Class, StudentProfile
+from .roster import ClassRoster
 
-# Create your tests here.
+
+class ClassRosterTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.first = Class.objects.create(name="1st", class_group="1-5", order=1)
+        self.second = Class.objects.create(name="2nd", class_group="1-5", order=2)
+        for roll in range(3):
+            user = User.objects.create(username=f"student{roll}")
+            StudentProfile.objects.create(
+                user=user, student_class=self.first, roll_number=str(roll),
+                mother_phone='', father_phone=''
+            )
+    
+    def test_counts_in_one_query(self):
+        with self.assertNumQueries(1):
+            counts = {cls.name: cls.student_count for cls in Class.objects.with_student_count()}
+        self.assertEqual(counts, {"1st": 3, "2nd": 0})
+    
+    def test_summary_is_cached_until_roster_changes(self):
+        self.assertEqual(ClassRoster.student_counts(), {self.first.id: 3, self.second.id: 0})
+        with self.assertNumQueries(0):
+            ClassRoster.summary()
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            StudentProfile.objects.filter(student_class=self.first).first().delete()
+        self.assertEqual(ClassRoster.student_count(self.first.id), 2)
+    
+    def test_class_order_reset_refreshes_the_summary(self):
+        ClassRoster.summary()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/assessments/init-class-orders/')
+        orders = {cls['name']: cls['order'] for cls in ClassRoster.summary()}
+        self.assertEqual(orders, {"1st": 10, "2nd": 20})
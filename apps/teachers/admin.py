@@ -1,6 +1,12 @@
 from django.contrib import admin
+from apps.users.exports import stream_export
 from .models import TeacherProfile
 
 @admin.register(TeacherProfile)
 class TeacherProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'subjects')
+    actions = ['export_teachers_to_csv']
+    
+    def export_teachers_to_csv(self, request, queryset):
+        return stream_export('teachers', queryset)
+    export_teachers_to_csv.short_description = "Export selected teachers to CSV"
@@ -1,6 +1,7 @@
 # apps/teachers/serializers.py
 from rest_framework import serializers
 from apps.students.models import Class
+from apps.students.roster import ClassRoster
 from apps.users.models import User
 
 class ClassWithStudentCountSerializer(serializers.ModelSerializer):
@@ -11,8 +12,9 @@ class ClassWithStudentCountSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'student_count']
     
     def get_student_count(self, obj):
-        # Updated to use the correct field name
-        return obj.studentprofile_set.count()
+        # Annotated by Class.objects.with_student_count(), else read from the cached roster
+        count = getattr(obj, 'student_count', None)
+        return ClassRoster.student_count(obj.id) if count is None else count
 
 class TeacherDashboardSerializer(serializers.ModelSerializer):
     all_classes = serializers.SerializerMethodField()
@@ -24,5 +26,5 @@ class TeacherDashboardSerializer(serializers.ModelSerializer):
     
     def get_all_classes(self, obj):
         # Get ALL classes in the database
-        all_classes = Class.objects.all() # Meta ordering
+        all_classes = Class.objects.with_student_count() # Meta ordering
         return ClassWithStudentCountSerializer(all_classes, many=True).data
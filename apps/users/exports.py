@@ -0,0 +1,64 @@
+import csv
+from django.http import StreamingHttpResponse
+from apps.students.models import StudentProfile
+from apps.teachers.models import TeacherProfile
+from .models import User
+
+CHUNK_SIZE = 2000
+
+
+class Echo:
+    """File-like object whose write() hands the formatted line back to the caller"""
+
+    def write(self, value):
+        return value
+
+
+# name: (queryset, [(header, field), ...])
+EXPORTS = {
+    'users': (
+        lambda: User.objects.order_by('id'),
+        [('username', 'username'), ('first_name', 'first_name'), ('last_name', 'last_name'),
+         ('email', 'email'), ('role', 'role')],
+    ),
+    'students': (
+        lambda: StudentProfile.objects.order_by('student_class__order', 'student_class__name', 'roll_number'),
+        [('username', 'user__username'), ('first_name', 'user__first_name'), ('last_name', 'user__last_name'),
+         ('class_name', 'student_class__name'), ('roll_number', 'roll_number'),
+         ('mother_phone', 'mother_phone'), ('father_phone', 'father_phone')],
+    ),
+    'parent_phones': (
+        lambda: StudentProfile.objects.order_by('student_class__order', 'student_class__name', 'roll_number'),
+        [('class_name', 'student_class__name'), ('roll_number', 'roll_number'),
+         ('first_name', 'user__first_name'), ('last_name', 'user__last_name'),
+         ('mother_phone', 'mother_phone'), ('father_phone', 'father_phone')],
+    ),
+    'teachers': (
+        lambda: TeacherProfile.objects.order_by('user__username'),
+        [('username', 'user__username'), ('first_name', 'user__first_name'), ('last_name', 'user__last_name'),
+         ('email', 'user__email'), ('subjects', 'subjects')],
+    ),
+}
+
+
+def csv_rows(queryset, columns, chunk_size=CHUNK_SIZE):
+    """CSV lines for the header and each row, read with a server-side iterator"""
+    writer = csv.writer(Echo())
+    yield writer.writerow([header for header, _ in columns])
+    for row in queryset.values_list(*[field for _, field in columns]).iterator(chunk_size=chunk_size):
+        yield writer.writerow(row)
+
+
+def stream_csv(queryset, columns, filename, chunk_size=CHUNK_SIZE):
+    """StreamingHttpResponse whose memory use does not grow with the number of rows"""
+    response = StreamingHttpResponse(csv_rows(queryset, columns, chunk_size), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def stream_export(name, queryset=None):
+    """Stream one of EXPORTS, optionally over a narrower queryset of the same model"""
+    default_queryset, columns = EXPORTS[name]
+    if queryset is None:
+        queryset = default_queryset()
+    return stream_csv(queryset, columns, f'{name}.csv')
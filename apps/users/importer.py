@@ -0,0 +1,199 @@
+import csv
+import io
+import multiprocessing
+import os
+import re
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.files.storage import default_storage
+from django.db import transaction
+from apps.core.versioning import bump_version
+from apps.jobs.worker import setup_process
+from apps.students.models import Class, StudentProfile
+from apps.students.roster import RESOURCE as ROSTER_RESOURCE
+from apps.teachers.models import TeacherProfile
+from .models import User
+
+ROLES = {role for role, _ in User.ROLE_CHOICES}
+USER_FIELDS = ('first_name', 'last_name', 'email')
+STUDENT_FIELDS = ('roll_number', 'mother_phone', 'father_phone')
+UPLOAD_KEY = re.compile(r'imports/[0-9a-f]{32}\.csv')
+
+
+def _hash_password(password):
+    return make_password(password)
+
+
+def _max_length(model, field):
+    return model._meta.get_field(field).max_length
+
+
+class UserImporter:
+    """
+    CSV import of users with their student/teacher profiles.
+
+    Rows are validated before anything is written, classes are resolved in
+    one query, passwords are hashed in a process pool and users/profiles are
+    inserted with bulk_create in chunks of batch_size.
+    """
+
+    @staticmethod
+    def store_upload(upload):
+        """Save an uploaded CSV to storage and return its server-generated key"""
+        return default_storage.save(f'imports/{uuid.uuid4().hex}.csv', upload)
+
+    @staticmethod
+    def open_upload(key):
+        """Open a stored upload by key for binary reading; only keys from store_upload are accepted"""
+        if not UPLOAD_KEY.fullmatch(key):
+            raise ValueError(f'Invalid upload key "{key}"')
+        return default_storage.open(key, 'rb')
+
+    @staticmethod
+    def read_rows(source):
+        """Stream rows from a binary file object as (row_number, stripped dict)"""
+        text = io.TextIOWrapper(source, encoding='utf-8-sig', newline='')
+        try:
+            for row_num, row in enumerate(csv.DictReader(text), start=2):
+                yield row_num, {key.strip(): (value or '').strip() for key, value in row.items() if key}
+        finally:
+            text.detach()
+
+    @staticmethod
+    def validate(rows):
+        """Split rows into (valid, errors); existing or repeated usernames are errors"""
+        valid, errors, seen = [], [], {}
+        for row_num, row in rows:
+            username = row.get('username', '')
+            row['role'] = row.get('role') or 'student'
+            problem = None
+            if not username:
+                problem = 'Missing username'
+            elif len(username) > _max_length(User, 'username'):
+                problem = f'Username "{username}" is too long'
+            elif username in seen:
+                problem = f'Duplicate username "{username}" (first on row {seen[username]})'
+            elif row['role'] not in ROLES:
+                problem = f'Unknown role "{row["role"]}"'
+            else:
+                for model, fields in ((User, USER_FIELDS), (StudentProfile, STUDENT_FIELDS)):
+                    too_long = [field for field in fields if len(row.get(field, '')) > _max_length(model, field)]
+                    if too_long:
+                        problem = f'{", ".join(too_long)} too long'
+                        break
+            if problem:
+                errors.append(f'Row {row_num}: {problem} - skipped')
+                continue
+            seen[username] = row_num
+            valid.append((row_num, row))
+
+        existing = set()
+        usernames = [row['username'] for _, row in valid]
+        for start in range(0, len(usernames), 1000):
+            existing.update(User.objects.filter(
+                username__in=usernames[start:start + 1000]
+            ).values_list('username', flat=True))
+        if existing:
+            errors.extend(
+                f'Row {row_num}: User "{row["username"]}" already exists - skipped'
+                for row_num, row in valid if row['username'] in existing
+            )
+            valid = [(row_num, row) for row_num, row in valid if row['username'] not in existing]
+        return valid, errors
+
+    @staticmethod
+    def resolve_classes(names):
+        """Class id by name for all names, creating the missing ones"""
+        names = set(names)
+        if not names:
+            return {}
+        classes = {}
+        for class_id, name in Class.objects.filter(name__in=names).order_by('id').values_list('id', 'name'):
+            classes.setdefault(name, class_id)
+        missing = names - set(classes)
+        if missing:
+            Class.objects.bulk_create([Class(name=name) for name in sorted(missing)])
+            classes.update(Class.objects.filter(name__in=missing).values_list('name', 'id'))
+        return classes
+
+    @staticmethod
+    def hash_passwords(passwords, workers=None):
+        """make_password for each entry, spread over a process pool for large batches"""
+        if workers is None:
+            workers = getattr(settings, 'USER_IMPORT_WORKERS', None) or os.cpu_count() or 1
+        if workers <= 1 or len(passwords) < workers * 4:
+            return [_hash_password(password) for password in passwords]
+        # Spawned workers rather than forks of a process holding open connections and threads
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context('spawn'), initializer=setup_process
+        ) as pool:
+            return list(pool.map(_hash_password, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
+
+    @staticmethod
+    def _insert(chunk, classes):
+        users = [
+            User(
+                username=row['username'],
+                role=row['role'],
+                password=password,
+                **{field: row.get(field, '') for field in USER_FIELDS}
+            )
+            for row, password in chunk
+        ]
+        with transaction.atomic():
+            User.objects.bulk_create(users)
+            # Re-read ids so this works on backends that do not return them from bulk inserts
+            ids = dict(User.objects.filter(
+                username__in=[user.username for user in users]
+            ).values_list('username', 'id'))
+
+            StudentProfile.objects.bulk_create([
+                StudentProfile(
+                    user_id=ids[row['username']],
+                    student_class_id=classes.get(row.get('class_name', '')),
+                    **{field: row.get(field, '') for field in STUDENT_FIELDS}
+                )
+                for row, _ in chunk if row['role'] == 'student'
+            ])
+            TeacherProfile.objects.bulk_create([
+                TeacherProfile(user_id=ids[row['username']], subjects=row.get('subjects', ''))
+                for row, _ in chunk if row['role'] == 'teacher'
+            ])
+
+    @staticmethod
+    def run(source, batch_size=500, workers=None, dry_run=False, progress=None):
+        """
+        Import users from a binary CSV file object.
+        progress(done, total) is called after every inserted chunk.
+        Returns created/skipped counts and the per-row error messages.
+        """
+        valid, errors = UserImporter.validate(UserImporter.read_rows(source))
+        result = {'total': len(valid) + len(errors), 'created': 0, 'skipped': len(errors), 'errors': errors}
+        if dry_run or not valid:
+            return result
+
+        classes = UserImporter.resolve_classes(
+            row['class_name'] for _, row in valid if row['role'] == 'student' and row.get('class_name')
+        )
+        # Blank passwords become unusable ones without going through the pool
+        to_hash = [row['password'] for _, row in valid if row.get('password')]
+        hashed = iter(UserImporter.hash_passwords(to_hash, workers))
+        rows = [
+            (row, next(hashed) if row.get('password') else make_password(None))
+            for _, row in valid
+        ]
+
+        try:
+            for start in range(0, len(rows), batch_size):
+                chunk = rows[start:start + batch_size]
+                UserImporter._insert(chunk, classes)
+                result['created'] += len(chunk)
+                if progress:
+                    progress(result['created'], len(rows))
+        finally:
+            # bulk_create skips the signals that keep the cached roster fresh; chunks
+            # committed before a failure are in the roster too
+            bump_version(ROSTER_RESOURCE)
+        return result
@@ -0,0 +1,23 @@
+import os
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Create the DJANGO_SUPERUSER_* account when AUTO_CREATE_SUPERUSER=true (release phase, after migrate)'
+
+    def handle(self, *args, **options):
+        if os.environ.get('AUTO_CREATE_SUPERUSER', 'False').lower() != 'true':
+            self.stdout.write("ℹ️ AUTO_CREATE_SUPERUSER is not set, skipping")
+            return
+
+        User = get_user_model()
+        username = os.environ.get('DJANGO_SUPERUSER_USERNAME', 'admin')
+        email = os.environ.get('DJANGO_SUPERUSER_EMAIL', 'admin@example.com')
+        password = os.environ.get('DJANGO_SUPERUSER_PASSWORD', 'admin123')
+
+        if User.objects.filter(username=username).exists():
+            self.stdout.write(f"ℹ️ Superuser '{username}' already exists")
+            return
+        User.objects.create_superuser(username=username, email=email, password=password)
+        self.stdout.write(self.style.SUCCESS(f"✅ Superuser '{username}' created successfully"))
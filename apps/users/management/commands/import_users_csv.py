@@ -0,0 +1,39 @@
+import os
+from django.core.management.base import BaseCommand, CommandError
+from apps.users.importer import UserImporter
+
+
+class Command(BaseCommand):
+    help = 'Import users with student/teacher profiles from a CSV file'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', help='Path to the CSV file')
+        parser.add_argument('--batch-size', type=int, default=500, help='Users inserted per bulk_create')
+        parser.add_argument('--workers', type=int, help='Password hashing processes (default: CPU count)')
+        parser.add_argument('--dry-run', action='store_true', help='Only validate the rows')
+    
+    def handle(self, *args, **options):
+        path = options['csv_file']
+        if not os.path.exists(path):
+            raise CommandError(f"❌ File not found: {path}")
+        
+        self.stdout.write(f"📥 Importing users from {path}...")
+        with open(path, 'rb') as source:
+            result = UserImporter.run(
+                source,
+                batch_size=options['batch_size'],
+                workers=options['workers'],
+                dry_run=options['dry_run'],
+                progress=lambda done, total: self.stdout.write(f"   ⏳ {done}/{total} users"),
+            )
+        
+        for error in result['errors']:
+            self.stdout.write(self.style.WARNING(f"⚠️  {error}"))
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ Validated {result['total']} rows: {result['total'] - result['skipped']} valid, {result['skipped']} skipped"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ Imported {result['created']} users, skipped {result['skipped']} rows"
+            ))
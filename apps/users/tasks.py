@@ -0,0 +1,19 @@
+from django.core.files.storage import default_storage
+from apps.jobs.registry import task
+from .importer import UserImporter
+
+
+@task('users.import_csv', max_attempts=1)
+def import_csv(job, key, batch_size=500, workers=None):
+    """Import users from a CSV stored by the admin upload, streaming it from storage"""
+    source = UserImporter.open_upload(key)
+    try:
+        return UserImporter.run(
+            source, batch_size=batch_size, workers=workers,
+            progress=lambda done, total: job.set_progress(done * 100 // total, f'{done}/{total} users')
+        )
+    except UnicodeDecodeError:
+        raise ValueError('the file is not UTF-8 encoded CSV')
+    finally:
+        source.close()
+        default_storage.delete(key)
@@ -1,3 +1,126 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from apps.core.versioning import get_version
+from apps.jobs.models import Job
+from apps.jobs.services import JobQueue
+from apps.students.models import Class, StudentProfile
+from apps.students.roster import RESOURCE as ROSTER_RESOURCE
+from apps.teachers.models import TeacherProfile
+from .importer import UserImporter
+from .models import User
 
-# Create your tests here.
+CSV = """username,first_name,last_name,email,role,password,class_name,roll_number,mother_phone,father_phone,subjects
+ana,Ana,K,ana@example.com,student,secret123,1st,1,111,222,
+ben,Ben,L,,,,2nd,2,,,
+,No,Name,,student,,1st,3,,,
+ana,Ana,Again,,student,,1st,4,,,
+tina,Tina,M,,teacher,teach123,,,,,Math
+old,Old,User,,student,,1st,5,,,
+bad,Bad,Role,,janitor,,,,,,
+"""
+
+
+class UserImporterTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        Class.objects.create(name="1st", class_group="1-5")
+        User.objects.create(username="old")
+    
+    def test_import_validates_then_bulk_inserts(self):
+        version = get_version(ROSTER_RESOURCE)
+        progress = []
+        with self.captureOnCommitCallbacks(execute=True):
+            result = UserImporter.run(
+                io.BytesIO(CSV.encode()), batch_size=2, workers=1,
+                progress=lambda done, total: progress.append((done, total))
+            )
+        
+        self.assertEqual((result['total'], result['created'], result['skipped']), (7, 3, 4))
+        self.assertEqual(progress, [(2, 3), (3, 3)])
+        self.assertTrue(User.objects.get(username="ana").check_password("secret123"))
+        self.assertFalse(User.objects.get(username="ben").has_usable_password())
+        
+        profiles = dict(StudentProfile.objects.values_list('user__username', 'student_class__name'))
+        self.assertEqual(profiles, {'ana': '1st', 'ben': '2nd'})
+        self.assertEqual(Class.objects.filter(name="1st").count(), 1)
+        self.assertEqual(TeacherProfile.objects.get().subjects, "Math")
+        self.assertNotEqual(get_version(ROSTER_RESOURCE), version)
+    
+    def test_dry_run_writes_nothing(self):
+        result = UserImporter.run(io.BytesIO(CSV.encode()), dry_run=True)
+        self.assertEqual((result['created'], result['skipped']), (0, 4))
+        self.assertEqual(User.objects.count(), 1)
+    
+    def test_passwords_hash_in_worker_processes(self):
+        passwords = [f"secret{n}" for n in range(8)]
+        hashed = UserImporter.hash_passwords(passwords, workers=2)
+        user = User(username="hashed")
+        for password, encoded in zip(passwords, hashed):
+            user.password = encoded
+            self.assertTrue(user.check_password(password))
+
+    
+    def test_admin_upload_is_imported_by_a_job(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        media_root = override_settings(MEDIA_ROOT=media)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        admin_user = User.objects.create_superuser(username="admin", password="pass12345", email="a@example.com")
+        self.client.force_login(admin_user)
+        upload = SimpleUploadedFile("users.csv", CSV.encode())
+        response = self.client.post('/admin/users/user/import-csv/', {'csv_file': upload})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(User.objects.filter(username="ana").exists())
+        
+        job = Job.objects.get(task='users.import_csv')
+        self.assertEqual(job.created_by, admin_user)
+        self.assertEqual(list(job.kwargs), ['key'])  # the job carries a storage key, not the file
+        self.assertTrue(default_storage.exists(job.kwargs['key']))
+        JobQueue.claim('w1')
+        self.assertEqual(JobQueue.execute(job.id), Job.SUCCEEDED)
+        job.refresh_from_db()
+        self.assertEqual((job.result['created'], job.result['skipped']), (3, 4))
+        self.assertTrue(User.objects.filter(username="ana").exists())
+        self.assertFalse(default_storage.exists(job.kwargs['key']))
+        
+        with self.assertRaises(ValueError):
+            UserImporter.open_upload('../config/settings.py')
+
+
+class CsvExportTestCase(TestCase):
+    def setUp(self):
+        first = Class.objects.create(name="1st", class_group="1-5")
+        second = Class.objects.create(name="2nd", class_group="1-5")
+        for roll, cls in enumerate([first, first, second]):
+            StudentProfile.objects.create(
+                user=User.objects.create(username=f"s{roll}", first_name=f"S{roll}"),
+                student_class=cls, roll_number=str(roll), mother_phone=f"55{roll}", father_phone=""
+            )
+        self.class_id = first.id
+    
+    def test_parent_phones_stream_for_staff_only(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username="pupil", role="student"))
+        self.assertEqual(self.client.get('/api/auth/export/users/').status_code, 403)
+        self.client.force_authenticate(User.objects.create(username="teach", role="teacher"))
+        self.assertEqual(self.client.get('/api/auth/export/parent_phones/').status_code, 403)
+        self.assertEqual(self.client.get('/api/auth/export/teachers/').status_code, 200)
+        
+        self.client.force_authenticate(User.objects.create(username="head", role="principal"))
+        response = self.client.get(f'/api/auth/export/parent_phones/?class_id={self.class_id}')
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines, [
+            'class_name,roll_number,first_name,last_name,mother_phone,father_phone',
+            '1st,0,S0,,550,',
+            '1st,1,S1,,551,',
+        ])
+        self.assertEqual(self.client.get('/api/auth/export/secrets/').status_code, 404)
+        self.assertEqual(self.client.get('/api/auth/export/students/?class_id=1st').status_code, 400)
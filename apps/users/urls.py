@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import login_view, profile_view, logout_view
+from .views import login_view, profile_view, logout_view, export_csv
 
 app_name = 'users'
 urlpatterns = [
@@ -7,4 +7,5 @@ urlpatterns = [
     path('profile/', profile_view, name='profile'),
     path('logout/', logout_view, name='logout'),
     path('debug/', profile_view, name='debug_auth'),
+    path('export/<str:name>/', export_csv, name='export_csv'),
 ]
@@ -4,6 +4,7 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
+from .exports import EXPORTS, stream_export
 from .models import User
 import logging
 
@@ -118,3 +119,49 @@ def logout_view(request):
             'success': False,
             'message': 'Invalid token'
         }, status=status.HTTP_400_BAD_REQUEST)
+
+
+EXPORT_ROLES = ('teacher', 'principal', 'admin')
+# Account lists and parent phone numbers (students carries them too) are not for every teacher
+STAFF_EXPORT_ROLES = ('principal', 'admin')
+STAFF_EXPORTS = ('users', 'students', 'parent_phones')
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_csv(request, name):
+    """Stream a CSV export (users, students, parent_phones, teachers); ?class_id= narrows student lists"""
+    try:
+        if not (request.user.is_staff or request.user.role in EXPORT_ROLES):
+            return Response({
+                'success': False,
+                'message': 'You do not have permission to export data'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        if name not in EXPORTS:
+            return Response({
+                'success': False,
+                'message': f'Unknown export "{name}". Available: {", ".join(EXPORTS)}'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        if name in STAFF_EXPORTS and not (request.user.is_staff or request.user.role in STAFF_EXPORT_ROLES):
+            return Response({
+                'success': False,
+                'message': 'Only principals and admins can export this data'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        queryset = None
+        class_id = request.GET.get('class_id')
+        if class_id and not class_id.isdigit():
+            return Response({
+                'success': False,
+                'message': 'class_id must be a number'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if class_id and name in ('students', 'parent_phones'):
+            queryset = EXPORTS[name][0]().filter(student_class_id=class_id)
+        return stream_export(name, queryset)
+    except Exception as e:
+        return Response({
+            'success': False,
+            'message': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
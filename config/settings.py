@@ -16,6 +16,7 @@ from dotenv import load_dotenv
 import dj_database_url
 from datetime import timedelta
 import re  # Added for database URL fix
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -84,6 +85,7 @@ INSTALLED_APPS = [
     'rest_framework',
     'rest_framework_simplejwt',
     'corsheaders',
+    'apps.core',
     'apps.users',
     'apps.teachers',
     'apps.students',
@@ -91,9 +93,11 @@ INSTALLED_APPS = [
     'apps.fees',
     'apps.notifications',
     'apps.assessments',
+    'apps.jobs',
 ]
 
 MIDDLEWARE = [
+    'apps.core.instrumentation.RequestInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -133,21 +137,18 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # DATABASE CONFIGURATION (Fixed for Railway)
 # =============================================================================
 
-# Fix DATABASE_URL format if needed (Railway uses postgresql://, Django needs postgres://)
-db_url = os.getenv('DATABASE_URL', '')
-if db_url.startswith('postgresql://'):
-    os.environ['DATABASE_URL'] = db_url.replace('postgresql://', 'postgres://', 1)
-    print("🔧 Fixed DATABASE_URL scheme")
+# Railway uses postgresql://, older dj-database-url releases only know postgres://
+db_url = re.sub(r'^postgresql://', 'postgres://', os.getenv('DATABASE_URL', ''))
 
 # Database configuration
-if 'DATABASE_URL' in os.environ:
+if db_url:
     DATABASES = {
-        'default': dj_database_url.config(
+        'default': dj_database_url.parse(
+            db_url,
             conn_max_age=600,
             conn_health_checks=True,
         )
     }
-    print(f"🗄️ Using Railway PostgreSQL database")
 else:
     DATABASES = {
         'default': {
@@ -159,7 +160,65 @@ else:
             'PORT': os.getenv('DB_PORT', '5432'),
         }
     }
-    print(f"🗄️ Using local database: {DATABASES['default']['NAME']}")
+
+# Connection handling (DB_POOL), PostgreSQL only:
+# - persistent (default): each worker thread keeps its own connection for conn_max_age
+# - pool: threads of a worker share DB_POOL_MAX_SIZE connections (apps.core.db.pooled);
+#   the gthread profile in gunicorn.conf.py turns this on
+# - pgbouncer: DATABASE_URL points at PgBouncer in transaction pooling mode. Server-side
+#   cursors (QuerySet.iterator()) and session state cannot outlive a transaction there, so
+#   they are disabled, and the database role's timezone must be UTC so Django never needs
+#   SET TIME ZONE (check_readiness reports it)
+DB_POOL = os.getenv('DB_POOL', 'persistent')
+if DB_POOL not in ('persistent', 'pool', 'pgbouncer'):
+    raise ImproperlyConfigured(f"DB_POOL must be persistent, pool or pgbouncer, not '{DB_POOL}'")
+if 'postgresql' in DATABASES['default']['ENGINE']:
+    if DB_POOL == 'pool':
+        DATABASES['default'].update({
+            'ENGINE': 'apps.core.db.pooled',
+            'CONN_MAX_AGE': 0,
+            'CONN_HEALTH_CHECKS': True,
+            'POOL': {
+                'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '4')),
+                'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+            },
+        })
+    elif DB_POOL == 'pgbouncer':
+        DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+
+# =============================================================================
+# CACHE CONFIGURATION
+# =============================================================================
+
+# Local memory in development. Production uses a file-based cache so every
+# gunicorn worker on the host shares entries and invalidations.
+if DEBUG:
+    CACHES = {
+        'default': {
+            'BACKEND': os.getenv('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+            'LOCATION': os.getenv('DJANGO_CACHE_LOCATION', 'srkdp'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': os.getenv('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+            'LOCATION': os.getenv('DJANGO_CACHE_LOCATION', '/tmp/srkdp-cache'),
+        }
+    }
+
+# =============================================================================
+# REQUEST INSTRUMENTATION
+# =============================================================================
+
+# Queries per request before apps.core.requests logs a warning, and how many
+# times one query shape may repeat (an N+1 pattern) before it does the same
+REQUEST_INSTRUMENTATION = os.getenv('REQUEST_INSTRUMENTATION', 'True') == 'True'
+REQUEST_QUERY_BUDGET = int(os.getenv('REQUEST_QUERY_BUDGET', '50'))
+REQUEST_DUPLICATE_QUERY_LIMIT = int(os.getenv('REQUEST_DUPLICATE_QUERY_LIMIT', '5'))
+
+# /metrics requires "Authorization: Bearer <METRICS_TOKEN>"; without a token it is only open with DEBUG on
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
 
 # =============================================================================
 # PASSWORD VALIDATION
@@ -197,11 +256,6 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
-# Create staticfiles directory if it doesn't exist
-if not os.path.exists(STATIC_ROOT):
-    os.makedirs(STATIC_ROOT)
-    print(f"📁 Created staticfiles directory at {STATIC_ROOT}")
-
 # Static files directories
 STATICFILES_DIRS = []
 if (BASE_DIR / 'static').exists():
@@ -216,6 +270,10 @@ else:
 # Admin static files fallback
 ADMIN_MEDIA_PREFIX = '/static/admin/'
 
+# Uploads such as admin CSV imports wait here for their job; web and worker
+# processes must share it (or point DEFAULT_FILE_STORAGE at a remote store)
+MEDIA_ROOT = Path(os.getenv('MEDIA_ROOT', BASE_DIR / 'media'))
+
 # =============================================================================
 # DEFAULT PRIMARY KEY FIELD
 # =============================================================================
@@ -244,8 +302,8 @@ REST_FRAMEWORK = {
         'rest_framework.throttling.UserRateThrottle'
     ],
     'DEFAULT_THROTTLE_RATES': {
-        'anon': '100/day',
-        'user': '1000/day'
+        'anon': os.getenv('API_THROTTLE_ANON', '100/day'),
+        'user': os.getenv('API_THROTTLE_USER', '1000/day')
     }
 }
 
@@ -296,6 +354,9 @@ SIMPLE_JWT = {
 # LOGGING CONFIGURATION
 # =============================================================================
 
+# The file handler (used when DEBUG is off) writes LOG_DIR/django.log
+LOG_DIR = Path(os.getenv('LOG_DIR', BASE_DIR))
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -312,8 +373,9 @@ LOGGING = {
         },
         'file': {
             'class': 'logging.FileHandler',
-            'filename': BASE_DIR / 'django.log',
+            'filename': LOG_DIR / 'django.log',
             'formatter': 'verbose',
+            'delay': True,
         },
     },
     'loggers': {
@@ -340,104 +402,12 @@ if not DEBUG:
             'django.template.loaders.app_directories.Loader',
         ]),
     ]
-    print("🔧 Configured cached template loaders for production")
-
-# =============================================================================
-# RAILWAY DEPLOYMENT CHECKS
-# =============================================================================
-
-# Add this to see what's happening in Railway logs
-print("\n" + "="*80)
-print(f"🔧 DEBUG: {DEBUG}")
-print(f"🔧 ALLOWED_HOSTS: {ALLOWED_HOSTS}")
-print(f"🔧 DATABASE_URL present: {bool(os.getenv('DATABASE_URL'))}")
-print(f"🔧 SECURE_PROXY_SSL_HEADER: {SECURE_PROXY_SSL_HEADER}")
-print(f"🔧 SECURE_SSL_REDIRECT: {SECURE_SSL_REDIRECT}")
-print(f"🔧 CSRF_TRUSTED_ORIGINS: {CSRF_TRUSTED_ORIGINS if not DEBUG else 'N/A'}")
-print(f"🔧 STATIC_ROOT: {STATIC_ROOT}")
-print(f"🔧 STATICFILES_STORAGE: {STATICFILES_STORAGE}")
-print("="*80 + "\n")
-
-
 
 # =============================================================================
-# AUTO SUPERUSER CREATION (For Railway Deployment)
+# STARTUP
 # =============================================================================
 
-import os
-if not DEBUG and os.environ.get('AUTO_CREATE_SUPERUSER', 'False').lower() == 'true':
-    from django.contrib.auth import get_user_model
-    from django.db.utils import OperationalError, ProgrammingError
-    from django.db import connection
-    import time
-    
-    # Wait for database to be ready
-    max_retries = 5
-    retry_delay = 2  # seconds
-    
-    for i in range(max_retries):
-        try:
-            # Try to execute a simple query to check if database is ready
-            with connection.cursor() as cursor:
-                cursor.execute("SELECT 1")
-            break
-        except (OperationalError, ProgrammingError):
-            if i < max_retries - 1:
-                print(f"⚠️ Database not ready, retrying in {retry_delay} seconds...")
-                time.sleep(retry_delay)
-            else:
-                print("❌ Could not connect to database after multiple attempts")
-                break
-    else:
-        try:
-            User = get_user_model()
-            username = os.environ.get('DJANGO_SUPERUSER_USERNAME', 'admin')
-            email = os.environ.get('DJANGO_SUPERUSER_EMAIL', 'admin@example.com')
-            password = os.environ.get('DJANGO_SUPERUSER_PASSWORD', 'admin123')
-            
-            if not User.objects.filter(username=username).exists():
-                User.objects.create_superuser(
-                    username=username,
-                    email=email,
-                    password=password
-                )
-                print(f"✅ Superuser '{username}' created successfully")
-            else:
-                print(f"ℹ️ Superuser '{username}' already exists")
-        except Exception as e:
-            print(f"❌ Error creating superuser: {e}")
-# =============================================================================
-# DATABASE CONNECTION FIX (Add this to settings.py)
-# =============================================================================
-
-import time
-from django.db import connections
-from django.db.utils import OperationalError
-
-# Wait for database to be ready (more robust version)
-def wait_for_db():
-    """Wait for database to become available"""
-    max_retries = 10
-    retry_delay = 5  # seconds
-    
-    for i in range(max_retries):
-        try:
-            # Try to connect to all databases
-            for conn_name in connections:
-                connection = connections[conn_name]
-                if connection.vendor == 'postgresql':
-                    with connection.cursor() as cursor:
-                        cursor.execute("SELECT 1")
-            print("✅ Database connection established")
-            return True
-        except OperationalError as e:
-            if i < max_retries - 1:
-                print(f"⚠️ Database not ready (attempt {i+1}/{max_retries}): {e}")
-                time.sleep(retry_delay)
-            else:
-                print(f"❌ Could not connect to database after {max_retries} attempts: {e}")
-                return False
-
-# Call this function during startup
-if not DEBUG:
-    wait_for_db()
+# Importing settings does no I/O (no prints, database waits or writes) so
+# manage.py, gunicorn workers and tests start fast. The release phase runs
+# `check_readiness --wait` (configuration report, database and cache checks)
+# and `ensure_superuser` (AUTO_CREATE_SUPERUSER); load balancers poll /ready.
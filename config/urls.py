@@ -5,6 +5,8 @@ from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.http import HttpResponse
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from apps.core.views import metrics_view, readiness_view
+from apps.dashboard.views import bootstrap
 
 
  # Optional custom index
@@ -31,10 +33,15 @@ urlpatterns = [
     path('assessments/', include('apps.assessments.urls')),  # Django template views
     path('api/attendance/', include('apps.attendance.urls')),
     path('api/notifications/', include('apps.notifications.urls')),
+    path('api/jobs/', include('apps.jobs.urls')),
+    path('api/bootstrap/', bootstrap, name='bootstrap'),
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     
     # Utilities
     path('health/', health_check, name='health_with_slash'),
     path('health', health_check, name='health_without_slash'),
+    path('ready/', readiness_view, name='readiness_with_slash'),
+    path('ready', readiness_view, name='readiness_without_slash'),
+    path('metrics', metrics_view, name='metrics'),
 ]
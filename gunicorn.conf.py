@@ -0,0 +1,29 @@
+"""
+Gunicorn settings; gunicorn loads this file from the working directory.
+
+GUNICORN_PROFILE=sync (default) is the original setup: WEB_CONCURRENCY
+single-threaded workers, each with its own persistent database connection.
+GUNICORN_PROFILE=gthread runs GUNICORN_THREADS threads per worker and,
+unless DB_POOL says otherwise, shares one connection pool per worker
+between them (DB_POOL=pool). A request holds its connection from its first
+query to its end, so DB_POOL_MAX_SIZE defaults to half the threads: threads
+that would only add connections wait for one, and requests that never touch
+the database (static files, /health) are not held up.
+
+Compare the two with `manage.py benchmark_throughput`.
+"""
+import os
+
+profile = os.getenv('GUNICORN_PROFILE', 'sync')
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', '1'))
+
+if profile == 'gthread':
+    worker_class = 'gthread'
+    threads = int(os.getenv('GUNICORN_THREADS', '4'))
+    # Workers import settings after this file runs, so they inherit these
+    os.environ.setdefault('DB_POOL', 'pool')
+    os.environ.setdefault('DB_POOL_MAX_SIZE', str(max(2, threads // 2)))
+elif profile != 'sync':
+    raise RuntimeError(f"GUNICORN_PROFILE must be sync or gthread, not '{profile}'")